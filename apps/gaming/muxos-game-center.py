@@ -7,8 +7,12 @@ from gi.repository import Gtk, GLib
 import subprocess
 import os
 import json
+import sys
 import threading
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib"))
+from muxos.procfs import ProcSampler
+
 class GameCenter(Gtk.Window):
     def __init__(self):
         Gtk.Window.__init__(self, title="MuxOS Game Center")
@@ -153,6 +157,8 @@ class GameCenter(Gtk.Window):
         perf_frame.add(perf_box)
         box.pack_start(perf_frame, False, False, 0)
         
+        self.sampler = ProcSampler()
+        self.sampler.sample(processes=False)
         GLib.timeout_add_seconds(2, self.update_performance)
         
         return box
@@ -395,16 +401,13 @@ class GameCenter(Gtk.Window):
             self.status_label.set_markup("<span size='large' color='#888'>💤 Gaming Mode: OFF</span>")
     
     def update_performance(self):
-        try:
-            import psutil
-            cpu = psutil.cpu_percent()
-            mem = psutil.virtual_memory()
-            self.cpu_bar.set_fraction(cpu / 100)
-            self.cpu_bar.set_text(f"CPU: {cpu:.0f}%")
-            self.ram_bar.set_fraction(mem.percent / 100)
-            self.ram_bar.set_text(f"RAM: {mem.percent:.0f}%")
-        except:
-            pass
+        snapshot = self.sampler.sample(processes=False)
+        cpu = snapshot.cpu_percent
+        mem = snapshot.memory
+        self.cpu_bar.set_fraction(cpu / 100)
+        self.cpu_bar.set_text(f"CPU: {cpu:.0f}%")
+        self.ram_bar.set_fraction(mem.percent / 100)
+        self.ram_bar.set_text(f"RAM: {mem.percent:.0f}%")
         return True
     
     def add_game(self, button):
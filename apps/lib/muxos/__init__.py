@@ -0,0 +1 @@
+"""Shared helpers for the MuxOS desktop applications."""
@@ -0,0 +1,166 @@
+"""External tools run from the GLib main loop, without a thread or shell.
+
+Some facts are only known to a program (the networks iwlist scanned, the
+devices bluetoothctl paired). run() starts it as a Gio.Subprocess,
+argument list as given, and reads its output line by line with async
+reads on the main context, so any number of them run at once while the
+UI stays responsive:
+
+    run(["iwlist", "wlan0", "scan"], on_done, on_line=show, max_lines=20)
+
+on_line gets each line as it arrives; max_lines stops the program once
+that many were read, like `| head`. A program still running after
+timeout seconds is killed. on_done always runs exactly once, on the main
+loop, unless the command was cancelled; a CommandGroup cancels the
+commands of a window when it closes.
+"""
+
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence, Set
+
+from gi.repository import Gio, GLib
+
+COMMAND_TIMEOUT = 10
+
+
+class CommandResult(NamedTuple):
+    args: List[str]
+    status: Optional[int]  # exit status; None if it did not start or was killed
+    lines: List[str]
+    timed_out: bool
+    truncated: bool  # stopped after max_lines
+    error: str  # why it did not start, "" otherwise
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 0 or self.truncated
+
+    @property
+    def output(self) -> str:
+        return "\n".join(self.lines)
+
+
+class Command:
+    """One running program; see run()."""
+
+    def __init__(self, args: Sequence[str], on_done: Callable[[CommandResult], None],
+                 on_line: Optional[Callable[[str], None]] = None,
+                 timeout: Optional[float] = COMMAND_TIMEOUT, max_lines: Optional[int] = None,
+                 merge_stderr: bool = False):
+        self.args = list(args)
+        self.on_done = on_done
+        self.on_line = on_line
+        self.timeout = timeout
+        self.max_lines = max_lines
+        self.lines: List[str] = []
+        self.timed_out = False
+        self.truncated = False
+        self.finished = False
+        self.timeout_id = None
+        self.cancellable = Gio.Cancellable()
+        self.started = time.monotonic()
+        flags = Gio.SubprocessFlags.STDOUT_PIPE | (
+            Gio.SubprocessFlags.STDERR_MERGE if merge_stderr else Gio.SubprocessFlags.STDERR_SILENCE)
+        try:
+            self.process = Gio.Subprocess.new(self.args, flags)
+        except GLib.Error as e:
+            # Reported from the loop, so on_done never runs before run() returns
+            self.process = None
+            GLib.idle_add(self._finish, None, e.message)
+            return
+        self.stream = Gio.DataInputStream.new(self.process.get_stdout_pipe())
+        if timeout:
+            self.timeout_id = GLib.timeout_add(int(timeout * 1000), self._on_timeout)
+        self._read_line()
+
+    def _read_line(self):
+        self.stream.read_line_async(GLib.PRIORITY_DEFAULT, self.cancellable, self._on_line)
+
+    def _on_line(self, stream, result):
+        if self.finished:
+            return
+        try:
+            line, _ = stream.read_line_finish(result)
+        except GLib.Error:
+            line = None  # the pipe broke; the exit status tells the rest
+        if line is None:
+            self.process.wait_async(None, self._on_exit)
+            return
+        text = line.decode(errors="replace")
+        self.lines.append(text)
+        if self.on_line is not None:
+            self.on_line(text)
+        if self.max_lines is not None and len(self.lines) >= self.max_lines:
+            self.truncated = True
+            self.process.force_exit()
+            self.process.wait_async(None, self._on_exit)
+            return
+        self._read_line()
+
+    def _on_timeout(self):
+        self.timeout_id = None
+        self.timed_out = True
+        self.process.force_exit()
+        return False
+
+    def _on_exit(self, process, result):
+        try:
+            process.wait_finish(result)
+        except GLib.Error:
+            pass
+        self._finish(process.get_exit_status() if process.get_if_exited() else None, "")
+
+    def _finish(self, status, error):
+        if self.finished:
+            return False
+        self.finished = True
+        if self.timeout_id is not None:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        self.on_done(CommandResult(self.args, status, self.lines, self.timed_out, self.truncated,
+                                   error, time.monotonic() - self.started))
+        return False
+
+    def cancel(self) -> None:
+        """Kill the program; on_done is not called."""
+        if self.finished:
+            return
+        self.finished = True
+        self.cancellable.cancel()
+        if self.timeout_id is not None:
+            GLib.source_remove(self.timeout_id)
+            self.timeout_id = None
+        if self.process is not None:
+            self.process.force_exit()
+
+
+def run(args: Sequence[str], on_done: Callable[[CommandResult], None], **kwargs) -> Command:
+    """Start args; keywords are those of Command."""
+    return Command(args, on_done, **kwargs)
+
+
+class CommandGroup:
+    """Commands that belong together, such as those of one window."""
+
+    def __init__(self):
+        self.commands: Set[Command] = set()
+
+    @property
+    def running(self) -> bool:
+        # Commands cancelled one by one stay in the set until cancel()
+        return any(not command.finished for command in self.commands)
+
+    def run(self, args: Sequence[str], on_done: Callable[[CommandResult], None], **kwargs) -> Command:
+        def done(result):
+            self.commands.discard(command)
+            on_done(result)
+
+        command = Command(args, done, **kwargs)
+        self.commands.add(command)
+        return command
+
+    def cancel(self) -> None:
+        for command in self.commands:
+            command.cancel()
+        self.commands.clear()
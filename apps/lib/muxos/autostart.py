@@ -0,0 +1,241 @@
+"""Programs started with the Openbox session, and switching them off.
+
+Two places start programs at login:
+
+    XDG autostart  .desktop files in /etc/xdg/autostart and
+                   ~/.config/autostart; a user file replaces the system
+                   file of the same name
+    Openbox        the shell scripts /etc/xdg/openbox/autostart and
+                   ~/.config/openbox/autostart
+
+Disabling an XDG entry writes a user copy with Hidden=true, as the spec
+says. The system Openbox script starts its programs through a `launch`
+shell function that skips every program named in
+~/.config/muxos/autostart-disabled; plain `command &` lines of the user
+script are commented out instead.
+
+Entries are matched to processes by program, the basename of the first
+word of the command. muxos-startup-profiler records what each program
+costs at login under that name.
+"""
+
+import json
+import os
+import shlex
+import shutil
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+SYSTEM_AUTOSTART_DIR = "/etc/xdg/autostart"
+USER_AUTOSTART_DIR = os.path.expanduser("~/.config/autostart")
+SYSTEM_OPENBOX_SCRIPT = "/etc/xdg/openbox/autostart"
+USER_OPENBOX_SCRIPT = os.path.expanduser("~/.config/openbox/autostart")
+DISABLED_LIST = os.path.expanduser("~/.config/muxos/autostart-disabled")
+PROFILE_PATH = os.path.expanduser("~/.cache/muxos/startup-profile.json")
+
+DESKTOP_NAME = "OPENBOX"
+DISABLED_MARK = "#muxos-disabled# "
+
+
+class StartupEntry(NamedTuple):
+    name: str
+    command: str
+    program: str
+    source: str  # "xdg" or "openbox"
+    path: str
+    enabled: bool
+    line: Optional[int] = None  # plain line of the user Openbox script
+
+
+class StartupCost(NamedTuple):
+    started: float
+    first_window: Optional[float]
+    cpu_seconds: float
+
+
+def program_name(command: str) -> str:
+    """Basename of the program a command runs, skipping `env` and VAR=value."""
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        words = command.split()
+    for word in words:
+        if word == "env" or ("=" in word and not word.startswith(("/", "."))):
+            continue
+        return os.path.basename(word)
+    return ""
+
+
+def _read_desktop_file(path: str) -> Dict[str, str]:
+    """Unlocalized keys of the [Desktop Entry] group."""
+    keys = {}
+    group = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("["):
+                group = line
+                continue
+            if group == "[Desktop Entry]" and "=" in line:
+                key, value = line.split("=", 1)
+                keys.setdefault(key.strip(), value.strip())
+    return keys
+
+
+def _strip_field_codes(command: str) -> str:
+    return " ".join(word for word in command.split()
+                    if not (len(word) == 2 and word.startswith("%")))
+
+
+def _runs_here(keys: Dict[str, str]) -> bool:
+    """Whether an XDG autostart run in this session would start the entry."""
+    only = [d.upper() for d in keys.get("OnlyShowIn", "").split(";") if d]
+    if only and DESKTOP_NAME not in only:
+        return False
+    if DESKTOP_NAME in [d.upper() for d in keys.get("NotShowIn", "").split(";") if d]:
+        return False
+    try_exec = keys.get("TryExec")
+    return not try_exec or shutil.which(try_exec) is not None
+
+
+def read_xdg_entries() -> List[StartupEntry]:
+    files = {}
+    for directory in (SYSTEM_AUTOSTART_DIR, USER_AUTOSTART_DIR):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            if name.endswith(".desktop"):
+                files[name] = os.path.join(directory, name)
+
+    entries = []
+    for filename, path in sorted(files.items()):
+        try:
+            keys = _read_desktop_file(path)
+        except OSError:
+            continue
+        command = _strip_field_codes(keys.get("Exec", ""))
+        if not command or not _runs_here(keys):
+            continue
+        enabled = (keys.get("Hidden", "false").lower() != "true"
+                   and keys.get("X-GNOME-Autostart-enabled", "true").lower() != "false")
+        entries.append(StartupEntry(keys.get("Name", filename[:-len(".desktop")]), command,
+                                    program_name(command), "xdg", path, enabled))
+    return entries
+
+
+def read_disabled() -> List[str]:
+    try:
+        with open(DISABLED_LIST) as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+def read_openbox_entries() -> List[StartupEntry]:
+    disabled = set(read_disabled())
+    entries = []
+    for path in (SYSTEM_OPENBOX_SCRIPT, USER_OPENBOX_SCRIPT):
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        for number, line in enumerate(lines):
+            line = line.strip()
+            if line.startswith("launch "):
+                command = line[len("launch "):].strip()
+                program = program_name(command)
+                entries.append(StartupEntry(program, command, program, "openbox", path,
+                                            program not in disabled))
+            elif path == USER_OPENBOX_SCRIPT and line.endswith("&") and not line.endswith("&&"):
+                enabled = not line.startswith(DISABLED_MARK)
+                if not enabled:
+                    line = line[len(DISABLED_MARK):]
+                elif line.startswith("#"):
+                    continue
+                command = line[:-1].strip()
+                program = program_name(command)
+                entries.append(StartupEntry(program, command, program, "openbox", path,
+                                            enabled, number))
+    return entries
+
+
+def read_entries() -> List[StartupEntry]:
+    return read_xdg_entries() + read_openbox_entries()
+
+
+def _write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _set_xdg_enabled(entry: StartupEntry, enabled: bool) -> None:
+    # Always edit the user copy; the system file only serves as template
+    with open(entry.path, encoding="utf-8", errors="replace") as f:
+        lines = f.read().splitlines()
+    value = "false" if enabled else "true"
+    group = None
+    insert_at = None
+    found = False
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("["):
+            if group == "[Desktop Entry]" and insert_at is None:
+                insert_at = i
+            group = stripped
+        elif group == "[Desktop Entry]":
+            key = stripped.split("=", 1)[0].strip()
+            if key == "Hidden":
+                lines[i] = f"Hidden={value}"
+                found = True
+            elif key == "X-GNOME-Autostart-enabled":
+                lines[i] = f"X-GNOME-Autostart-enabled={'true' if enabled else 'false'}"
+    if not found:
+        lines.insert(insert_at if insert_at is not None else len(lines), f"Hidden={value}")
+    _write(os.path.join(USER_AUTOSTART_DIR, os.path.basename(entry.path)), "\n".join(lines) + "\n")
+
+
+def _set_openbox_enabled(entry: StartupEntry, enabled: bool) -> None:
+    if entry.line is not None:
+        with open(entry.path) as f:
+            lines = f.read().splitlines()
+        line = lines[entry.line]
+        indent = line[:len(line) - len(line.lstrip())]
+        body = line.strip()
+        if body.startswith(DISABLED_MARK):
+            body = body[len(DISABLED_MARK):]
+        lines[entry.line] = indent + (body if enabled else DISABLED_MARK + body)
+        _write(entry.path, "\n".join(lines) + "\n")
+        return
+    disabled = [program for program in read_disabled() if program != entry.program]
+    if not enabled:
+        disabled.append(entry.program)
+    _write(DISABLED_LIST, "".join(program + "\n" for program in disabled))
+
+
+def set_enabled(entry: StartupEntry, enabled: bool) -> StartupEntry:
+    """Persist the new state; raises OSError when it cannot be written."""
+    if entry.source == "xdg":
+        _set_xdg_enabled(entry, enabled)
+        path = os.path.join(USER_AUTOSTART_DIR, os.path.basename(entry.path))
+        return entry._replace(enabled=enabled, path=path)
+    _set_openbox_enabled(entry, enabled)
+    return entry._replace(enabled=enabled)
+
+
+def read_profile() -> Tuple[Optional[float], Dict[str, StartupCost]]:
+    """(time recorded, program -> cost) of the last login; (None, {}) if there is none."""
+    try:
+        with open(PROFILE_PATH) as f:
+            profile = json.load(f)
+        return profile["recorded"], {program: StartupCost(cost["started"], cost["first_window"],
+                                                          cost["cpu_seconds"])
+                                     for program, cost in profile["programs"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, {}
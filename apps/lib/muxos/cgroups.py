@@ -0,0 +1,201 @@
+"""Per-user and per-session usage from systemd's cgroup v2 tree.
+
+systemd puts every login session in
+user.slice/user-<uid>.slice/session-<id>.scope and the user's service
+manager in user@<uid>.service beside it. The kernel keeps running totals
+for every cgroup:
+
+    cpu.stat        usage_usec, CPU time of everything inside
+    memory.current  bytes charged, page cache included
+    io.stat         rbytes=/wbytes= per device (with IO accounting on)
+
+so who is using the machine costs a few small reads per user and session,
+however many processes they run. The files stay open and are re-read
+with os.pread(), as ProcSampler does with /proc.
+
+On cgroup v1, or without systemd user slices, UserSampler sums the
+ProcessSample list it is given per UID instead; there is no IO then.
+"""
+
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .procfs import ProcessSample, _pread_all, user_name
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+SESSIONS_DIR = "/run/systemd/sessions"
+
+
+class CgroupCounters(NamedTuple):
+    cpu_usec: int
+    memory: int
+    read_bytes: Optional[int]
+    write_bytes: Optional[int]
+
+
+class UserUsage(NamedTuple):
+    uid: int
+    user: str
+    session: str  # "" for the total of the user
+    cpu_percent: float  # relative to one core, like the process list
+    memory: int
+    read_rate: Optional[float]  # bytes/s, None without IO accounting
+    write_rate: Optional[float]
+
+
+def parse_cpu_stat(data: bytes) -> int:
+    for line in data.split(b"\n"):
+        if line.startswith(b"usage_usec "):
+            return int(line.split()[1])
+    raise ValueError("no usage_usec in cpu.stat")
+
+
+def parse_io_stat(data: bytes) -> Tuple[int, int]:
+    """Bytes read and written, summed over all devices."""
+    read = written = 0
+    for line in data.split(b"\n"):
+        for field in line.split()[1:]:
+            key, _, value = field.partition(b"=")
+            if key == b"rbytes":
+                read += int(value)
+            elif key == b"wbytes":
+                written += int(value)
+    return read, written
+
+
+class UserSampler:
+    def __init__(self, root: str = CGROUP_ROOT):
+        self.slice_dir = os.path.join(root, "user.slice")
+        self.available = (os.path.exists(os.path.join(root, "cgroup.controllers"))
+                          and os.path.isdir(self.slice_dir))
+        self._fds: Dict[str, int] = {}
+        self._last: Dict[str, CgroupCounters] = {}
+        self._last_time: Optional[float] = None
+        self._session_types: Dict[str, str] = {}
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def _read(self, path: str) -> Optional[bytes]:
+        fd = self._fds.get(path)
+        try:
+            if fd is None:
+                fd = os.open(path, os.O_RDONLY)
+                self._fds[path] = fd
+            return _pread_all(fd)
+        except OSError:
+            if fd is not None:
+                os.close(self._fds.pop(path))
+            return None
+
+    def _forget(self, cgroup: str) -> None:
+        for name in ("cpu.stat", "memory.current", "io.stat"):
+            fd = self._fds.pop(os.path.join(cgroup, name), None)
+            if fd is not None:
+                os.close(fd)
+
+    def read_counters(self, cgroup: str) -> Optional[CgroupCounters]:
+        """None when the cgroup is gone."""
+        cpu = self._read(os.path.join(cgroup, "cpu.stat"))
+        memory = self._read(os.path.join(cgroup, "memory.current"))
+        if cpu is None or memory is None:
+            return None
+        io = self._read(os.path.join(cgroup, "io.stat"))
+        try:
+            read, written = parse_io_stat(io) if io is not None else (None, None)
+            return CgroupCounters(parse_cpu_stat(cpu), int(memory), read, written)
+        except ValueError:
+            return None
+
+    def session_label(self, session: str) -> str:
+        kind = self._session_types.get(session)
+        if kind is None:
+            kind = ""
+            try:
+                with open(os.path.join(SESSIONS_DIR, session)) as f:
+                    for line in f:
+                        if line.startswith("TYPE="):
+                            kind = line[len("TYPE="):].strip()
+            except OSError:
+                pass
+            self._session_types[session] = kind
+        return f"Session {session} ({kind})" if kind else f"Session {session}"
+
+    def cgroups(self) -> List[Tuple[int, str, str]]:
+        """(uid, session label, path); the user slice itself comes first, labelled ""."""
+        found = []
+        try:
+            users = os.listdir(self.slice_dir)
+        except OSError:
+            return found
+        for name in sorted(users):
+            if not (name.startswith("user-") and name.endswith(".slice")):
+                continue
+            try:
+                uid = int(name[len("user-"):-len(".slice")])
+            except ValueError:
+                continue
+            path = os.path.join(self.slice_dir, name)
+            found.append((uid, "", path))
+            try:
+                children = sorted(os.listdir(path))
+            except OSError:
+                continue
+            for child in children:
+                if child.startswith("session-") and child.endswith(".scope"):
+                    label = self.session_label(child[len("session-"):-len(".scope")])
+                elif child.startswith("user@") and child.endswith(".service"):
+                    label = "Services"
+                else:
+                    continue
+                found.append((uid, label, os.path.join(path, child)))
+        return found
+
+    def sample(self, processes: Optional[List[ProcessSample]] = None) -> List[UserUsage]:
+        """Current usage. processes is only read when cgroups are not available."""
+        if not self.available:
+            return self.sample_processes(processes or [])
+
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        current: Dict[str, CgroupCounters] = {}
+        usage = []
+        for uid, session, path in self.cgroups():
+            counters = self.read_counters(path)
+            if counters is None:
+                self._forget(path)
+                continue
+            current[path] = counters
+            last = self._last.get(path)
+            cpu = read_rate = write_rate = 0.0
+            if last is not None and elapsed > 0:
+                cpu = 100.0 * (counters.cpu_usec - last.cpu_usec) / (elapsed * 1e6)
+                if counters.read_bytes is not None and last.read_bytes is not None:
+                    # A removed device drops out of io.stat; never show a negative rate
+                    read_rate = max(0.0, (counters.read_bytes - last.read_bytes) / elapsed)
+                    write_rate = max(0.0, (counters.write_bytes - last.write_bytes) / elapsed)
+            if counters.read_bytes is None:
+                read_rate = write_rate = None
+            usage.append(UserUsage(uid, user_name(uid), session, max(0.0, cpu), counters.memory,
+                                   read_rate, write_rate))
+
+        # Close the files of sessions that ended
+        for path in self._last.keys() - current.keys():
+            self._forget(path)
+        self._last = current
+        self._last_time = now
+        return usage
+
+    @staticmethod
+    def sample_processes(processes: List[ProcessSample]) -> List[UserUsage]:
+        """Fallback: CPU and RSS of every process added up per UID."""
+        totals: Dict[int, List[float]] = {}
+        for proc in processes:
+            total = totals.setdefault(proc.uid, [0.0, 0])
+            total[0] += proc.cpu_percent
+            total[1] += proc.rss
+        return [UserUsage(uid, user_name(uid), "", cpu, rss, None, None)
+                for uid, (cpu, rss) in sorted(totals.items())]
@@ -0,0 +1,91 @@
+"""Fixed-size time-series history for the MuxOS monitors.
+
+Each metric is stored in a preallocated array.array ring, so memory use is
+decided when the buffer is created and stays flat however long a monitor
+runs: one hour of 1 s samples is 3600 floats, about 14 KB per metric.
+"""
+
+from array import array
+from typing import Dict, Iterable, List
+
+
+class RingBuffer:
+    """Fixed-capacity circular buffer of floats, oldest sample first."""
+
+    __slots__ = ("capacity", "_data", "_start", "_count")
+
+    def __init__(self, capacity: int, typecode: str = "f"):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = array(typecode, bytes(array(typecode).itemsize * capacity))
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float) -> None:
+        if self._count < self.capacity:
+            self._data[(self._start + self._count) % self.capacity] = value
+            self._count += 1
+        else:
+            self._data[self._start] = value
+            self._start = (self._start + 1) % self.capacity
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.append(value)
+
+    def __getitem__(self, index: int) -> float:
+        """Sample by age order; negative indexes count back from the newest."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("ring buffer index out of range")
+        return self._data[(self._start + index) % self.capacity]
+
+    def latest(self, n: int) -> List[float]:
+        """The newest n samples (or fewer), oldest first."""
+        n = min(n, self._count)
+        first = self._count - n
+        return [self[i] for i in range(first, self._count)]
+
+    def values(self) -> List[float]:
+        return self.latest(self._count)
+
+    def max(self, n: int = 0) -> float:
+        samples = self.latest(n) if n else self.values()
+        return max(samples) if samples else 0.0
+
+    def clear(self) -> None:
+        self._start = 0
+        self._count = 0
+
+
+class History:
+    """Named ring buffers that all share one capacity.
+
+    Per-core CPU buffers are created on first use, since the core count is
+    only known once the first sample arrives.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.series: Dict[str, RingBuffer] = {}
+
+    def __getitem__(self, name: str) -> RingBuffer:
+        buffer = self.series.get(name)
+        if buffer is None:
+            buffer = self.series[name] = RingBuffer(self.capacity)
+        return buffer
+
+    def append(self, name: str, value: float) -> None:
+        self[name].append(value)
+
+    def append_cores(self, per_core: List[float]) -> None:
+        for i, value in enumerate(per_core):
+            self[f"cpu{i}"].append(value)
+
+    def nbytes(self) -> int:
+        return sum(b.capacity * b._data.itemsize for b in self.series.values())
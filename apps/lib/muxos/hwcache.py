@@ -0,0 +1,197 @@
+"""Shared on-disk cache of the hardware inventory.
+
+Hardware hardly changes between runs, so the hardware detector and the
+enhanced monitor keep what muxos.hwprobe found in
+~/.cache/muxos/hardware.json and only probe a subsystem again when its
+signature changed. A signature is a cheap fingerprint of the sysfs
+entries behind the subsystem: the device names in its directories plus
+the attributes that tell one device from another in the same place
+(bound drivers, USB IDs and bus addresses, sizes, connector status and
+modes). Directory mtimes would be cheaper still, but sysfs does not
+keep them up to date.
+
+With pyudev installed, watch() also listens for udev events and drops
+just the subsystem that changed, so a running tool notices a plugged-in
+USB device without polling. Volatile figures (usage, temperatures, link
+state) are never cached; they are cheap to read live.
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from . import hwprobe
+
+try:
+    import pyudev
+except ImportError:
+    pyudev = None
+
+CACHE_VERSION = 1
+CACHE_PATH = os.path.expanduser("~/.cache/muxos/hardware.json")
+
+
+def _listing(*directories: str, links: str = "", attributes: tuple = ()) -> List[str]:
+    """Entry names of directories, each followed by the target of links and the given attributes."""
+    signature = []
+    for directory in directories:
+        for name in hwprobe._listdir(directory):
+            path = os.path.join(directory, name)
+            signature.append(name)
+            if links:
+                signature.append(hwprobe._link_name(os.path.join(path, links)))
+            signature.extend(hwprobe.read_sysfs(os.path.join(path, attribute)) for attribute in attributes)
+    return signature
+
+
+def _cpu_signature():
+    return [hwprobe.read_sysfs("/sys/devices/system/cpu/online"),
+            hwprobe.read_sysfs("/sys/devices/system/cpu/cpu0/cpufreq/cpuinfo_max_freq")]
+
+
+def _block_signature():
+    # Partitions appear as subdirectories; mounts change the mountpoint column
+    return (_listing("/sys/block", attributes=("size",))
+            + [part for disk in hwprobe._listdir("/sys/block")
+               for part in hwprobe._listdir(os.path.join("/sys/block", disk)) if part[:1] != "."]
+            + [hwprobe.read_sysfs("/proc/mounts")])
+
+
+class Subsystem(NamedTuple):
+    probe: Callable[[], object]
+    signature: Callable[[], List[str]]
+    item: type  # NamedTuple the probe returns, or a list of
+    single: bool = False
+
+
+SUBSYSTEMS: Dict[str, Subsystem] = {
+    "cpu": Subsystem(hwprobe.cpu_info, _cpu_signature, hwprobe.CpuInfo, single=True),
+    "pci": Subsystem(hwprobe.pci_devices, lambda: _listing("/sys/bus/pci/devices", links="driver"),
+                     hwprobe.PciDevice),
+    # Another device in the same port keeps the entry name but not the IDs;
+    # devnum changes on every replug
+    "usb": Subsystem(hwprobe.usb_devices,
+                     lambda: _listing("/sys/bus/usb/devices",
+                                      attributes=("idVendor", "idProduct", "busnum", "devnum")),
+                     hwprobe.UsbDevice),
+    "block": Subsystem(hwprobe.block_devices, _block_signature, hwprobe.BlockDevice),
+    # A different monitor on the same connector offers different modes
+    "displays": Subsystem(hwprobe.displays,
+                          lambda: _listing("/sys/class/drm", attributes=("status", "modes")),
+                          hwprobe.Display),
+    "sound": Subsystem(hwprobe.sound_devices, lambda: _listing("/proc/asound", "/sys/class/sound"),
+                       hwprobe.SoundDevice),
+}
+
+# udev subsystem -> cache entries it invalidates ("net" has none, but tools want to hear about it)
+UDEV_SUBSYSTEMS = {
+    "pci": ("pci",), "usb": ("usb",), "block": ("block",), "drm": ("displays",),
+    "sound": ("sound",), "cpu": ("cpu",), "net": (),
+}
+
+
+class HardwareCache:
+    """Hardware inventory per subsystem, from disk when nothing changed.
+
+    get() is safe to call from several threads; probes of different
+    subsystems run in parallel.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, dict] = {}
+        self.observer = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # A new kernel may name drivers and devices differently
+        if (isinstance(data, dict) and data.get("version") == CACHE_VERSION
+                and data.get("kernel") == os.uname().release):
+            self.entries = data.get("subsystems", {})
+
+    def _save(self) -> None:
+        data = {"version": CACHE_VERSION, "kernel": os.uname().release, "subsystems": self.entries}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # a read-only home only costs the next start a re-probe
+
+    def _decode(self, subsystem: Subsystem, data):
+        try:
+            if subsystem.single:
+                return subsystem.item(*data)
+            return [subsystem.item(*item) for item in data]
+        except TypeError:
+            return None  # written by an older layout of the tuple
+
+    def get(self, name: str):
+        """Current inventory of a subsystem, re-probed only when its signature changed."""
+        subsystem = SUBSYSTEMS[name]
+        signature = subsystem.signature()
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry is not None and entry.get("signature") == signature:
+            value = self._decode(subsystem, entry.get("data"))
+            if value is not None:
+                return value
+        value = subsystem.probe()
+        with self.lock:
+            self.entries[name] = {"signature": signature, "data": value}
+            self._save()
+        return value
+
+    def invalidate(self, name: str) -> None:
+        with self.lock:
+            self.entries.pop(name, None)
+
+    def watch(self, on_change: Callable[[str], None]) -> bool:
+        """Call on_change(udev subsystem) from a background thread on hotplug.
+
+        Returns False when pyudev is not installed; signatures still catch
+        every change at the next get().
+        """
+        if pyudev is None or self.observer is not None:
+            return self.observer is not None
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            for subsystem in UDEV_SUBSYSTEMS:
+                monitor.filter_by(subsystem)
+        except (OSError, ValueError):
+            return False
+
+        def on_event(device):
+            subsystem = device.subsystem
+            for name in UDEV_SUBSYSTEMS.get(subsystem, ()):
+                self.invalidate(name)
+            on_change(subsystem)
+
+        self.observer = pyudev.MonitorObserver(monitor, callback=on_event, name="muxos-udev")
+        self.observer.start()
+        return True
+
+    def close(self) -> None:
+        if self.observer is not None:
+            self.observer.send_stop()
+            self.observer = None
+
+
+_shared: Optional[HardwareCache] = None
+
+
+def shared_cache() -> HardwareCache:
+    """One cache per process, shared by every window that shows hardware."""
+    global _shared
+    if _shared is None:
+        _shared = HardwareCache()
+    return _shared
@@ -0,0 +1,228 @@
+"""Live hardware sensors from /sys/class/hwmon, cheap enough for 1 Hz.
+
+Every hwmon chip exposes one file per channel and reading:
+
+    temp<n>_input   millidegree Celsius      _max, _crit thresholds
+    fan<n>_input    RPM                      _min
+    in<n>_input     millivolts               _min, _max
+    power<n>_input  microwatts (or _average)
+    curr<n>_input   milliamperes
+
+HwmonSampler finds the channels and their thresholds once; after that a
+sample is one os.pread() per channel on a descriptor kept open, as
+ProcSampler does with /proc. Batteries (capacity and power draw) come
+from /sys/class/power_supply, and thermal zones stand in for
+temperatures on machines without a hwmon temperature.
+
+Each channel keeps its minimum, maximum and average since reset(). A
+reading is flagged when it crosses a threshold the driver reports, or a
+limit the caller sets per kind (limits["temp"] = 85).
+"""
+
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+HWMON_ROOT = "/sys/class/hwmon"
+POWER_SUPPLY_ROOT = "/sys/class/power_supply"
+THERMAL_ROOT = "/sys/class/thermal"
+
+# kind -> (divisor of the raw value, unit)
+KINDS = {
+    "temp": (1000.0, "°C"),
+    "fan": (1.0, "RPM"),
+    "in": (1000.0, "V"),
+    "power": (1000000.0, "W"),
+    "curr": (1000.0, "A"),
+    "battery": (1.0, "%"),
+}
+
+
+class Channel(NamedTuple):
+    key: str  # unique, e.g. "hwmon2/temp1"
+    chip: str
+    label: str
+    kind: str  # one of KINDS
+    path: str
+    low: Optional[float]
+    high: Optional[float]
+    critical: Optional[float]
+
+    @property
+    def unit(self) -> str:
+        return KINDS[self.kind][1]
+
+
+class Reading(NamedTuple):
+    channel: Channel
+    value: float
+    minimum: float
+    average: float
+    maximum: float
+    alert: str  # "", "low", "high" or "critical"
+
+
+def _read_value(path: str, kind: str) -> Optional[float]:
+    """A threshold file in the unit of kind; None when missing or zero (unset)."""
+    try:
+        with open(path) as f:
+            value = int(f.read().strip()) / KINDS[kind][0]
+    except (OSError, ValueError):
+        return None
+    return value or None
+
+
+def _read_text(path: str, default: str = "") -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def _listdir(path: str) -> List[str]:
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
+
+
+def hwmon_channels(root: str = HWMON_ROOT) -> List[Channel]:
+    channels = []
+    for hwmon in _listdir(root):
+        path = os.path.join(root, hwmon)
+        chip = _read_text(os.path.join(path, "name"), hwmon)
+        entries = _listdir(path)
+        names = set(entries)
+        for entry in entries:
+            prefix, _, reading = entry.partition("_")
+            kind = prefix.rstrip("0123456789")
+            if kind not in KINDS or kind == "battery" or not prefix[len(kind):]:
+                continue
+            # Power meters without _input only report an average
+            if reading != "input" and not (kind == "power" and reading == "average"
+                                            and f"{prefix}_input" not in names):
+                continue
+            label = _read_text(os.path.join(path, f"{prefix}_label"), prefix)
+            low, high, critical = (_read_value(os.path.join(path, f"{prefix}_{name}"), kind)
+                                   for name in ("min", "max", "crit"))
+            channels.append(Channel(f"{hwmon}/{prefix}", chip, label, kind, os.path.join(path, entry),
+                                    low, high, critical))
+    return channels
+
+
+def battery_channels(root: str = POWER_SUPPLY_ROOT) -> List[Channel]:
+    channels = []
+    for supply in _listdir(root):
+        path = os.path.join(root, supply)
+        if _read_text(os.path.join(path, "type")) != "Battery":
+            continue
+        if os.path.exists(os.path.join(path, "capacity")):
+            channels.append(Channel(f"{supply}/capacity", supply, "Charge", "battery",
+                                    os.path.join(path, "capacity"), None, None, None))
+        if os.path.exists(os.path.join(path, "power_now")):
+            channels.append(Channel(f"{supply}/power", supply, "Power draw", "power",
+                                    os.path.join(path, "power_now"), None, None, None))
+    return channels
+
+
+def thermal_channels(root: str = THERMAL_ROOT) -> List[Channel]:
+    channels = []
+    for zone in _listdir(root):
+        if not zone.startswith("thermal_zone"):
+            continue
+        path = os.path.join(root, zone)
+        critical = None
+        for entry in _listdir(path):
+            if entry.endswith("_type") and _read_text(os.path.join(path, entry)) == "critical":
+                critical = _read_value(os.path.join(path, entry[:-len("_type")] + "_temp"), "temp")
+        channels.append(Channel(zone, _read_text(os.path.join(path, "type"), zone), zone, "temp",
+                                os.path.join(path, "temp"), None, None, critical))
+    return channels
+
+
+class HwmonSampler:
+    """Reads every sensor channel; call sample() at the rate wanted."""
+
+    def __init__(self, hwmon_root: str = HWMON_ROOT, power_supply_root: str = POWER_SUPPLY_ROOT,
+                 thermal_root: str = THERMAL_ROOT):
+        self.channels = hwmon_channels(hwmon_root)
+        if not any(channel.kind == "temp" for channel in self.channels):
+            self.channels += thermal_channels(thermal_root)
+        self.channels += battery_channels(power_supply_root)
+        self.power_supply_root = power_supply_root
+        self.limits: Dict[str, float] = {}  # kind -> alert above this value
+        self._fds: Dict[str, int] = {}
+        self._stats: Dict[str, List[float]] = {}  # key -> [min, max, total, count]
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def reset(self) -> None:
+        """Start the minimum, maximum and average over."""
+        self._stats.clear()
+
+    def read(self, channel: Channel) -> Optional[float]:
+        """Current value; None while the device does not answer (asleep, unplugged)."""
+        fd = self._fds.get(channel.key)
+        try:
+            if fd is None:
+                fd = os.open(channel.path, os.O_RDONLY)
+                self._fds[channel.key] = fd
+            return int(os.pread(fd, 32, 0)) / KINDS[channel.kind][0]
+        except (OSError, ValueError):
+            # Reopened next time: a driver reloaded behind the same path
+            if fd is not None:
+                os.close(self._fds.pop(channel.key))
+            return None
+
+    def alert(self, channel: Channel, value: float) -> str:
+        if channel.critical is not None and value >= channel.critical:
+            return "critical"
+        limit = self.limits.get(channel.kind)
+        if (channel.high is not None and value >= channel.high) or (limit is not None and value >= limit):
+            return "high"
+        if channel.low is not None and value <= channel.low:
+            return "low"
+        return ""
+
+    def sample(self) -> List[Reading]:
+        readings = []
+        for channel in self.channels:
+            value = self.read(channel)
+            if value is None:
+                continue
+            stats = self._stats.get(channel.key)
+            if stats is None:
+                stats = self._stats[channel.key] = [value, value, 0.0, 0]
+            stats[0] = min(stats[0], value)
+            stats[1] = max(stats[1], value)
+            stats[2] += value
+            stats[3] += 1
+            readings.append(Reading(channel, value, stats[0], stats[2] / stats[3], stats[1],
+                                    self.alert(channel, value)))
+        return readings
+
+    def battery_status(self) -> List[Tuple[str, str]]:
+        """(battery, "Charging"/"Discharging"/...) for each battery."""
+        states = []
+        for name in sorted({channel.chip for channel in self.channels if channel.kind == "battery"}):
+            key = f"{name}/status"
+            try:
+                if key not in self._fds:
+                    self._fds[key] = os.open(os.path.join(self.power_supply_root, name, "status"), os.O_RDONLY)
+                states.append((name, os.pread(self._fds[key], 32, 0).decode().strip()))
+            except OSError:
+                if key in self._fds:
+                    os.close(self._fds.pop(key))
+                states.append((name, "Unknown"))
+        return states
+
+
+def format_value(value: float, kind: str) -> str:
+    if kind in ("fan", "battery"):
+        return f"{value:.0f} {KINDS[kind][1]}"
+    if kind == "temp":
+        return f"{value:.1f} {KINDS[kind][1]}"
+    return f"{value:.2f} {KINDS[kind][1]}"
@@ -0,0 +1,424 @@
+"""Hardware inventory read straight from sysfs and procfs.
+
+Everything lspci, lsusb, lscpu, lsblk, lsmod, free, df, ip link, aplay -l
+and xrandr --query print is in files the kernel already exports:
+
+    /sys/bus/pci/devices     PCI functions, IDs, class, bound driver
+    /sys/bus/usb/devices     USB devices with their descriptor strings
+    /proc/cpuinfo, /sys/devices/system/cpu
+    /proc/meminfo, /proc/modules, /proc/mounts
+    /sys/class/net, /sys/block, /sys/class/drm
+    /proc/asound             sound cards and PCM devices
+
+Sensors (what `sensors` prints) change by the second; muxos.hwmon reads
+them.
+
+Reading them costs a few milliseconds and no forks. PCI and USB IDs are
+turned into names with the pci.ids/usb.ids databases when installed;
+only the IDs that are present get looked up. Every probe returns empty
+results instead of raising when a file is missing, so it works in
+containers and on machines without a given bus.
+"""
+
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+PCI_IDS = ("/usr/share/misc/pci.ids", "/usr/share/hwdata/pci.ids")
+USB_IDS = ("/usr/share/misc/usb.ids", "/usr/share/hwdata/usb.ids", "/var/lib/usbutils/usb.ids")
+
+PCI_CLASSES = {
+    0x01: "Storage controller", 0x02: "Network controller", 0x03: "Display controller",
+    0x04: "Multimedia controller", 0x05: "Memory controller", 0x06: "Bridge",
+    0x07: "Communication controller", 0x08: "System peripheral", 0x09: "Input controller",
+    0x0c: "Serial bus controller", 0x0d: "Wireless controller", 0x10: "Encryption controller",
+    0x11: "Signal processing controller", 0x12: "Processing accelerator",
+}
+
+
+def read_sysfs(path: str, default: str = "") -> str:
+    """Stripped contents of a sysfs/procfs attribute, default if unreadable."""
+    try:
+        with open(path, "r", errors="replace") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def _read_int(path: str, default: int = 0) -> int:
+    try:
+        return int(read_sysfs(path), 0)
+    except ValueError:
+        return default
+
+
+def _listdir(path: str) -> List[str]:
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
+
+
+def _link_name(path: str) -> str:
+    """Basename of a symlink target, such as the driver bound to a device."""
+    try:
+        return os.path.basename(os.readlink(path))
+    except OSError:
+        return ""
+
+
+def lookup_ids(paths: Iterable[str], wanted: Set[Tuple[int, Optional[int]]]) -> Dict[Tuple[int, Optional[int]], str]:
+    """Names for (vendor, device) pairs from a pci.ids/usb.ids style file.
+
+    (vendor, None) asks for the vendor name alone. The file lists vendors
+    in ascending order, so the scan stops after the last wanted vendor.
+    """
+    names: Dict[Tuple[int, Optional[int]], str] = {}
+    if not wanted:
+        return names
+    vendors = {vendor for vendor, _ in wanted}
+    last = max(vendors)
+    for path in paths:
+        try:
+            f = open(path, "r", encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        with f:
+            vendor = None
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                if not line.startswith("\t"):
+                    if line.startswith("C "):
+                        break  # device classes follow the vendor list
+                    try:
+                        vendor = int(line[:4], 16)
+                    except ValueError:
+                        vendor = None
+                        continue
+                    if vendor > last:
+                        break
+                    if vendor in vendors:
+                        names[(vendor, None)] = line[4:].strip()
+                    else:
+                        vendor = None
+                elif vendor is not None and not line.startswith("\t\t"):
+                    try:
+                        device = int(line[1:5], 16)
+                    except ValueError:
+                        continue
+                    if (vendor, device) in wanted:
+                        names[(vendor, device)] = line[5:].strip()
+        return names
+    return names
+
+
+class PciDevice(NamedTuple):
+    slot: str
+    vendor_id: int
+    device_id: int
+    class_id: int
+    driver: str
+    vendor: str
+    name: str
+
+    @property
+    def description(self) -> str:
+        kind = PCI_CLASSES.get(self.class_id >> 16, "Device")
+        product = f"{self.vendor} {self.name}".strip() or f"{self.vendor_id:04x}:{self.device_id:04x}"
+        return f"{self.slot} {kind}: {product}"
+
+
+def pci_devices() -> List[PciDevice]:
+    base = "/sys/bus/pci/devices"
+    raw = []
+    for slot in _listdir(base):
+        path = os.path.join(base, slot)
+        raw.append((slot, _read_int(os.path.join(path, "vendor")), _read_int(os.path.join(path, "device")),
+                    _read_int(os.path.join(path, "class")), _link_name(os.path.join(path, "driver"))))
+    wanted = {(v, None) for _, v, _, _, _ in raw} | {(v, d) for _, v, d, _, _ in raw}
+    names = lookup_ids(PCI_IDS, wanted)
+    return [PciDevice(slot, vendor, device, class_id, driver, names.get((vendor, None), ""),
+                      names.get((vendor, device), ""))
+            for slot, vendor, device, class_id, driver in raw]
+
+
+def graphics_cards(devices: Optional[List[PciDevice]] = None) -> List[PciDevice]:
+    return [d for d in (devices if devices is not None else pci_devices()) if d.class_id >> 16 == 0x03]
+
+
+class UsbDevice(NamedTuple):
+    bus: int
+    address: int
+    vendor_id: int
+    product_id: int
+    manufacturer: str
+    product: str
+    speed: str  # Mb/s
+
+    @property
+    def description(self) -> str:
+        name = f"{self.manufacturer} {self.product}".strip()
+        return (f"Bus {self.bus:03d} Device {self.address:03d}: ID {self.vendor_id:04x}:{self.product_id:04x} "
+                f"{name}").rstrip()
+
+
+def usb_devices() -> List[UsbDevice]:
+    base = "/sys/bus/usb/devices"
+    devices = []
+    for entry in _listdir(base):
+        path = os.path.join(base, entry)
+        if ":" in entry or not os.path.exists(os.path.join(path, "idVendor")):
+            continue  # interfaces, not devices
+        devices.append(UsbDevice(
+            _read_int(os.path.join(path, "busnum")), _read_int(os.path.join(path, "devnum")),
+            int(read_sysfs(os.path.join(path, "idVendor"), "0"), 16),
+            int(read_sysfs(os.path.join(path, "idProduct"), "0"), 16),
+            read_sysfs(os.path.join(path, "manufacturer")), read_sysfs(os.path.join(path, "product")),
+            read_sysfs(os.path.join(path, "speed")),
+        ))
+    # Devices that do not report strings get them from usb.ids
+    missing = {(d.vendor_id, d.product_id) for d in devices if not d.product}
+    names = lookup_ids(USB_IDS, missing | {(v, None) for v, _ in missing})
+    devices = [d._replace(manufacturer=d.manufacturer or names.get((d.vendor_id, None), ""),
+                          product=d.product or names.get((d.vendor_id, d.product_id), ""))
+               for d in devices]
+    return sorted(devices, key=lambda d: (d.bus, d.address))
+
+
+class CpuInfo(NamedTuple):
+    model: str
+    architecture: str
+    logical: int
+    cores: int
+    sockets: int
+    max_mhz: float
+    min_mhz: float
+
+
+def cpu_info() -> CpuInfo:
+    model = ""
+    physical = set()
+    sockets = set()
+    logical = 0
+    for block in read_sysfs("/proc/cpuinfo").split("\n\n"):
+        fields = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(":")
+            fields[key.strip()] = value.strip()
+        if "processor" not in fields:
+            continue
+        logical += 1
+        model = model or fields.get("model name") or fields.get("Model") or fields.get("cpu model", "")
+        socket = fields.get("physical id", "0")
+        sockets.add(socket)
+        physical.add((socket, fields.get("core id", str(logical))))
+    cpufreq = "/sys/devices/system/cpu/cpu0/cpufreq"
+    return CpuInfo(model, os.uname().machine, logical or (os.cpu_count() or 1),
+                   len(physical) or logical, len(sockets) or 1,
+                   _read_int(os.path.join(cpufreq, "cpuinfo_max_freq")) / 1000,
+                   _read_int(os.path.join(cpufreq, "cpuinfo_min_freq")) / 1000)
+
+
+def meminfo() -> Dict[str, int]:
+    """/proc/meminfo in bytes (the HugePages_ counts stay counts), in file order."""
+    values = {}
+    for line in read_sysfs("/proc/meminfo").splitlines():
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[0].isdigit():
+            values[key] = int(parts[0]) * (1024 if len(parts) > 1 else 1)
+    return values
+
+
+class KernelModule(NamedTuple):
+    name: str
+    size: int
+    used_by: List[str]
+
+
+def kernel_modules() -> List[KernelModule]:
+    modules = []
+    for line in read_sysfs("/proc/modules").splitlines():
+        fields = line.split()
+        if len(fields) >= 4:
+            users = [user for user in fields[3].split(",") if user and user != "-"]
+            modules.append(KernelModule(fields[0], int(fields[1]), users))
+    return modules
+
+
+class NetInterface(NamedTuple):
+    name: str
+    mac: str
+    state: str
+    mtu: int
+    speed: int  # Mb/s, 0 when unknown
+    wireless: bool
+    driver: str
+
+
+def net_interfaces() -> List[NetInterface]:
+    base = "/sys/class/net"
+    interfaces = []
+    for name in _listdir(base):
+        path = os.path.join(base, name)
+        speed = _read_int(os.path.join(path, "speed"))  # EINVAL while the link is down
+        interfaces.append(NetInterface(
+            name, read_sysfs(os.path.join(path, "address")), read_sysfs(os.path.join(path, "operstate")),
+            _read_int(os.path.join(path, "mtu")), max(0, speed),
+            os.path.exists(os.path.join(path, "wireless")) or os.path.exists(os.path.join(path, "phy80211")),
+            _link_name(os.path.join(path, "device", "driver")),
+        ))
+    return interfaces
+
+
+def bluetooth_adapters() -> List[Tuple[str, str]]:
+    """(name, address) of each HCI adapter."""
+    base = "/sys/class/bluetooth"
+    return [(name, read_sysfs(os.path.join(base, name, "address")))
+            for name in _listdir(base) if ":" not in name]
+
+
+class Mount(NamedTuple):
+    device: str
+    mountpoint: str
+    fstype: str
+
+
+def mounts() -> List[Mount]:
+    found = []
+    for line in read_sysfs("/proc/mounts").splitlines():
+        fields = line.split()
+        if len(fields) >= 3:
+            # Spaces in paths are escaped as \040
+            found.append(Mount(fields[0], fields[1].replace("\\040", " "), fields[2]))
+    return found
+
+
+class BlockDevice(NamedTuple):
+    name: str
+    size: int  # bytes
+    kind: str  # "disk" or "part"
+    model: str
+    removable: bool
+    rotational: bool
+    mountpoint: str
+    fstype: str
+
+
+def block_devices() -> List[BlockDevice]:
+    """Disks and their partitions, like lsblk; empty loop and ram devices are left out."""
+    mounted = {}
+    for mount in mounts():
+        if mount.device.startswith("/dev/"):
+            mounted.setdefault(os.path.basename(mount.device), mount)
+
+    def entry(name, path, kind, model, removable, rotational):
+        mount = mounted.get(name)
+        return BlockDevice(name, _read_int(os.path.join(path, "size")) * 512, kind, model, removable,
+                           rotational, mount.mountpoint if mount else "", mount.fstype if mount else "")
+
+    base = "/sys/block"
+    devices = []
+    for name in _listdir(base):
+        path = os.path.join(base, name)
+        if name.startswith("ram") or (name.startswith("loop") and not _read_int(os.path.join(path, "size"))):
+            continue
+        model = read_sysfs(os.path.join(path, "device", "model"))
+        removable = read_sysfs(os.path.join(path, "removable")) == "1"
+        rotational = read_sysfs(os.path.join(path, "queue", "rotational")) == "1"
+        devices.append(entry(name, path, "disk", model, removable, rotational))
+        for part in _listdir(path):
+            if os.path.exists(os.path.join(path, part, "partition")):
+                devices.append(entry(part, os.path.join(path, part), "part", "", removable, rotational))
+    return devices
+
+
+class FilesystemUsage(NamedTuple):
+    device: str
+    mountpoint: str
+    fstype: str
+    size: int
+    used: int
+    available: int
+
+
+def filesystem_usage() -> List[FilesystemUsage]:
+    """statvfs() of every mounted block device, like df."""
+    usage = []
+    seen = set()
+    for mount in mounts():
+        if not mount.device.startswith("/dev/") or mount.device in seen:
+            continue
+        try:
+            st = os.statvfs(mount.mountpoint)
+        except OSError:
+            continue
+        seen.add(mount.device)
+        size = st.f_blocks * st.f_frsize
+        usage.append(FilesystemUsage(mount.device, mount.mountpoint, mount.fstype, size,
+                                     size - st.f_bfree * st.f_frsize, st.f_bavail * st.f_frsize))
+    return usage
+
+
+class Display(NamedTuple):
+    connector: str
+    connected: bool
+    enabled: bool
+    modes: List[str]
+
+
+def displays() -> List[Display]:
+    """Connectors of every DRM card, with the modes the monitor offers (preferred first)."""
+    base = "/sys/class/drm"
+    found = []
+    for name in _listdir(base):
+        path = os.path.join(base, name)
+        status = read_sysfs(os.path.join(path, "status"))
+        if not status:
+            continue  # cards and render nodes, not connectors
+        found.append(Display(name.split("-", 1)[-1], status == "connected",
+                             read_sysfs(os.path.join(path, "enabled")) == "enabled",
+                             read_sysfs(os.path.join(path, "modes")).splitlines()))
+    return found
+
+
+class SoundDevice(NamedTuple):
+    card: int
+    device: int
+    name: str
+    playback: bool
+    capture: bool
+
+
+def sound_cards() -> str:
+    return read_sysfs("/proc/asound/cards")
+
+
+def sound_devices() -> List[SoundDevice]:
+    """PCM devices from /proc/asound/pcm, the list aplay -l and arecord -l print."""
+    devices = []
+    for line in read_sysfs("/proc/asound/pcm").splitlines():
+        fields = [field.strip() for field in line.split(":")]
+        try:
+            card, device = (int(n) for n in fields[0].split("-"))
+        except ValueError:
+            continue
+        devices.append(SoundDevice(card, device, fields[1] if len(fields) > 1 else "",
+                                   any(f.startswith("playback") for f in fields[2:]),
+                                   any(f.startswith("capture") for f in fields[2:])))
+    return devices
+
+
+def input_devices() -> List[Tuple[str, str]]:
+    """(name, phys) of each input device from /proc/bus/input/devices."""
+    devices = []
+    for block in read_sysfs("/proc/bus/input/devices").split("\n\n"):
+        name = phys = ""
+        for line in block.splitlines():
+            if line.startswith("N: Name="):
+                name = line[len("N: Name="):].strip('"')
+            elif line.startswith("P: Phys="):
+                phys = line[len("P: Phys="):]
+        if name:
+            devices.append((name, phys))
+    return devices
@@ -0,0 +1,178 @@
+"""Client side of the muxos-metricsd query protocol.
+
+The daemon listens on a Unix stream socket and speaks JSON lines: every
+request is one JSON object on one line, answered by one JSON line.
+
+    {"cmd": "snapshot", "processes": true}
+    {"cmd": "history", "series": ["cpu", "memory"], "step": 2}
+    {"cmd": "range", "start": 1700000000, "end": 1700086400}
+
+SnapshotSource is what the GUI monitors use. It asks the daemon when one
+is running and falls back to sampling /proc locally when not, so the apps
+work the same with or without the service.
+"""
+
+import json
+import socket
+import time
+from typing import Dict, List, Optional
+
+from .procfs import (DiskDeviceCounters, MemoryInfo, NetCounters, NicCounters,
+                     ProcessSample, ProcSampler, SwapInfo, SystemSnapshot)
+
+SOCKET_PATH = "/run/muxos/metricsd.sock"
+MAX_LINE = 64 * 1024
+RECONNECT_DELAY = 10
+
+
+def snapshot_to_dict(snapshot: SystemSnapshot) -> Dict:
+    """Compact JSON form; the NamedTuples become plain lists."""
+    return {
+        "timestamp": snapshot.timestamp,
+        "cpu_percent": snapshot.cpu_percent,
+        "cpu_per_core": snapshot.cpu_per_core,
+        "memory": list(snapshot.memory),
+        "swap": list(snapshot.swap),
+        "load_avg": list(snapshot.load_avg),
+        "uptime": snapshot.uptime,
+        "net_io": list(snapshot.net_io),
+        "processes": [list(p) for p in snapshot.processes] if snapshot.processes is not None else None,
+    }
+
+
+def snapshot_from_dict(data: Dict) -> SystemSnapshot:
+    processes = data.get("processes")
+    return SystemSnapshot(
+        timestamp=data["timestamp"],
+        cpu_percent=data["cpu_percent"],
+        cpu_per_core=data["cpu_per_core"],
+        memory=MemoryInfo(*data["memory"]),
+        swap=SwapInfo(*data["swap"]),
+        load_avg=tuple(data["load_avg"]),
+        uptime=data["uptime"],
+        net_io=NetCounters(*data["net_io"]),
+        processes=[ProcessSample(*p) for p in processes] if processes is not None else None,
+    )
+
+
+class MetricsClient:
+    """One persistent connection to muxos-metricsd."""
+
+    def __init__(self, path: str = SOCKET_PATH, timeout: float = 2.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path)
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile("rb")
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+    def request(self, **request) -> Dict:
+        self.sock.sendall(json.dumps(request, separators=(",", ":")).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("metrics daemon closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        return reply
+
+    def snapshot(self, processes: bool = True) -> SystemSnapshot:
+        return snapshot_from_dict(self.request(cmd="snapshot", processes=processes))
+
+    def history(self, series: List[str], step: int = 1) -> Dict[str, List[float]]:
+        """Stored samples, oldest first, averaged over step seconds."""
+        return self.request(cmd="history", series=series, step=step)["series"]
+
+    def range(self, start: float, end: float, tier: Optional[str] = None) -> Dict:
+        """Rows from the persistent store: {"tier", "columns", "rows"}."""
+        return self.request(cmd="range", start=start, end=end, tier=tier)
+
+
+class SnapshotSource:
+    """Snapshots from the metrics daemon, or from a local ProcSampler.
+
+    Offers the same sample()/read_processes() calls as ProcSampler. If the
+    daemon goes away the source switches to local sampling and retries
+    the socket every RECONNECT_DELAY seconds.
+    """
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+        self.client: Optional[MetricsClient] = None
+        self.local: Optional[ProcSampler] = None
+        self.next_connect = 0.0
+        self.connect()
+
+    @property
+    def remote(self) -> bool:
+        return self.client is not None
+
+    def connect(self) -> None:
+        now = time.monotonic()
+        if self.client is not None or now < self.next_connect:
+            return
+        try:
+            self.client = MetricsClient(self.path)
+        except OSError:
+            self.next_connect = now + RECONNECT_DELAY
+
+    def disconnect(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self.next_connect = time.monotonic() + RECONNECT_DELAY
+
+    def local_sampler(self) -> ProcSampler:
+        if self.local is None:
+            self.local = ProcSampler()
+            self.local.sample()
+        return self.local
+
+    def sample(self, processes: bool = True) -> SystemSnapshot:
+        self.connect()
+        if self.client is not None:
+            try:
+                return self.client.snapshot(processes)
+            except (OSError, ValueError):
+                self.disconnect()
+        return self.local_sampler().sample(processes)
+
+    def read_processes(self) -> List[ProcessSample]:
+        self.connect()
+        if self.client is not None:
+            try:
+                return self.client.snapshot(True).processes
+            except (OSError, ValueError):
+                self.disconnect()
+        # Keeps the local CPU baseline of sample() untouched
+        return self.local_sampler().read_processes()
+
+    # Per-device counters are always read locally: they are a couple of
+    # small files, and rates need the time of the reading on this side.
+    def read_disks(self) -> Dict[str, DiskDeviceCounters]:
+        return self.local_sampler().read_disks()
+
+    def read_nics(self) -> Dict[str, NicCounters]:
+        return self.local_sampler().read_nics()
+
+    def history(self, series: List[str], step: int = 1) -> Dict[str, List[float]]:
+        """Daemon history, or an empty dict when running locally."""
+        self.connect()
+        if self.client is not None:
+            try:
+                return self.client.history(series, step)
+            except (OSError, ValueError):
+                self.disconnect()
+        return {}
+
+    def close(self) -> None:
+        self.disconnect()
+        if self.local is not None:
+            self.local.close()
+            self.local = None
@@ -0,0 +1,340 @@
+"""Persistent on-disk metrics history with 1 s / 1 min / 1 h tiers.
+
+Each tier is one file holding a fixed number of fixed-width records in a
+ring, memory-mapped for both writing and reading. When a tier is full the
+oldest record is overwritten, so the disk space used is set when the file
+is created:
+
+    tier  resolution  kept      record   file size (8 fields)
+    1s    1 second    2 days    40 B     ~6.9 MB
+    1m    1 minute    90 days   72 B     ~9.3 MB
+    1h    1 hour      5 years   72 B     ~3.2 MB
+
+A 1s record is a float64 timestamp plus one float32 per field. Minute and
+hour records hold the mean and the maximum of every field, so a short
+spike is still visible after rollup. Records in a tier are in time order,
+so a range query is a binary search plus one struct.iter_unpack over a
+slice of the map.
+
+close() writes out the unfinished minute and hour as they stand, and
+keeps the running sums behind them in metrics-buckets.state. The next
+MetricsStore picks them up and, when it finishes the same period,
+rewrites that record in place instead of adding a second one.
+
+MetricsStore(directory, readonly=True) is for looking at the history
+while the daemon may be running or stopped: the rings are mapped read
+only, missing or foreign ones are left out instead of recreated, and the
+bucket state stays on disk for the daemon.
+"""
+
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+FIELDS = ("cpu", "memory", "swap", "load1", "net_upload", "net_download", "disk_read", "disk_write")
+
+MAGIC = b"MUXMETR1"
+VERSION = 1
+# magic, version, record size, field count, stats per field, capacity, head, count
+HEADER = struct.Struct("<8sIIIIQQQ")
+HEADER_SIZE = 64
+
+BUCKET_MAGIC = b"MUXBUCK1"
+# magic, field count
+BUCKET_HEADER = struct.Struct("<8sI")
+
+TIERS = (
+    # name, seconds per record, capacity, stats per field (mean / mean + max)
+    ("1s", 1, 2 * 86400, 1),
+    ("1m", 60, 90 * 1440, 2),
+    ("1h", 3600, 5 * 8760, 2),
+)
+
+
+class Tier:
+    """One ring of fixed-width records in a memory-mapped file."""
+
+    def __init__(self, path: str, seconds: int, capacity: int, stats: int, nfields: int,
+                 readonly: bool = False):
+        self.path = path
+        self.seconds = seconds
+        self.stats = stats
+        self.nfields = nfields
+        self.record = struct.Struct("<d" + "f" * (nfields * stats))
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * self.record.size
+
+        if readonly:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                if not self._header_matches(os.pread(fd, HEADER.size, 0)) or os.fstat(fd).st_size != size:
+                    raise ValueError(f"{path} is not a ring of this layout")
+                self.map = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+            _, _, _, _, _, _, self.head, self.count = HEADER.unpack_from(self.map, 0)
+            return
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            header = os.pread(fd, HEADER.size, 0)
+            if not self._header_matches(header) or os.fstat(fd).st_size != size:
+                # New file, or written by an incompatible version: start over
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, VERSION, self.record.size, nfields, stats, capacity, 0, 0), 0)
+            self.map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _, _, _, _, _, _, self.head, self.count = HEADER.unpack_from(self.map, 0)
+
+    def _header_matches(self, header: bytes) -> bool:
+        if len(header) < HEADER.size:
+            return False
+        magic, version, record_size, nfields, stats, capacity, _, _ = HEADER.unpack(header)
+        return (magic, version, record_size, nfields, stats, capacity) == \
+            (MAGIC, VERSION, self.record.size, self.nfields, self.stats, self.capacity)
+
+    def close(self) -> None:
+        self.map.flush()
+        self.map.close()
+
+    def flush(self) -> None:
+        self.map.flush()
+
+    def _offset(self, physical: int) -> int:
+        return HEADER_SIZE + physical * self.record.size
+
+    def _physical(self, logical: int) -> int:
+        """Map an age-ordered index (0 = oldest) to a slot in the file."""
+        return (self.head - self.count + logical) % self.capacity
+
+    def replace_last(self, values: Sequence[float]) -> None:
+        physical = self._physical(self.count - 1)
+        timestamp = self.timestamp_at(self.count - 1)
+        self.record.pack_into(self.map, self._offset(physical), timestamp, *values)
+
+    def append(self, timestamp: float, values: Sequence[float]) -> None:
+        self.record.pack_into(self.map, self._offset(self.head), timestamp, *values)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        struct.pack_into("<QQ", self.map, HEADER.size - 16, self.head, self.count)
+
+    def timestamp_at(self, logical: int) -> float:
+        return struct.unpack_from("<d", self.map, self._offset(self._physical(logical)))[0]
+
+    def last_timestamp(self) -> Optional[float]:
+        return self.timestamp_at(self.count - 1) if self.count else None
+
+    def _bisect(self, timestamp: float) -> int:
+        """First logical index whose timestamp is >= timestamp."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp_at(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def query(self, start: float, end: float) -> List[Tuple]:
+        first = self._bisect(start)
+        last = self._bisect(end + 1e-6)
+        if first >= last:
+            return []
+        # The range is at most two contiguous runs in the file
+        records = []
+        p_first = self._physical(first)
+        p_last = self._physical(last - 1)
+        runs = [(p_first, p_last + 1)] if p_first <= p_last else [(p_first, self.capacity), (0, p_last + 1)]
+        for begin, stop in runs:
+            chunk = self.map[self._offset(begin):self._offset(stop)]
+            records.extend(self.record.iter_unpack(chunk))
+        return records
+
+
+class _Bucket:
+    """Running mean/max of the samples falling into one rollup period."""
+
+    def __init__(self, nfields: int):
+        self.period = None
+        self.n = 0
+        self.sums = [0.0] * nfields
+        self.maxes = [0.0] * nfields
+        self.restored = False  # continues a period an earlier close() wrote out
+
+    def add(self, means: Sequence[float], maxes: Sequence[float], weight: int = 1) -> None:
+        for i, value in enumerate(means):
+            self.sums[i] += value * weight
+            if self.n == 0 or maxes[i] > self.maxes[i]:
+                self.maxes[i] = maxes[i]
+        self.n += weight
+
+    def values(self) -> List[float]:
+        return [s / self.n for s in self.sums] + self.maxes
+
+    def reset(self, period: int) -> None:
+        self.period = period
+        self.restored = False
+        self.n = 0
+        self.sums = [0.0] * len(self.sums)
+        self.maxes = [0.0] * len(self.maxes)
+
+
+class MetricsStore:
+    """Appends 1 s samples and rolls them up into the minute and hour tiers.
+
+    A readonly store only answers queries; tiers without a usable file
+    are missing from self.tiers.
+    """
+
+    def __init__(self, directory: str, fields: Sequence[str] = FIELDS, readonly: bool = False):
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self.fields = tuple(fields)
+        self.tiers: Dict[str, Tier] = {}
+        for name, seconds, capacity, stats in TIERS:
+            path = os.path.join(directory, f"metrics-{name}.ring")
+            try:
+                self.tiers[name] = Tier(path, seconds, capacity, stats, len(self.fields), readonly)
+            except (FileNotFoundError, ValueError):
+                if not readonly:
+                    raise
+        self.minute = _Bucket(len(self.fields))
+        self.hour = _Bucket(len(self.fields))
+        self.state_path = os.path.join(directory, "metrics-buckets.state")
+        if not readonly:
+            self._load_buckets()
+
+    def _bucket_format(self) -> struct.Struct:
+        # period (-1 for none), sample count, sums, maxes; minute then hour
+        return struct.Struct("<qQ" + "d" * (2 * len(self.fields)))
+
+    def _save_buckets(self) -> None:
+        bucket_format = self._bucket_format()
+        data = BUCKET_HEADER.pack(BUCKET_MAGIC, len(self.fields))
+        for bucket in (self.minute, self.hour):
+            period = bucket.period if bucket.period is not None and bucket.n else -1
+            data += bucket_format.pack(period, bucket.n, *bucket.sums, *bucket.maxes)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.state_path)
+
+    def _load_buckets(self) -> None:
+        try:
+            with open(self.state_path, "rb") as f:
+                data = f.read()
+            # Used once: after a crash it would no longer match the rings
+            os.unlink(self.state_path)
+        except OSError:
+            return
+        bucket_format = self._bucket_format()
+        if len(data) != BUCKET_HEADER.size + 2 * bucket_format.size:
+            return
+        if BUCKET_HEADER.unpack_from(data) != (BUCKET_MAGIC, len(self.fields)):
+            return
+        n = len(self.fields)
+        for i, bucket in enumerate((self.minute, self.hour)):
+            fields = bucket_format.unpack_from(data, BUCKET_HEADER.size + i * bucket_format.size)
+            if fields[0] < 0:
+                continue
+            bucket.period, bucket.n = fields[0], fields[1]
+            bucket.sums = list(fields[2:2 + n])
+            bucket.maxes = list(fields[2 + n:])
+            bucket.restored = True
+        hour = self.minute.period * 60 // 3600 if self.minute.restored else None
+        if hour is not None and self.hour.period != hour:
+            # close() finished any older hour; the record it wrote for
+            # this one held nothing but the restored minute
+            self.hour.reset(hour)
+            self.hour.restored = True
+
+    def close(self) -> None:
+        # Saved before the minute is folded into the hour below, so the
+        # hour does not count it twice once the minute really ends
+        try:
+            self._save_buckets()
+        except OSError:
+            pass
+        if self.minute.n:
+            means = self.minute.values()
+            n = len(self.fields)
+            self._roll_into_hour(self.minute.period * 60, means[:n], means[n:], self.minute.n)
+        self._flush_bucket(self.minute, self.tiers["1m"])
+        self._flush_bucket(self.hour, self.tiers["1h"])
+        for tier in self.tiers.values():
+            tier.close()
+
+    def flush(self) -> None:
+        for tier in self.tiers.values():
+            tier.flush()
+
+    def _flush_bucket(self, bucket: _Bucket, tier: Tier) -> None:
+        if bucket.n:
+            timestamp = bucket.period * tier.seconds
+            last = tier.last_timestamp()
+            if last is None or timestamp > last:
+                tier.append(timestamp, bucket.values())
+            elif timestamp == last and bucket.restored:
+                # Holds everything the record close() wrote had, and more
+                tier.replace_last(bucket.values())
+            bucket.n = 0
+
+    def append(self, timestamp: float, values: Sequence[float]) -> None:
+        values = [float(v) for v in values]
+        last = self.tiers["1s"].last_timestamp()
+        if last is not None and timestamp <= last:
+            return  # clock went backwards; keep the tier ordered
+        self.tiers["1s"].append(timestamp, values)
+
+        minute = int(timestamp // 60)
+        if self.minute.period != minute:
+            if self.minute.n:
+                means = self.minute.values()
+                n = len(self.fields)
+                self._roll_into_hour(self.minute.period * 60, means[:n], means[n:], self.minute.n)
+            self._flush_bucket(self.minute, self.tiers["1m"])
+            self.minute.reset(minute)
+        self.minute.add(values, values)
+
+    def _roll_into_hour(self, timestamp: float, means, maxes, weight: int) -> None:
+        hour = int(timestamp // 3600)
+        if self.hour.period != hour:
+            self._flush_bucket(self.hour, self.tiers["1h"])
+            self.hour.reset(hour)
+        self.hour.add(means, maxes, weight)
+
+    def pick_tier(self, start: float, end: float) -> Optional[str]:
+        """Finest tier that covers start and returns a manageable number of rows.
+
+        If no tier reaches back to start, the finest one is used: it holds
+        the most recent part of the range in the most detail. None when a
+        readonly store found no tiers at all.
+        """
+        span = end - start
+        tiers = [t for t in TIERS if t[0] in self.tiers]
+        for name, seconds, capacity, _ in tiers:
+            tier = self.tiers[name]
+            oldest = tier.timestamp_at(0) if tier.count else None
+            if seconds <= span and span / seconds <= 20000 and oldest is not None and oldest <= start:
+                return name
+        for name, seconds, _, _ in tiers:
+            if span / seconds <= 20000:
+                return name
+        return tiers[-1][0] if tiers else None
+
+    def query(self, start: float, end: float, tier: Optional[str] = None):
+        """Return (tier name, column names, rows) for start <= t <= end.
+
+        Rows are tuples (timestamp, value, ...). For the rollup tiers each
+        field has a mean column and a "<field>_max" column.
+        """
+        tier = tier or self.pick_tier(start, end)
+        columns = ["timestamp"] + list(self.fields)
+        if tier is None or tier not in self.tiers:
+            return tier, columns, []
+        if self.tiers[tier].stats == 2:
+            columns += [f"{field}_max" for field in self.fields]
+        return tier, columns, self.tiers[tier].query(start, end)
@@ -0,0 +1,173 @@
+"""Network connection table read straight from /proc/net.
+
+psutil.net_connections() walks every /proc/<pid>/fd on each call to find
+socket owners. ConnectionSampler keeps that inode -> pid index between
+calls instead: /proc/net/{tcp,tcp6,udp,udp6} are parsed each time (they
+are small and already open), and the fd directories are only walked for
+processes the index has not seen yet, or in full when an unknown socket
+is still unresolved and the last full walk is old enough.
+"""
+
+import os
+import socket
+import struct
+import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+TCP_STATES = {
+    "01": "ESTABLISHED",
+    "02": "SYN_SENT",
+    "03": "SYN_RECV",
+    "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2",
+    "06": "TIME_WAIT",
+    "07": "CLOSE",
+    "08": "CLOSE_WAIT",
+    "09": "LAST_ACK",
+    "0A": "LISTEN",
+    "0B": "CLOSING",
+}
+
+TABLES = (
+    ("tcp", socket.AF_INET),
+    ("tcp6", socket.AF_INET6),
+    ("udp", socket.AF_INET),
+    ("udp6", socket.AF_INET6),
+)
+
+FULL_SCAN_INTERVAL = 10.0
+
+
+class Connection(NamedTuple):
+    proto: str
+    local: str
+    remote: str
+    status: str
+    inode: int
+    pid: Optional[int]
+
+
+def _format_address(hex_addr: str, family: int) -> str:
+    addr_hex, port_hex = hex_addr.split(":")
+    port = int(port_hex, 16)
+    raw = bytes.fromhex(addr_hex)
+    # The kernel prints each 32-bit word in host (little-endian) order
+    words = struct.unpack("<" + "I" * (len(raw) // 4), raw)
+    packed = struct.pack(">" + "I" * len(words), *words)
+    ip = socket.inet_ntop(family, packed)
+    if family == socket.AF_INET6:
+        if ip.startswith("::ffff:") and "." in ip:
+            ip = ip[7:]
+        return f"[{ip}]:{port}"
+    return f"{ip}:{port}"
+
+
+class ConnectionSampler:
+    """Reads the socket tables and resolves their owning processes."""
+
+    def __init__(self):
+        self._fds: Dict[str, int] = {}
+        for name, _ in TABLES:
+            try:
+                self._fds[name] = os.open(f"/proc/net/{name}", os.O_RDONLY)
+            except OSError:
+                pass  # e.g. IPv6 disabled
+        self.inode_pids: Dict[int, int] = {}
+        self.known_pids: Set[int] = set()
+        self.names: Dict[int, str] = {}
+        self.last_full_scan = 0.0
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def _read_table(self, name: str) -> bytes:
+        fd = self._fds[name]
+        chunks = []
+        offset = 0
+        while True:
+            chunk = os.pread(fd, 65536, offset)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+            offset += len(chunk)
+
+    def _scan_pid(self, pid: int) -> None:
+        try:
+            fds = os.listdir(f"/proc/{pid}/fd")
+        except OSError:
+            return
+        for fd in fds:
+            try:
+                target = os.readlink(f"/proc/{pid}/fd/{fd}")
+            except OSError:
+                continue
+            if target.startswith("socket:["):
+                self.inode_pids[int(target[8:-1])] = pid
+
+    def _resolve(self, inodes: Set[int]) -> None:
+        missing = inodes - self.inode_pids.keys()
+        if not missing:
+            return
+        pids = {int(entry) for entry in os.listdir("/proc") if entry.isdigit()}
+
+        # New processes are the usual owners of new sockets
+        for pid in pids - self.known_pids:
+            self._scan_pid(pid)
+        self.known_pids = pids
+
+        now = time.monotonic()
+        if inodes - self.inode_pids.keys() and now - self.last_full_scan >= FULL_SCAN_INTERVAL:
+            # Sockets passed to or created by older processes
+            for pid in pids:
+                self._scan_pid(pid)
+            self.last_full_scan = now
+
+    def process_name(self, pid: int) -> str:
+        name = self.names.get(pid)
+        if name is None:
+            try:
+                with open(f"/proc/{pid}/comm") as f:
+                    name = f.read().strip()
+            except OSError:
+                name = "?"
+            self.names[pid] = name
+        return name
+
+    def sample(self) -> List[Connection]:
+        rows = []
+        for name, family in TABLES:
+            if name not in self._fds:
+                continue
+            proto = name.rstrip("6")
+            for line in self._read_table(name).decode().split("\n")[1:]:
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                if proto == "tcp":
+                    status = TCP_STATES.get(fields[3], fields[3])
+                else:
+                    status = "NONE"
+                rows.append((name, family, fields[1], fields[2], status, int(fields[9])))
+
+        inodes = {row[5] for row in rows if row[5]}
+        self._resolve(inodes)
+
+        # Forget sockets and processes that are gone
+        for inode in self.inode_pids.keys() - inodes:
+            del self.inode_pids[inode]
+        live_pids = set(self.inode_pids.values())
+        for pid in self.names.keys() - live_pids:
+            del self.names[pid]
+
+        connections = []
+        for name, family, local, remote, status, inode in rows:
+            remote_addr = _format_address(remote, family)
+            if remote_addr.endswith(":0"):
+                remote_addr = "N/A"
+            connections.append(Connection(
+                name, _format_address(local, family), remote_addr,
+                status, inode, self.inode_pids.get(inode)
+            ))
+        return connections
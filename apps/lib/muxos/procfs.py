@@ -0,0 +1,535 @@
+"""Low-overhead /proc sampling shared by the MuxOS monitor apps.
+
+ProcSampler keeps the system-wide /proc files open and re-reads them with
+os.pread(), so a sample costs a handful of syscalls instead of one psutil
+call per attribute. Rates (CPU usage, per-process CPU) are computed as
+deltas against the previous sample.
+
+Processes are tracked across samples in a cache keyed by PID and start
+time: each entry keeps its /proc/<pid>/stat descriptor open and the CPU
+ticks seen last time, so per-process CPU % is a real delta and a reused
+PID is never mistaken for the process that held it before.
+"""
+
+import os
+import pwd
+import resource
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+PROCESS_STATES = {
+    "R": "running",
+    "S": "sleeping",
+    "D": "disk-sleep",
+    "Z": "zombie",
+    "T": "stopped",
+    "t": "tracing-stop",
+    "X": "dead",
+    "I": "idle",
+    "P": "parked",
+}
+
+
+class MemoryInfo(NamedTuple):
+    total: int
+    available: int
+    used: int
+    percent: float
+
+
+class SwapInfo(NamedTuple):
+    total: int
+    used: int
+    free: int
+    percent: float
+
+
+class NetCounters(NamedTuple):
+    bytes_recv: int
+    bytes_sent: int
+    packets_recv: int
+    packets_sent: int
+
+
+class DiskCounters(NamedTuple):
+    read_bytes: int
+    write_bytes: int
+
+
+class DiskDeviceCounters(NamedTuple):
+    """Cumulative counters of one disk, as in /proc/diskstats."""
+    reads: int
+    read_bytes: int
+    read_ms: int
+    writes: int
+    write_bytes: int
+    write_ms: int
+    in_flight: int
+    busy_ms: int
+    weighted_ms: int
+
+
+class NicCounters(NamedTuple):
+    """Cumulative counters of one interface, as in /proc/net/dev."""
+    bytes_recv: int
+    bytes_sent: int
+    packets_recv: int
+    packets_sent: int
+    errors: int
+    drops: int
+
+
+class DiskRates(NamedTuple):
+    read_bytes: float  # per second
+    write_bytes: float
+    read_iops: float
+    write_iops: float
+    in_flight: int  # requests queued right now
+    queue_depth: float  # average over the interval
+    await_ms: float  # average time per completed request
+    util: float  # percent of the interval the device was busy
+
+
+class NicRates(NamedTuple):
+    bytes_recv: float  # per second
+    bytes_sent: float
+    packets_recv: float
+    packets_sent: float
+    errors: int  # new errors and drops in the interval
+    drops: int
+
+
+class ProcessSample(NamedTuple):
+    pid: int
+    ppid: int
+    name: str
+    status: str
+    cpu_percent: float
+    rss: int
+    num_threads: int
+    uid: int
+    starttime: int = 0  # clock ticks after boot; tells a reused PID apart
+
+
+class SystemSnapshot(NamedTuple):
+    timestamp: float
+    cpu_percent: float
+    cpu_per_core: List[float]
+    memory: MemoryInfo
+    swap: SwapInfo
+    load_avg: Tuple[float, float, float]
+    uptime: float
+    net_io: NetCounters
+    processes: Optional[List[ProcessSample]]
+
+
+def _pread_all(fd: int) -> bytes:
+    """Read a whole /proc file from offset 0 through an already open fd."""
+    chunks = []
+    offset = 0
+    while True:
+        chunk = os.pread(fd, 65536, offset)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b"".join(chunks)
+
+
+def _cpu_busy_total(fields: List[bytes]) -> Tuple[int, int]:
+    values = [int(v) for v in fields[:8]]
+    total = sum(values)
+    idle = values[3] + values[4]  # idle + iowait
+    return total - idle, total
+
+
+def _percent(busy: int, total: int) -> float:
+    return min(100.0, 100.0 * busy / total) if total > 0 else 0.0
+
+
+def disk_rates(last: DiskDeviceCounters, current: DiskDeviceCounters, elapsed: float) -> DiskRates:
+    """Rates between two readings taken elapsed seconds apart."""
+    reads = current.reads - last.reads
+    writes = current.writes - last.writes
+    ios = reads + writes
+    io_ms = (current.read_ms - last.read_ms) + (current.write_ms - last.write_ms)
+    interval_ms = elapsed * 1000
+    return DiskRates(
+        read_bytes=(current.read_bytes - last.read_bytes) / elapsed,
+        write_bytes=(current.write_bytes - last.write_bytes) / elapsed,
+        read_iops=reads / elapsed,
+        write_iops=writes / elapsed,
+        in_flight=current.in_flight,
+        queue_depth=(current.weighted_ms - last.weighted_ms) / interval_ms,
+        await_ms=io_ms / ios if ios > 0 else 0.0,
+        util=min(100.0, (current.busy_ms - last.busy_ms) / interval_ms * 100),
+    )
+
+
+def nic_rates(last: NicCounters, current: NicCounters, elapsed: float) -> NicRates:
+    """Rates between two readings taken elapsed seconds apart."""
+    return NicRates(
+        bytes_recv=(current.bytes_recv - last.bytes_recv) / elapsed,
+        bytes_sent=(current.bytes_sent - last.bytes_sent) / elapsed,
+        packets_recv=(current.packets_recv - last.packets_recv) / elapsed,
+        packets_sent=(current.packets_sent - last.packets_sent) / elapsed,
+        errors=current.errors - last.errors,
+        drops=current.drops - last.drops,
+    )
+
+
+def parse_process_stat(data: bytes) -> Tuple[str, str, int, int, int, int, int]:
+    """Split a /proc/<pid>/stat line.
+
+    Returns (name, state, ppid, cpu_ticks, num_threads, starttime, rss_pages).
+    The command name may contain spaces and parentheses, so it is located
+    by the last closing parenthesis.
+    """
+    lpar = data.index(b"(")
+    rpar = data.rindex(b")")
+    name = data[lpar + 1:rpar].decode("utf-8", "replace")
+    fields = data[rpar + 2:].split()
+    # fields[0] is field 3 (state) in proc(5) numbering
+    state = fields[0].decode()
+    ppid = int(fields[1])
+    cpu_ticks = int(fields[11]) + int(fields[12])  # utime + stime
+    num_threads = int(fields[17])
+    starttime = int(fields[19])
+    rss_pages = int(fields[21])
+    return name, state, ppid, cpu_ticks, num_threads, starttime, rss_pages
+
+
+def format_uptime(seconds: float) -> str:
+    """"up 2 days, 3 hours, 4 minutes", like `uptime -p`."""
+    minutes = int(seconds) // 60
+    parts = []
+    for unit, size in (("week", 7 * 24 * 60), ("day", 24 * 60), ("hour", 60), ("minute", 1)):
+        count, minutes = divmod(minutes, size)
+        if count:
+            parts.append(f"{count} {unit}{'s' if count != 1 else ''}")
+    return "up " + (", ".join(parts) or "0 minutes")
+
+
+def read_cmdline(pid: int) -> str:
+    """Command line joined with spaces; empty for kernel threads and gone processes."""
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            data = f.read()
+    except OSError:
+        return ""
+    return data.rstrip(b"\0").replace(b"\0", b" ").decode(errors="replace")
+
+
+_usernames: Dict[int, str] = {}
+
+
+def user_name(uid: int) -> str:
+    """Login name of uid, cached; the numeric id if it has none."""
+    name = _usernames.get(uid)
+    if name is None:
+        try:
+            name = pwd.getpwuid(uid).pw_name
+        except KeyError:
+            name = str(uid)
+        _usernames[uid] = name
+    return name
+
+
+def _fd_budget() -> int:
+    """How many per-process descriptors the cache may keep open."""
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        soft = 65536
+    return max(0, soft // 2 - 64)
+
+
+class _ProcessRecord:
+    """Cached state of one process between samples."""
+
+    __slots__ = ("pid", "starttime", "uid", "fd", "cpu_ticks")
+
+    def __init__(self, pid: int, starttime: int, uid: int, fd: Optional[int], cpu_ticks: int):
+        self.pid = pid
+        self.starttime = starttime
+        self.uid = uid
+        self.fd = fd
+        self.cpu_ticks = cpu_ticks
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class ProcSampler:
+    """Samples CPU, memory, load, network and process data from /proc.
+
+    One instance keeps its own baselines; call sample() once per tick.
+    Not thread-safe: use one sampler per sampling thread.
+    """
+
+    def __init__(self):
+        self._fds: Dict[str, int] = {}
+        for name in ("stat", "meminfo", "loadavg", "uptime", "net/dev", "diskstats"):
+            self._fds[name] = os.open(f"/proc/{name}", os.O_RDONLY)
+
+        self._last_cpu: Optional[Tuple[int, int]] = None
+        self._last_cores: List[Tuple[int, int]] = []
+        self._processes: Dict[int, _ProcessRecord] = {}
+        self._open_process_fds = 0
+        self._process_fd_budget = _fd_budget()
+        self._last_proc_time: Optional[float] = None
+        self._physical_disks: Dict[str, bool] = {}
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        for record in self._processes.values():
+            record.close()
+        self._processes.clear()
+        self._open_process_fds = 0
+
+    def _evict(self, record: _ProcessRecord) -> None:
+        if record.fd is not None:
+            self._open_process_fds -= 1
+        record.close()
+
+    def _open_process(self, pid: int) -> Optional[Tuple[bytes, int, Optional[int]]]:
+        """First read of a process: returns (stat data, uid, fd to keep)."""
+        try:
+            fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY)
+        except OSError:
+            return None
+        try:
+            data = os.pread(fd, 4096, 0)
+            uid = os.fstat(fd).st_uid
+        except OSError:
+            os.close(fd)
+            return None
+        if self._open_process_fds < self._process_fd_budget:
+            self._open_process_fds += 1
+            return data, uid, fd
+        os.close(fd)
+        return data, uid, None
+
+    @staticmethod
+    def _reread(record: _ProcessRecord) -> Optional[bytes]:
+        try:
+            if record.fd is not None:
+                return os.pread(record.fd, 4096, 0)
+            with open(f"/proc/{record.pid}/stat", "rb", buffering=0) as f:
+                return f.read(4096)
+        except OSError:
+            # ESRCH once the process is gone, even if the PID was reused
+            return None
+
+    def _read(self, name: str) -> bytes:
+        return _pread_all(self._fds[name])
+
+    def read_cpu(self) -> Tuple[float, List[float]]:
+        """Overall and per-core usage since the previous call."""
+        lines = self._read("stat").split(b"\n")
+        busy, total = _cpu_busy_total(lines[0].split()[1:])
+        cores = []
+        for line in lines[1:]:
+            if not line.startswith(b"cpu"):
+                break
+            cores.append(_cpu_busy_total(line.split()[1:]))
+
+        if self._last_cpu is None:
+            cpu_percent = 0.0
+            per_core = [0.0] * len(cores)
+        else:
+            cpu_percent = _percent(busy - self._last_cpu[0], total - self._last_cpu[1])
+            per_core = []
+            for i, (core_busy, core_total) in enumerate(cores):
+                if i < len(self._last_cores):
+                    last_busy, last_total = self._last_cores[i]
+                    per_core.append(_percent(core_busy - last_busy, core_total - last_total))
+                else:
+                    per_core.append(0.0)
+
+        self._last_cpu = (busy, total)
+        self._last_cores = cores
+        return cpu_percent, per_core
+
+    def read_memory(self) -> Tuple[MemoryInfo, SwapInfo]:
+        values = {}
+        for line in self._read("meminfo").split(b"\n"):
+            key, _, rest = line.partition(b":")
+            if key in (b"MemTotal", b"MemFree", b"MemAvailable", b"SwapTotal", b"SwapFree"):
+                values[key] = int(rest.split()[0]) * 1024
+
+        total = values.get(b"MemTotal", 0)
+        available = values.get(b"MemAvailable", values.get(b"MemFree", 0))
+        used = total - available
+        memory = MemoryInfo(total, available, used, _percent(used, total))
+
+        swap_total = values.get(b"SwapTotal", 0)
+        swap_free = values.get(b"SwapFree", 0)
+        swap_used = swap_total - swap_free
+        swap = SwapInfo(swap_total, swap_used, swap_free, _percent(swap_used, swap_total))
+        return memory, swap
+
+    def read_load_avg(self) -> Tuple[float, float, float]:
+        fields = self._read("loadavg").split()
+        return float(fields[0]), float(fields[1]), float(fields[2])
+
+    def read_uptime(self) -> float:
+        return float(self._read("uptime").split()[0])
+
+    def read_nics(self) -> Dict[str, NicCounters]:
+        """Counters per interface, loopback excluded."""
+        nics = {}
+        for line in self._read("net/dev").split(b"\n")[2:]:
+            iface, _, rest = line.partition(b":")
+            iface = iface.strip()
+            if not iface or iface == b"lo":
+                continue
+            fields = rest.split()
+            nics[iface.decode()] = NicCounters(
+                bytes_recv=int(fields[0]),
+                bytes_sent=int(fields[8]),
+                packets_recv=int(fields[1]),
+                packets_sent=int(fields[9]),
+                errors=int(fields[2]) + int(fields[10]),
+                drops=int(fields[3]) + int(fields[11]),
+            )
+        return nics
+
+    def read_net_io(self) -> NetCounters:
+        """Totals over all interfaces except loopback."""
+        recv = sent = packets_recv = packets_sent = 0
+        for nic in self.read_nics().values():
+            recv += nic.bytes_recv
+            sent += nic.bytes_sent
+            packets_recv += nic.packets_recv
+            packets_sent += nic.packets_sent
+        return NetCounters(recv, sent, packets_recv, packets_sent)
+
+    def _is_physical_disk(self, name: str) -> bool:
+        physical = self._physical_disks.get(name)
+        if physical is None:
+            physical = os.path.exists(f"/sys/block/{name}/device")
+            self._physical_disks[name] = physical
+        return physical
+
+    def read_disks(self) -> Dict[str, DiskDeviceCounters]:
+        """Counters per physical disk; partitions and virtual devices are skipped."""
+        disks = {}
+        for line in self._read("diskstats").split(b"\n"):
+            fields = line.split()
+            if len(fields) < 14:
+                continue
+            name = fields[2].decode()
+            if not self._is_physical_disk(name):
+                continue
+            disks[name] = DiskDeviceCounters(
+                reads=int(fields[3]),
+                read_bytes=int(fields[5]) * 512,  # sectors are always 512 bytes here
+                read_ms=int(fields[6]),
+                writes=int(fields[7]),
+                write_bytes=int(fields[9]) * 512,
+                write_ms=int(fields[10]),
+                in_flight=int(fields[11]),
+                busy_ms=int(fields[12]),
+                weighted_ms=int(fields[13]),
+            )
+        return disks
+
+    def read_disk_io(self) -> DiskCounters:
+        """Totals over physical disks."""
+        read = written = 0
+        for disk in self.read_disks().values():
+            read += disk.read_bytes
+            written += disk.write_bytes
+        return DiskCounters(read, written)
+
+    def read_processes(self) -> List[ProcessSample]:
+        """Per-process samples; CPU % is relative to one core, like top.
+
+        A process seen for the first time reports its average CPU usage
+        over its lifetime instead of 0.0.
+        """
+        now = time.monotonic()
+        elapsed_ticks = (now - self._last_proc_time) * CLOCK_TICKS if self._last_proc_time else 0
+        uptime_ticks = self.read_uptime() * CLOCK_TICKS
+        previous = self._processes
+        current: Dict[int, _ProcessRecord] = {}
+        processes = []
+
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            pid = int(entry)
+            record = previous.pop(pid, None)
+            data = self._reread(record) if record is not None else None
+            if data is None and record is not None:
+                self._evict(record)
+                record = None
+
+            if data is not None:
+                try:
+                    name, state, ppid, cpu_ticks, num_threads, starttime, rss_pages = parse_process_stat(data)
+                except (ValueError, IndexError):
+                    self._evict(record)
+                    continue
+                if starttime != record.starttime:
+                    # Same PID, different process
+                    self._evict(record)
+                    record = None
+
+            if record is None:
+                opened = self._open_process(pid)
+                if opened is None:
+                    continue
+                data, uid, fd = opened
+                try:
+                    name, state, ppid, cpu_ticks, num_threads, starttime, rss_pages = parse_process_stat(data)
+                except (ValueError, IndexError):
+                    if fd is not None:
+                        self._open_process_fds -= 1
+                        os.close(fd)
+                    continue
+                record = _ProcessRecord(pid, starttime, uid, fd, cpu_ticks)
+                age_ticks = uptime_ticks - starttime
+                cpu_percent = 100.0 * cpu_ticks / age_ticks if age_ticks > 0 else 0.0
+            elif elapsed_ticks > 0:
+                cpu_percent = 100.0 * (cpu_ticks - record.cpu_ticks) / elapsed_ticks
+                record.cpu_ticks = cpu_ticks
+            else:
+                cpu_percent = 0.0
+                record.cpu_ticks = cpu_ticks
+
+            current[pid] = record
+            processes.append(ProcessSample(
+                pid, ppid, name, PROCESS_STATES.get(state, state),
+                cpu_percent, rss_pages * PAGE_SIZE, num_threads, record.uid, record.starttime
+            ))
+
+        # Whatever was not seen in this scan has exited
+        for record in previous.values():
+            self._evict(record)
+
+        self._processes = current
+        self._last_proc_time = now
+        return processes
+
+    def sample(self, processes: bool = True) -> SystemSnapshot:
+        cpu_percent, per_core = self.read_cpu()
+        memory, swap = self.read_memory()
+        return SystemSnapshot(
+            timestamp=time.time(),
+            cpu_percent=cpu_percent,
+            cpu_per_core=per_core,
+            memory=memory,
+            swap=swap,
+            load_avg=self.read_load_avg(),
+            uptime=self.read_uptime(),
+            net_io=self.read_net_io(),
+            processes=self.read_processes() if processes else None,
+        )
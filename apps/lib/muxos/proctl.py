@@ -0,0 +1,169 @@
+"""Scheduling controls for running processes, through direct syscalls.
+
+Nice values, CPU affinity and I/O priority belong to threads on Linux: a
+thread started later inherits them from the thread that created it, but
+changing the main thread leaves the others alone. Every setter here
+therefore applies to each thread in /proc/<pid>/task, and apply() runs a
+setter over a list of PIDs, such as ProcessTree.subtree(), so a game
+and everything it spawned move together.
+
+os has no ioprio_set(); it is called through libc's syscall() with the
+number for the running architecture.
+
+Termination ends processes with os.kill(): SIGTERM first, then SIGKILL
+for whatever is still running after a timeout. The caller drives it
+with poll() from a timer, so the UI never waits on it.
+"""
+
+import ctypes
+import os
+import platform
+import signal
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from .procfs import parse_process_stat
+
+IOPRIO_CLASS_RT = 1
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+TERM_TIMEOUT = 5.0
+
+SYS_IOPRIO_SET = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "armv7l": 314,
+    "riscv64": 30,
+}.get(platform.machine())
+
+_libc = None
+
+
+def threads(pid: int) -> List[int]:
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except (OSError, ValueError):
+        return [pid]
+
+
+def set_nice(pid: int, nice: int) -> None:
+    for tid in threads(pid):
+        os.setpriority(os.PRIO_PROCESS, tid, nice)
+
+
+def get_affinity(pid: int) -> Set[int]:
+    return os.sched_getaffinity(pid)
+
+
+def set_affinity(pid: int, cpus: Set[int]) -> None:
+    for tid in threads(pid):
+        os.sched_setaffinity(tid, cpus)
+
+
+def set_ioprio(pid: int, ioclass: int, level: int = 0) -> None:
+    """ioclass is one of IOPRIO_CLASS_*; level 0 (highest) to 7 for RT and BE."""
+    global _libc
+    if SYS_IOPRIO_SET is None:
+        raise OSError(0, f"I/O priority is not supported on {platform.machine()}")
+    if _libc is None:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    value = (ioclass << IOPRIO_CLASS_SHIFT) | level
+    for tid in threads(pid):
+        if _libc.syscall(SYS_IOPRIO_SET, IOPRIO_WHO_PROCESS, tid, value) < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+
+def apply(setter: Callable[..., None], pids: List[int], *args) -> List[str]:
+    """Run setter(pid, *args) for every PID; returns one message per failure.
+
+    Processes that exit in the meantime are skipped silently.
+    """
+    errors = []
+    for pid in pids:
+        try:
+            setter(pid, *args)
+        except ProcessLookupError:
+            continue
+        except OSError as e:
+            errors.append(f"{pid}: {e.strerror}")
+    return errors
+
+
+def irq_counts() -> Dict[int, int]:
+    """Interrupts served so far by each online CPU, from /proc/interrupts."""
+    counts: Dict[int, int] = {}
+    try:
+        with open("/proc/interrupts") as f:
+            cpus = [int(name[len("CPU"):]) for name in f.readline().split()]
+            counts = dict.fromkeys(cpus, 0)
+            for line in f:
+                for cpu, field in zip(cpus, line.split()[1:]):
+                    if not field.isdigit():
+                        break
+                    counts[cpu] += int(field)
+    except (OSError, ValueError):
+        pass
+    return counts
+
+
+def start_time(pid: int) -> Optional[int]:
+    """Start time of a live process, None once it has exited (zombies included)."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            _, state, _, _, _, starttime, _ = parse_process_stat(f.read())
+    except (OSError, ValueError, IndexError):
+        return None
+    return None if state in ("Z", "X") else starttime
+
+
+class Termination:
+    """Ends a set of processes: SIGTERM, then SIGKILL after timeout seconds.
+
+    Each process is remembered by PID and start time, so a PID reused by a
+    new process in the meantime is never signalled. Call poll() until it
+    returns True; running, killed and errors tell how far it got.
+    """
+
+    def __init__(self, pids: List[int], timeout: float = TERM_TIMEOUT):
+        self.timeout = timeout
+        self.running: Dict[int, int] = {}  # pid -> start time
+        self.killed: Set[int] = set()  # needed SIGKILL
+        self.errors: List[str] = []
+        self.deadline = time.monotonic() + timeout
+        for pid in pids:
+            starttime = start_time(pid)
+            if starttime is not None and self._signal(pid, signal.SIGTERM):
+                self.running[pid] = starttime
+
+    def _signal(self, pid: int, signum: int) -> bool:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            return False
+        except OSError as e:
+            self.errors.append(f"{pid}: {e.strerror}")
+            return False
+        return True
+
+    def poll(self) -> bool:
+        """Drop the processes that ended, escalate when the time is up; True when done."""
+        for pid, starttime in list(self.running.items()):
+            if start_time(pid) != starttime:
+                del self.running[pid]
+        if self.running and time.monotonic() >= self.deadline:
+            for pid in list(self.running):
+                if pid not in self.killed:
+                    self.killed.add(pid)
+                    if not self._signal(pid, signal.SIGKILL):
+                        del self.running[pid]
+            # SIGKILL cannot be ignored; only a process stuck in the kernel
+            # (state D) outlives it, and waiting longer will not help
+            if time.monotonic() >= self.deadline + self.timeout:
+                self.running.clear()
+        return not self.running
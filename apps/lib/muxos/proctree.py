@@ -0,0 +1,158 @@
+"""Process hierarchy with per-subtree CPU and memory totals.
+
+ProcessTree is fed the ProcessSample list of every refresh and keeps the
+parent/child links from the ppid fields. Each node carries its own usage
+and the total of its subtree. A refresh only touches what changed: a
+process whose CPU or RSS moved pushes the difference up its ancestor
+chain, a process that appeared, exited or was reparented adds or
+subtracts its subtree once. The cost per refresh is the number of
+changed processes times the tree depth, not the size of the tree.
+
+Memory is RSS by default. update() can be given another per-PID figure
+instead, such as PSS from muxos.smaps, which unlike RSS adds up
+correctly over a subtree. CPU is kept in integer thousandths of a
+percent so the running totals do not drift from float rounding.
+"""
+
+from typing import Dict, Iterator, List, Mapping, Optional, Set
+
+from .procfs import ProcessSample
+
+CPU_SCALE = 1000
+
+
+class ProcessNode:
+    __slots__ = ("pid", "sample", "parent", "children", "cpu", "mem", "tree_cpu", "tree_mem")
+
+    def __init__(self, sample: ProcessSample):
+        self.pid = sample.pid
+        self.sample = sample
+        self.parent: Optional["ProcessNode"] = None
+        self.children: Set["ProcessNode"] = set()
+        self.cpu = 0
+        self.mem = 0
+        self.tree_cpu = 0
+        self.tree_mem = 0
+
+    @property
+    def cpu_percent(self) -> float:
+        return self.cpu / CPU_SCALE
+
+    @property
+    def tree_cpu_percent(self) -> float:
+        return self.tree_cpu / CPU_SCALE
+
+    def ancestors(self) -> Iterator["ProcessNode"]:
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+
+class TreeChanges:
+    """What one update did, for a view that mirrors the tree.
+
+    added: new PIDs. removed: PIDs that exited. moved: surviving PIDs whose
+    parent changed (including to None). dirty: PIDs whose own or subtree
+    values, or whose set of children, changed.
+    """
+
+    def __init__(self):
+        self.added: List[int] = []
+        self.removed: Set[int] = set()
+        self.moved: Set[int] = set()
+        self.dirty: Set[int] = set()
+
+
+class ProcessTree:
+    def __init__(self):
+        self.nodes: Dict[int, ProcessNode] = {}
+
+    def roots(self) -> List[ProcessNode]:
+        return [node for node in self.nodes.values() if node.parent is None]
+
+    def subtree(self, pid: int) -> List[int]:
+        """PIDs of pid and all its descendants, children before parents."""
+        order = []
+
+        def visit(node):
+            for child in node.children:
+                visit(child)
+            order.append(node.pid)
+
+        node = self.nodes.get(pid)
+        if node is not None:
+            visit(node)
+        return order
+
+    def _propagate(self, node: ProcessNode, cpu: int, mem: int, changes: TreeChanges) -> None:
+        for ancestor in node.ancestors():
+            ancestor.tree_cpu += cpu
+            ancestor.tree_mem += mem
+            changes.dirty.add(ancestor.pid)
+
+    def _detach(self, node: ProcessNode, changes: TreeChanges) -> None:
+        if node.parent is not None:
+            self._propagate(node, -node.tree_cpu, -node.tree_mem, changes)
+            node.parent.children.discard(node)
+            node.parent = None
+
+    def _attach(self, node: ProcessNode, parent: ProcessNode, changes: TreeChanges) -> None:
+        node.parent = parent
+        parent.children.add(node)
+        self._propagate(node, node.tree_cpu, node.tree_mem, changes)
+
+    def update(self, samples: List[ProcessSample], memory: Optional[Mapping[int, int]] = None) -> TreeChanges:
+        """Bring the tree in line with samples.
+
+        memory maps PID to the bytes to account for that process; PIDs
+        missing from it count as 0. Without it, sample.rss is used.
+        """
+        changes = TreeChanges()
+        current = {sample.pid: sample for sample in samples}
+
+        for pid in self.nodes.keys() - current.keys():
+            node = self.nodes.pop(pid)
+            self._detach(node, changes)
+            for child in node.children:
+                child.parent = None
+                changes.moved.add(child.pid)
+            node.children.clear()
+            changes.removed.add(pid)
+
+        for pid, sample in current.items():
+            node = self.nodes.get(pid)
+            if node is None:
+                self.nodes[pid] = ProcessNode(sample)
+                changes.added.append(pid)
+            else:
+                node.sample = sample
+
+        for pid, sample in current.items():
+            node = self.nodes[pid]
+
+            cpu = round(sample.cpu_percent * CPU_SCALE)
+            mem = sample.rss if memory is None else memory.get(pid, 0)
+            if cpu != node.cpu or mem != node.mem:
+                d_cpu, d_mem = cpu - node.cpu, mem - node.mem
+                node.cpu, node.mem = cpu, mem
+                node.tree_cpu += d_cpu
+                node.tree_mem += d_mem
+                self._propagate(node, d_cpu, d_mem, changes)
+                changes.dirty.add(pid)
+
+            parent = self.nodes.get(sample.ppid) if sample.ppid != pid else None
+            if parent is not node.parent and parent is not None and node in parent.ancestors():
+                parent = None  # never link a cycle, e.g. from a reused PID
+            if parent is not node.parent:
+                if node.parent is not None:
+                    changes.dirty.add(node.parent.pid)
+                self._detach(node, changes)
+                if parent is not None:
+                    self._attach(node, parent, changes)
+                    changes.dirty.add(parent.pid)
+                changes.moved.add(pid)
+
+        changes.moved -= changes.removed
+        changes.moved.difference_update(changes.added)
+        return changes
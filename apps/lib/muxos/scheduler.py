@@ -0,0 +1,143 @@
+"""Refresh timers that follow what the user can actually see.
+
+Every data source is registered with the notebook pages that show it. A
+source only has a timer armed while one of its pages is the current page
+(sources without pages run on every page) and the window is mapped and
+not minimized, so a minimized monitor wakes up for nothing at all.
+
+Intervals adapt per source: a callback returning False ("nothing
+changed") stretches its interval by BACKOFF up to max_interval, True
+resets it, None leaves it alone. Sources refreshed on a worker thread
+pass the same answer later through report().
+"""
+
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import gi
+gi.require_version('Gtk', '3.0')
+gi.require_version('Gdk', '3.0')
+from gi.repository import Gdk, GLib, Gtk
+
+BACKOFF = 1.5
+
+
+class RefreshSource:
+    def __init__(self, name: str, callback: Callable[[], Optional[bool]], interval: float,
+                 pages: Sequence[Gtk.Widget], max_interval: Optional[float]):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.max_interval = max(interval, max_interval or interval)
+        self.current = interval
+        self.pages = tuple(pages)
+        self.timer_id: Optional[int] = None
+        self.last_run: Optional[float] = None
+
+
+class RefreshScheduler:
+    """Runs refresh callbacks on the GTK main loop for the visible sources."""
+
+    def __init__(self, window: Gtk.Window, notebook: Optional[Gtk.Notebook] = None):
+        self.notebook = notebook
+        self.sources: Dict[str, RefreshSource] = {}
+        self.running = False
+        self.mapped = window.get_mapped()
+        self.iconified = False
+        self.current_page: Optional[Gtk.Widget] = None
+        window.connect("map", self.on_map)
+        window.connect("unmap", self.on_unmap)
+        window.connect("window-state-event", self.on_window_state)
+        if notebook is not None:
+            notebook.connect("switch-page", self.on_switch_page)
+
+    def add(self, name: str, callback: Callable[[], Optional[bool]], interval: float,
+            pages: Sequence[Gtk.Widget] = (), max_interval: Optional[float] = None) -> None:
+        self.sources[name] = RefreshSource(name, callback, interval, pages, max_interval)
+        self._update()
+
+    def set_interval(self, name: str, interval: float, max_interval: Optional[float] = None) -> None:
+        """Change the rate of a source, e.g. from a user setting; takes effect now."""
+        source = self.sources[name]
+        source.interval = source.current = interval
+        source.max_interval = max(interval, max_interval or interval)
+        self._disarm(source)
+        self._update()
+
+    def start(self) -> None:
+        if self.notebook is not None:
+            self.current_page = self.notebook.get_nth_page(self.notebook.get_current_page())
+        self.running = True
+        self._update()
+
+    def stop(self) -> None:
+        self.running = False
+        self._update()
+
+    def is_active(self, source: RefreshSource) -> bool:
+        if not (self.running and self.mapped and not self.iconified):
+            return False
+        return not source.pages or self.current_page in source.pages
+
+    def trigger(self, name: Optional[str] = None) -> None:
+        """Refresh one source, or every active one, right now."""
+        for source in self.sources.values():
+            if (name is None or source.name == name) and self.is_active(source):
+                self._disarm(source)
+                self._fire(source)
+
+    def report(self, name: str, changed: Optional[bool]) -> None:
+        """Tell the scheduler whether the last refresh of name found anything new."""
+        source = self.sources.get(name)
+        if source is not None:
+            self._adapt(source, changed)
+
+    def _adapt(self, source: RefreshSource, changed: Optional[bool]) -> None:
+        if changed is False:
+            source.current = min(source.max_interval, source.current * BACKOFF)
+        elif changed:
+            source.current = source.interval
+
+    def _arm(self, source: RefreshSource, delay: float) -> None:
+        source.timer_id = GLib.timeout_add(max(0, int(delay * 1000)), self._fire, source)
+
+    def _disarm(self, source: RefreshSource) -> None:
+        if source.timer_id is not None:
+            GLib.source_remove(source.timer_id)
+            source.timer_id = None
+
+    def _fire(self, source: RefreshSource) -> bool:
+        source.timer_id = None
+        source.last_run = time.monotonic()
+        self._adapt(source, source.callback())
+        if source.timer_id is None and self.is_active(source):
+            self._arm(source, source.current)
+        return False
+
+    def _update(self) -> None:
+        now = time.monotonic()
+        for source in self.sources.values():
+            if not self.is_active(source):
+                self._disarm(source)
+            elif source.timer_id is None:
+                # Data younger than one interval is still good: flipping
+                # back and forth between tabs does not force a refresh
+                age = now - source.last_run if source.last_run is not None else source.current
+                self._arm(source, source.current - age)
+
+    def on_map(self, widget):
+        self.mapped = True
+        self._update()
+
+    def on_unmap(self, widget):
+        self.mapped = False
+        self._update()
+
+    def on_window_state(self, widget, event):
+        self.iconified = bool(event.new_window_state & Gdk.WindowState.ICONIFIED)
+        self._update()
+        return False
+
+    def on_switch_page(self, notebook, page, page_num):
+        self.current_page = page
+        self._update()
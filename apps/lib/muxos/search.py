@@ -0,0 +1,39 @@
+"""Type-to-filter index over the process list.
+
+Each process gets one lower-cased search key, its name and command line,
+built the first time it is seen. Filtering then is a substring test per
+process with no /proc reads and no case folding per keystroke.
+"""
+
+from typing import Dict, Iterable, Set, Tuple
+
+from .procfs import ProcessSample, read_cmdline
+
+
+class SearchIndex:
+    def __init__(self):
+        # pid -> (starttime, name, key); a PID alone may be reused by a new process
+        self.keys: Dict[int, Tuple[int, str, str]] = {}
+
+    def sync(self, processes: Iterable[ProcessSample]) -> None:
+        """Index new processes and forget the ones that exited."""
+        live = set()
+        for proc in processes:
+            live.add(proc.pid)
+            entry = self.keys.get(proc.pid)
+            # Another start time is another process under a reused PID, as in
+            # ProcSampler; a new name means the process exec'd something else
+            if entry is None or entry[:2] != (proc.starttime, proc.name):
+                key = f"{proc.name} {read_cmdline(proc.pid)}".lower()
+                self.keys[proc.pid] = (proc.starttime, proc.name, key)
+        if len(live) != len(self.keys):
+            for pid in self.keys.keys() - live:
+                del self.keys[pid]
+
+    def key(self, pid: int) -> str:
+        entry = self.keys.get(pid)
+        return entry[2] if entry is not None else ""
+
+    def matches(self, text: str) -> Set[int]:
+        text = text.lower()
+        return {pid for pid, (_, _, key) in self.keys.items() if text in key}
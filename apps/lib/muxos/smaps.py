@@ -0,0 +1,136 @@
+"""Proportional memory accounting from /proc/<pid>/smaps_rollup.
+
+RSS counts every shared page in full for each process that maps it, so
+the RSS of a game and its launcher add up to more than the machine has.
+smaps_rollup gives per-process totals that can be summed:
+
+    pss   shared pages divided among the processes sharing them
+    uss   pages only this process maps (Private_Clean + Private_Dirty)
+    swap  swapped-out pages, also divided by sharers (SwapPss)
+
+The kernel walks the page tables of the process to produce that file, so
+it is far more expensive than /proc/<pid>/stat. SmapsReader therefore
+reads on a small thread pool in batches, never on the caller's thread,
+and only re-reads a process when its RSS from the regular sample moved
+or its entry got older than MAX_AGE seconds.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+from .procfs import ProcessSample
+
+BATCH_SIZE = 64
+MAX_AGE = 30.0
+
+ROLLUP_AVAILABLE = os.path.exists("/proc/self/smaps_rollup")
+
+
+class MemoryDetail(NamedTuple):
+    pss: int
+    uss: int
+    swap: int
+
+
+class _Entry:
+    __slots__ = ("name", "rss", "time", "detail")
+
+    def __init__(self, name: str, rss: int, when: float, detail: Optional[MemoryDetail]):
+        self.name = name
+        self.rss = rss
+        self.time = when
+        self.detail = detail
+
+
+def parse_smaps(data: bytes) -> MemoryDetail:
+    """Totals from smaps_rollup, or from a full smaps file on old kernels."""
+    totals = {b"Pss": 0, b"Private_Clean": 0, b"Private_Dirty": 0, b"Swap": 0, b"SwapPss": 0}
+    for line in data.split(b"\n"):
+        key, _, rest = line.partition(b":")
+        if key in totals:
+            totals[key] += int(rest.split()[0]) * 1024
+    # SwapPss only exists on 4.3+; fall back to the plain Swap count
+    swap = totals[b"SwapPss"] or totals[b"Swap"]
+    return MemoryDetail(totals[b"Pss"], totals[b"Private_Clean"] + totals[b"Private_Dirty"], swap)
+
+
+def read_memory_detail(pid: int) -> Optional[MemoryDetail]:
+    """None when the process is gone or belongs to another user."""
+    path = f"/proc/{pid}/smaps_rollup" if ROLLUP_AVAILABLE else f"/proc/{pid}/smaps"
+    try:
+        with open(path, "rb") as f:
+            return parse_smaps(f.read())
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SmapsReader:
+    """Background, cached smaps reads for a changing set of processes.
+
+    Call request() with every fresh process list; it queues the processes
+    whose cached entry is missing or stale and returns at once. values()
+    returns what is known so far. on_update, if given, is called from a
+    worker thread after each finished batch.
+    """
+
+    def __init__(self, workers: Optional[int] = None, on_update: Optional[Callable[[], None]] = None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1),
+                                           thread_name_prefix="smaps")
+        self.on_update = on_update
+        self.lock = threading.Lock()
+        self.cache: Dict[int, _Entry] = {}
+        self.pending: Set[int] = set()
+        self.updated: Set[int] = set()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def request(self, processes: List[ProcessSample]) -> None:
+        now = time.monotonic()
+        stale = []
+        with self.lock:
+            live = {proc.pid for proc in processes}
+            for pid in self.cache.keys() - live:
+                del self.cache[pid]
+            for proc in processes:
+                if proc.pid in self.pending:
+                    continue
+                entry = self.cache.get(proc.pid)
+                if (entry is None or entry.rss != proc.rss or entry.name != proc.name
+                        or now - entry.time >= MAX_AGE):
+                    stale.append(proc)
+                    self.pending.add(proc.pid)
+
+        for i in range(0, len(stale), BATCH_SIZE):
+            self.executor.submit(self._read_batch, stale[i:i + BATCH_SIZE])
+
+    def _read_batch(self, batch: List[ProcessSample]) -> None:
+        results = [(proc, read_memory_detail(proc.pid)) for proc in batch]
+        now = time.monotonic()
+        with self.lock:
+            for proc, detail in results:
+                self.pending.discard(proc.pid)
+                self.updated.add(proc.pid)
+                self.cache[proc.pid] = _Entry(proc.name, proc.rss, now, detail)
+        if self.on_update is not None:
+            self.on_update()
+
+    def detail(self, pid: int) -> Optional[MemoryDetail]:
+        entry = self.cache.get(pid)
+        return entry.detail if entry is not None else None
+
+    def take_updated(self) -> Set[int]:
+        """PIDs read since the last call."""
+        with self.lock:
+            updated, self.updated = self.updated, set()
+        return updated
+
+    def values(self, mode: str) -> Dict[int, int]:
+        """pid -> bytes for mode ("pss", "uss" or "swap"); unreadable processes are left out."""
+        index = MemoryDetail._fields.index(mode)
+        with self.lock:
+            return {pid: entry.detail[index] for pid, entry in self.cache.items()
+                    if entry.detail is not None}
@@ -0,0 +1,273 @@
+"""Live view of systemd service units, without blocking the GTK loop.
+
+ServiceMonitor loads every loaded .service unit with one Manager.ListUnits
+call on the system bus and then follows changes from signals: the
+PropertiesChanged of each unit object for state changes, and
+UnitNew/UnitRemoved for units being loaded or unloaded (a short,
+debounced ListUnits again). Nothing is polled.
+
+Without a usable system bus it falls back to one
+`systemctl list-units --output=json` per refresh(), run through
+muxos.asyncproc. Start/stop/restart go through the Manager methods with
+interactive authorization allowed, so polkit can ask for a password, or
+through an async systemctl call in fallback mode.
+
+run_in_scope() moves running processes into a new transient scope with
+its own CPU and IO weight, so systemd creates and cleans up the cgroup.
+"""
+
+import json
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from gi.repository import Gio, GLib
+
+from . import asyncproc
+
+SYSTEMD_BUS = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+MANAGER_IFACE = "org.freedesktop.systemd1.Manager"
+UNIT_IFACE = "org.freedesktop.systemd1.Unit"
+PROPERTIES_IFACE = "org.freedesktop.DBus.Properties"
+
+RELOAD_DELAY_MS = 500
+ACTIONS = {"start": "StartUnit", "stop": "StopUnit", "restart": "RestartUnit"}
+
+
+def run_in_scope(pids: List[int], weight: int, on_done: Callable[[Optional[str]], None]) -> None:
+    """Move pids into a new scope with CPUWeight and IOWeight set to weight.
+
+    Children the processes start later land in the scope too. polkit may
+    ask for a password; on_done gets None on success or an error message.
+    """
+    name = f"muxos-{pids[-1]}-{int(time.time())}.scope"
+    properties = [
+        ("Description", GLib.Variant("s", f"Processes moved by the MuxOS Task Manager (weight {weight})")),
+        ("PIDs", GLib.Variant("au", pids)),
+        ("CPUWeight", GLib.Variant("t", weight)),
+        ("IOWeight", GLib.Variant("t", weight)),
+    ]
+
+    def on_done_call(bus, result):
+        try:
+            bus.call_finish(result)
+        except GLib.Error as e:
+            Gio.DBusError.strip_remote_error(e)
+            on_done(e.message)
+            return
+        on_done(None)
+
+    def on_bus(source, result):
+        try:
+            bus = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            on_done(e.message)
+            return
+        bus.call(SYSTEMD_BUS, SYSTEMD_PATH, MANAGER_IFACE, "StartTransientUnit",
+                 GLib.Variant("(ssa(sv)a(sa(sv)))", (name, "fail", properties, [])), None,
+                 Gio.DBusCallFlags.ALLOW_INTERACTIVE_AUTHORIZATION, -1, None, on_done_call)
+
+    Gio.bus_get(Gio.BusType.SYSTEM, None, on_bus)
+
+
+class ServiceUnit(NamedTuple):
+    name: str
+    description: str
+    load_state: str
+    active_state: str
+    sub_state: str
+    path: Optional[str]
+
+    @property
+    def status(self) -> str:
+        return f"{self.active_state} ({self.sub_state})"
+
+
+class ServiceMonitor:
+    """Keeps a table of service units up to date.
+
+    on_reset(units) replaces the whole table, on_changed(unit) updates or
+    adds one row, on_removed(name) drops one and on_error(message)
+    reports a failure. All callbacks run on the GLib main loop.
+    """
+
+    def __init__(self, on_reset: Callable[[List[ServiceUnit]], None],
+                 on_changed: Callable[[ServiceUnit], None],
+                 on_removed: Callable[[str], None],
+                 on_error: Callable[[str], None]):
+        self.on_reset = on_reset
+        self.on_changed = on_changed
+        self.on_removed = on_removed
+        self.on_error = on_error
+        self.bus: Optional[Gio.DBusConnection] = None
+        self.fallback = False
+        self.started = False
+        self.units: Dict[str, ServiceUnit] = {}
+        self.paths: Dict[str, str] = {}  # object path -> unit name
+        self.subscriptions: List[int] = []
+        self.reload_id: Optional[int] = None
+        self.listing = False
+
+    def refresh(self) -> None:
+        """Load the units the first time; in fallback mode, list them again."""
+        if not self.started:
+            self.started = True
+            Gio.bus_get(Gio.BusType.SYSTEM, None, self._on_bus)
+        elif self.fallback:
+            self._list_systemctl()
+
+    def close(self) -> None:
+        if self.reload_id is not None:
+            GLib.source_remove(self.reload_id)
+            self.reload_id = None
+        if self.bus is not None:
+            for subscription in self.subscriptions:
+                self.bus.signal_unsubscribe(subscription)
+            self.subscriptions = []
+            self.bus = None
+
+    # D-Bus
+
+    def _on_bus(self, source, result):
+        try:
+            self.bus = Gio.bus_get_finish(result)
+        except GLib.Error:
+            self._use_fallback()
+            return
+        self.subscriptions = [
+            self.bus.signal_subscribe(SYSTEMD_BUS, PROPERTIES_IFACE, "PropertiesChanged", None,
+                                      UNIT_IFACE, Gio.DBusSignalFlags.NONE, self._on_properties_changed),
+            self.bus.signal_subscribe(SYSTEMD_BUS, MANAGER_IFACE, "UnitNew", SYSTEMD_PATH,
+                                      None, Gio.DBusSignalFlags.NONE, self._on_unit_set_changed),
+            self.bus.signal_subscribe(SYSTEMD_BUS, MANAGER_IFACE, "UnitRemoved", SYSTEMD_PATH,
+                                      None, Gio.DBusSignalFlags.NONE, self._on_unit_set_changed),
+        ]
+        # systemd only emits unit signals while at least one client is subscribed
+        self._call("Subscribe", None, None)
+        self._list_units()
+
+    def _call(self, method: str, parameters, callback, flags=Gio.DBusCallFlags.NONE):
+        self.bus.call(SYSTEMD_BUS, SYSTEMD_PATH, MANAGER_IFACE, method, parameters, None,
+                      flags, -1, None, callback)
+
+    def _list_units(self):
+        if self.listing:
+            return
+        self.listing = True
+        self._call("ListUnits", None, self._on_list_units)
+
+    def _on_list_units(self, bus, result):
+        self.listing = False
+        try:
+            (units,) = bus.call_finish(result).unpack()
+        except GLib.Error:
+            self.close()
+            self._use_fallback()
+            return
+        services = [
+            ServiceUnit(name, description, load, active, sub, path)
+            for name, description, load, active, sub, _, path, _, _, _ in units
+            if name.endswith(".service")
+        ]
+        self._reset(services)
+
+    def _on_properties_changed(self, bus, sender, path, interface, signal, parameters):
+        name = self.paths.get(path)
+        if name is None:
+            return
+        _, changed, _ = parameters.unpack()
+        unit = self.units[name]
+        updated = unit._replace(
+            active_state=changed.get("ActiveState", unit.active_state),
+            sub_state=changed.get("SubState", unit.sub_state),
+            load_state=changed.get("LoadState", unit.load_state),
+            description=changed.get("Description", unit.description),
+        )
+        if updated != unit:
+            self.units[name] = updated
+            self.on_changed(updated)
+
+    def _on_unit_set_changed(self, bus, sender, path, interface, signal, parameters):
+        name, _ = parameters.unpack()
+        if not name.endswith(".service"):
+            return
+        # Units come and go in bursts (daemon-reload, boot): batch them
+        if self.reload_id is None:
+            self.reload_id = GLib.timeout_add(RELOAD_DELAY_MS, self._on_reload_timeout)
+
+    def _on_reload_timeout(self):
+        self.reload_id = None
+        self._list_units()
+        return False
+
+    # systemctl fallback
+
+    def _use_fallback(self):
+        self.fallback = True
+        self._list_systemctl()
+
+    def _list_systemctl(self):
+        if self.listing:
+            return
+        self.listing = True
+        asyncproc.run(["systemctl", "list-units", "--type=service", "--all", "--output=json", "--no-pager"],
+                      self._on_systemctl_listed)
+
+    def _on_systemctl_listed(self, result):
+        self.listing = False
+        if result.status is None:
+            self.on_error(f"Cannot list services: {result.error or 'systemctl timed out'}")
+            return
+        try:
+            entries = json.loads(result.output or "[]")
+        except ValueError as e:
+            self.on_error(f"Cannot list services: {e}")
+            return
+        self._reset([
+            ServiceUnit(entry.get("unit", ""), entry.get("description", ""), entry.get("load", ""),
+                        entry.get("active", ""), entry.get("sub", ""), None)
+            for entry in entries if entry.get("unit", "").endswith(".service")
+        ])
+
+    # Shared
+
+    def _reset(self, services: List[ServiceUnit]):
+        first = not self.units
+        current = {unit.name: unit for unit in services}
+        if first:
+            self.units = current
+            self.on_reset(services)
+        else:
+            for name in self.units.keys() - current.keys():
+                self.on_removed(name)
+            for name, unit in current.items():
+                if self.units.get(name) != unit:
+                    self.on_changed(unit)
+            self.units = current
+        self.paths = {unit.path: unit.name for unit in services if unit.path}
+
+    def run_action(self, action: str, name: str) -> None:
+        """Start, stop or restart name in the background; failures go to on_error."""
+        if self.bus is not None and not self.fallback:
+            self._call(ACTIONS[action], GLib.Variant("(ss)", (name, "replace")),
+                       lambda bus, result: self._on_action_done(bus, result, action, name),
+                       Gio.DBusCallFlags.ALLOW_INTERACTIVE_AUTHORIZATION)
+            return
+        # No timeout: polkit may be waiting for a password
+        asyncproc.run(["systemctl", action, name],
+                      lambda result: self._on_systemctl_action_done(result, action, name),
+                      timeout=None, merge_stderr=True)
+
+    def _on_action_done(self, bus, result, action, name):
+        try:
+            bus.call_finish(result)
+        except GLib.Error as e:
+            Gio.DBusError.strip_remote_error(e)
+            self.on_error(f"Cannot {action} {name}: {e.message}")
+
+    def _on_systemctl_action_done(self, result, action, name):
+        if not result.ok:
+            self.on_error(f"Cannot {action} {name}: {result.error or result.output.strip()}")
+        else:
+            # No signals in fallback mode: show the new state right away
+            self._list_systemctl()
@@ -0,0 +1,396 @@
+"""Cairo-drawn widgets and GTK helpers shared by the MuxOS monitor apps."""
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+import cairo
+
+from .history import RingBuffer
+
+BACKGROUND = "#12121c"
+GRID = "#27273a"
+
+
+def hex_to_rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def nice_ceiling(value):
+    """Round a graph scale up to 1, 2 or 5 times a power of ten."""
+    if value <= 0:
+        return 1.0
+    magnitude = 10 ** len(str(int(value)))
+    magnitude /= 10
+    for factor in (1, 2, 5, 10):
+        if value <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+class MultiColumnSort:
+    """Clicking a column header sorts by it, with the previous sort column as tie-break.
+
+    Installs a sort function for each sortable column of a TreeModelSort.
+    Numeric columns should point at hidden numeric model columns, not at
+    the formatted text, so "9.5%" sorts below "12.0%".
+    """
+
+    def __init__(self, sort_model: Gtk.TreeModelSort, columns):
+        self.primary = None
+        self.secondary = None
+        for column in columns:
+            sort_model.set_sort_func(column, self.compare, column)
+        sort_model.connect("sort-column-changed", self.on_sort_column_changed)
+
+    def on_sort_column_changed(self, sort_model):
+        column, _ = sort_model.get_sort_column_id()
+        if column != self.primary:
+            self.secondary = self.primary
+            self.primary = column
+
+    @staticmethod
+    def _cmp(model, a, b, column):
+        va = model.get_value(a, column)
+        vb = model.get_value(b, column)
+        return (va > vb) - (va < vb)
+
+    def compare(self, model, a, b, column):
+        result = self._cmp(model, a, b, column)
+        if result == 0 and self.secondary is not None and self.secondary != column:
+            result = self._cmp(model, a, b, self.secondary)
+        return result
+
+
+def set_changed_cells(store, treeiter, old_row, row):
+    """Write only the cells of row that differ from old_row, which is what the store holds."""
+    changed = [i for i in range(len(row)) if row[i] != old_row[i]]
+    if changed:
+        store.set(treeiter, changed, [row[i] for i in changed])
+
+
+def sync_list_store(store: Gtk.ListStore, iters, old_rows, rows):
+    """Bring store in line with rows, keyed by the value in column 0 (a PID for process lists).
+
+    Existing rows are updated in place (only the cells that changed), new
+    keys are appended and rows that went away are removed, so the
+    selection and scroll position survive a refresh. iters and old_rows
+    are the caller's key -> TreeIter and key -> row dicts for store;
+    ListStore iters stay valid while their row exists.
+    """
+    seen = set()
+    for row in rows:
+        key = row[0]
+        seen.add(key)
+        old_row = old_rows.get(key)
+        if old_row is None:
+            iters[key] = store.append(row)
+        elif old_row != row:
+            set_changed_cells(store, iters[key], old_row, row)
+        else:
+            continue
+        old_rows[key] = row
+
+    for key in old_rows.keys() - seen:
+        store.remove(iters.pop(key))
+        del old_rows[key]
+
+
+class SparklineGraph(Gtk.DrawingArea):
+    """Scrolling area graph of a RingBuffer.
+
+    The plot is kept in an off-screen image. When a sample arrives, the
+    image is shifted left by one step and only the new column is drawn,
+    so the cost per tick does not depend on the width of the graph. A full
+    repaint only happens on resize or when the auto scale changes.
+    """
+
+    def __init__(self, buffer: RingBuffer, color="#7c3aed", max_value=None, step=3, height=60):
+        Gtk.DrawingArea.__init__(self)
+        self.buffer = buffer
+        self.color = hex_to_rgb(color)
+        self.fixed_max = max_value
+        self.scale = max_value or 1.0
+        self.step = step
+        self.surface = None
+        self.back_surface = None
+        self.pushes_since_rescale = 0
+        self.set_size_request(-1, height)
+        self.connect("draw", self.on_draw)
+        self.connect("size-allocate", self.on_size_allocate)
+
+    def on_size_allocate(self, widget, allocation):
+        if self.surface is None or (self.surface.get_width(), self.surface.get_height()) != (allocation.width, allocation.height):
+            self.surface = None
+
+    def visible_samples(self):
+        width = self.get_allocated_width()
+        return max(2, width // self.step + 2)
+
+    def y_for(self, value, height):
+        fraction = min(1.0, max(0.0, value / self.scale)) if self.scale else 0.0
+        return height - 1 - fraction * (height - 2)
+
+    def paint_background(self, cr, width, height):
+        cr.set_source_rgb(*hex_to_rgb(BACKGROUND))
+        cr.rectangle(0, 0, width, height)
+        cr.fill()
+        cr.set_source_rgb(*hex_to_rgb(GRID))
+        cr.set_line_width(1)
+        for quarter in (1, 2, 3):
+            y = int(height * quarter / 4) + 0.5
+            cr.move_to(0, y)
+            cr.line_to(width, y)
+        cr.stroke()
+
+    def draw_segment(self, cr, x, previous, value, height):
+        """Draw the column between x - step and x."""
+        y0 = self.y_for(previous, height)
+        y1 = self.y_for(value, height)
+        r, g, b = self.color
+        cr.move_to(x - self.step, height)
+        cr.line_to(x - self.step, y0)
+        cr.line_to(x, y1)
+        cr.line_to(x, height)
+        cr.close_path()
+        cr.set_source_rgba(r, g, b, 0.35)
+        cr.fill()
+        cr.move_to(x - self.step, y0)
+        cr.line_to(x, y1)
+        cr.set_source_rgb(r, g, b)
+        cr.set_line_width(1.5)
+        cr.stroke()
+
+    def update_scale(self, samples):
+        if self.fixed_max:
+            return False
+        scale = nice_ceiling(max(samples) if samples else 0)
+        if scale != self.scale:
+            self.scale = scale
+            return True
+        return False
+
+    def render_all(self):
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        if width <= 0 or height <= 0:
+            return
+        self.surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        self.back_surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        samples = self.buffer.latest(self.visible_samples())
+        self.update_scale(samples)
+        self.pushes_since_rescale = 0
+
+        cr = cairo.Context(self.surface)
+        self.paint_background(cr, width, height)
+        x = width - (len(samples) - 1) * self.step
+        for previous, value in zip(samples, samples[1:]):
+            x += self.step
+            self.draw_segment(cr, x, previous, value, height)
+
+    def refresh(self):
+        """Repaint everything, e.g. after the buffer was filled in bulk."""
+        self.surface = None
+        self.queue_draw()
+
+    def push(self):
+        """Call after appending a sample to the buffer."""
+        if self.surface is None or len(self.buffer) < 2:
+            self.queue_draw()
+            return
+
+        value = self.buffer[-1]
+        self.pushes_since_rescale += 1
+        rescale = not self.fixed_max and (
+            value > self.scale or self.pushes_since_rescale >= self.visible_samples())
+        if rescale and self.update_scale(self.buffer.latest(self.visible_samples())):
+            self.surface = None
+            self.queue_draw()
+            return
+        if rescale:
+            self.pushes_since_rescale = 0
+
+        width = self.surface.get_width()
+        height = self.surface.get_height()
+        cr = cairo.Context(self.back_surface)
+        cr.set_source_surface(self.surface, -self.step, 0)
+        cr.paint()
+        # Background and grid for the newly exposed column only
+        cr.save()
+        cr.rectangle(width - self.step, 0, self.step, height)
+        cr.clip()
+        self.paint_background(cr, width, height)
+        cr.restore()
+        self.draw_segment(cr, width, self.buffer[-2], value, height)
+        self.surface, self.back_surface = self.back_surface, self.surface
+        self.queue_draw()
+
+    def on_draw(self, widget, cr):
+        if self.surface is None:
+            self.render_all()
+        if self.surface is not None:
+            cr.set_source_surface(self.surface, 0, 0)
+            cr.paint()
+        return False
+
+
+HEAT_STOPS = ((0.0, "#12121c"), (0.2, "#312e81"), (0.45, "#7c3aed"), (0.7, "#f59e0b"), (1.0, "#ef4444"))
+HEAT_LEVELS = 20
+
+
+def heat_palette(levels=HEAT_LEVELS):
+    """levels + 1 colours from idle to saturated, interpolated along HEAT_STOPS."""
+    stops = [(position, hex_to_rgb(color)) for position, color in HEAT_STOPS]
+    palette = []
+    for level in range(levels + 1):
+        t = level / levels
+        for (p0, c0), (p1, c1) in zip(stops, stops[1:]):
+            if t <= p1:
+                f = (t - p0) / (p1 - p0)
+                palette.append(tuple(a + (b - a) * f for a, b in zip(c0, c1)))
+                break
+    return palette
+
+
+class CoreHeatmap(Gtk.DrawingArea):
+    """Per-core CPU usage as a heat map, one row per core.
+
+    Each row starts with a cell coloured by the current usage, followed
+    by a strip of past samples scrolling to the left. Like SparklineGraph
+    the picture lives in an off-screen image: a new sample shifts the
+    strips by one step and paints one cell per core, and a current cell
+    is only repainted when its colour level changed. Rows get thinner as
+    the core count grows, so 64 threads still fit in a few hundred pixels.
+    Parked or idle cores stay dark, saturated ones glow red.
+    """
+
+    LABEL_WIDTH = 28
+    CELL_WIDTH = 16
+    GAP = 6
+
+    def __init__(self, history, step=3, max_row_height=12, min_row_height=4):
+        Gtk.DrawingArea.__init__(self)
+        self.history = history
+        self.step = step
+        self.max_row_height = max_row_height
+        self.min_row_height = min_row_height
+        self.palette = heat_palette()
+        self.cores = 0
+        self.levels = []  # colour level of each current cell as last painted
+        self.surface = None
+        self.back_surface = None
+        self.set_has_tooltip(True)
+        self.connect("draw", self.on_draw)
+        self.connect("size-allocate", self.on_size_allocate)
+        self.connect("query-tooltip", self.on_query_tooltip)
+
+    @property
+    def row_height(self):
+        return max(self.min_row_height, min(self.max_row_height, 320 // max(1, self.cores)))
+
+    @property
+    def strip_x(self):
+        return self.LABEL_WIDTH + self.CELL_WIDTH + self.GAP
+
+    def level(self, value):
+        return int(min(100.0, max(0.0, value)) * HEAT_LEVELS / 100 + 0.5)
+
+    def buffer(self, core):
+        return self.history[f"cpu{core}"]
+
+    def on_size_allocate(self, widget, allocation):
+        if self.surface is None or (self.surface.get_width(), self.surface.get_height()) != (allocation.width, allocation.height):
+            self.surface = None
+
+    def set_cores(self, cores):
+        if cores != self.cores:
+            self.cores = cores
+            self.set_size_request(-1, cores * self.row_height)
+            self.surface = None
+            self.queue_resize()
+
+    def paint_cell(self, cr, x, core, value, width):
+        cr.set_source_rgb(*self.palette[self.level(value)])
+        cr.rectangle(x, core * self.row_height, width, self.row_height - 1)
+        cr.fill()
+
+    def render_all(self):
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        if width <= 0 or height <= 0 or not self.cores:
+            return
+        self.surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        self.back_surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        cr = cairo.Context(self.surface)
+        cr.set_source_rgb(*hex_to_rgb(BACKGROUND))
+        cr.paint()
+
+        row = self.row_height
+        cr.select_font_face("Sans")
+        cr.set_font_size(min(10, row))
+        columns = (width - self.strip_x) // self.step + 1
+        self.levels = []
+        for core in range(self.cores):
+            # Label every row while they are tall enough to read, else every fourth
+            if row >= 8 or core % 4 == 0:
+                cr.set_source_rgb(*hex_to_rgb(GRID if row < 8 else "#9ca3af"))
+                cr.move_to(2, core * row + min(10, row) - 1)
+                cr.show_text(str(core))
+            samples = self.buffer(core).latest(columns)
+            value = samples[-1] if samples else 0.0
+            self.paint_cell(cr, self.LABEL_WIDTH, core, value, self.CELL_WIDTH)
+            self.levels.append(self.level(value))
+            x = width - len(samples) * self.step
+            for sample in samples:
+                self.paint_cell(cr, x, core, sample, self.step)
+                x += self.step
+
+    def refresh(self):
+        """Repaint everything, e.g. after the history was filled in bulk."""
+        self.surface = None
+        self.queue_draw()
+
+    def push(self, cores):
+        """Call after History.append_cores(); cores is the number of values appended."""
+        self.set_cores(cores)
+        if self.surface is None:
+            self.queue_draw()
+            return
+
+        width = self.surface.get_width()
+        height = self.surface.get_height()
+        cr = cairo.Context(self.back_surface)
+        cr.set_source_surface(self.surface, 0, 0)
+        cr.paint()
+        cr.save()
+        cr.rectangle(self.strip_x, 0, width - self.strip_x, height)
+        cr.clip()
+        cr.set_source_surface(self.surface, -self.step, 0)
+        cr.paint()
+        cr.restore()
+
+        for core in range(self.cores):
+            buffer = self.buffer(core)
+            value = buffer[-1] if len(buffer) else 0.0
+            self.paint_cell(cr, width - self.step, core, value, self.step)
+            level = self.level(value)
+            if level != self.levels[core]:
+                self.levels[core] = level
+                self.paint_cell(cr, self.LABEL_WIDTH, core, value, self.CELL_WIDTH)
+        self.surface, self.back_surface = self.back_surface, self.surface
+        self.queue_draw()
+
+    def on_draw(self, widget, cr):
+        if self.surface is None:
+            self.render_all()
+        if self.surface is not None:
+            cr.set_source_surface(self.surface, 0, 0)
+            cr.paint()
+        return False
+
+    def on_query_tooltip(self, widget, x, y, keyboard_mode, tooltip):
+        core = y // self.row_height
+        if not 0 <= core < self.cores or not len(self.buffer(core)):
+            return False
+        tooltip.set_text(f"CPU {core}: {self.buffer(core)[-1]:.0f}%")
+        return True
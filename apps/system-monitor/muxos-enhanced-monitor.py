@@ -6,7 +6,185 @@ from gi.repository import Gtk, GLib, Pango
 import psutil
 import os
 import threading
-import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib"))
+from muxos.metrics import SnapshotSource
+from muxos.history import History
+from muxos import hwprobe
+from muxos.hwcache import shared_cache
+from muxos.netconns import ConnectionSampler
+from muxos.procfs import disk_rates, nic_rates
+from muxos.scheduler import RefreshScheduler
+from muxos.search import SearchIndex
+from muxos.widgets import CoreHeatmap, MultiColumnSort, SparklineGraph, sync_list_store
+
+def format_rate(bytes_per_second):
+    if bytes_per_second >= 1024 ** 2:
+        return f"{bytes_per_second / 1024 ** 2:.1f} MB/s"
+    return f"{bytes_per_second / 1024:.1f} KB/s"
+
+class MonitorSnapshot:
+    """One round of system data, ready to be pushed into the widgets.
+    
+    sources names the parts that were collected; the rest keep their
+    defaults and must not be shown.
+    """
+    
+    def __init__(self, sources=()):
+        self.sources = set(sources)
+        self.processes = []
+        self.cpu_percent = 0.0
+        self.cpu_per_core = []
+        self.memory = None
+        self.swap = None
+        self.load_avg = (0, 0, 0)
+        self.uptime = 0
+        self.connections = []
+        self.disks = []
+        self.disk_rates = None  # device name -> DiskRates, None on the first round
+        self.nic_rates = None  # interface name -> NicRates
+
+class SamplerThread(threading.Thread):
+    """Collects MonitorSnapshots on request and hands them to the GTK loop.
+    
+    request() queues one of SOURCES; requests that arrive while a round
+    is being collected are merged into the next one. The window's
+    RefreshScheduler decides what is requested when, so nothing is read
+    for tabs nobody is looking at.
+    
+    Data comes from muxos-metricsd when it is running, otherwise from a
+    local ProcSampler. Either way CPU usage is a delta since the previous
+    sample, so the thread never sleeps inside a measurement. On start the
+    daemon's stored history is passed to history_callback.
+    
+    Disk and network rates are per device and divided by the time that
+    really passed between two readings (time.monotonic()), so a late tick
+    does not show up as a spike.
+    """
+    
+    SOURCES = ("system", "processes", "connections", "disks")
+    
+    def __init__(self, callback, interval=2, history_callback=None):
+        threading.Thread.__init__(self, daemon=True)
+        self.callback = callback
+        self.history_callback = history_callback
+        self.interval = interval
+        self.sampler = SnapshotSource()
+        self.search = SearchIndex()
+        self.connection_sampler = ConnectionSampler()
+        self.last_disks = {}
+        self.last_nics = {}
+        self.last_io_time = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+    
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+    
+    def request(self, source):
+        with self._lock:
+            self._pending.add(source)
+        self._wake.set()
+    
+    def run(self):
+        # Prime the CPU and I/O counters so the first real round has a baseline
+        self.sampler.sample()
+        self.collect_io(MonitorSnapshot())
+        if self.history_callback and self.sampler.remote:
+            names = ["cpu", "memory", "net_upload", "net_download"]
+            names += [f"cpu{i}" for i in range(os.cpu_count() or 1)]
+            series = self.sampler.history(names, step=self.interval)
+            if series:
+                GLib.idle_add(self.history_callback, series)
+        
+        while True:
+            self._wake.wait()
+            if self._stop_event.is_set():
+                break
+            with self._lock:
+                sources = self._pending
+                self._pending = set()
+                self._wake.clear()
+            snapshot = self.collect(sources)
+            if self._stop_event.is_set():
+                break
+            GLib.idle_add(self.callback, snapshot)
+        self.sampler.close()
+        self.connection_sampler.close()
+    
+    def collect(self, sources):
+        snapshot = MonitorSnapshot(sources)
+        
+        processes = None
+        if "system" in sources:
+            system = self.sampler.sample(processes="processes" in sources)
+            processes = system.processes
+            snapshot.cpu_percent = system.cpu_percent
+            snapshot.cpu_per_core = system.cpu_per_core
+            snapshot.memory = system.memory
+            snapshot.swap = system.swap
+            snapshot.load_avg = system.load_avg
+            snapshot.uptime = system.uptime
+            self.collect_io(snapshot)
+        elif "processes" in sources:
+            processes = self.sampler.read_processes()
+        
+        if processes is not None:
+            self.search.sync(processes)
+        for proc in processes or []:
+            snapshot.processes.append((
+                proc.pid,
+                proc.name[:30],  # Truncate long names
+                f"{proc.cpu_percent:.1f}",
+                f"{proc.rss / 1024 / 1024:.1f} MB",
+                proc.status,
+                proc.cpu_percent,  # hidden: numeric sort keys and the search key
+                float(proc.rss),
+                self.search.key(proc.pid)
+            ))
+        
+        if "connections" in sources:
+            snapshot.connections = [
+                (conn, self.connection_sampler.process_name(conn.pid) if conn.pid else None)
+                for conn in self.connection_sampler.sample()
+            ]
+        
+        if "disks" in sources:
+            for partition in psutil.disk_partitions():
+                try:
+                    usage = psutil.disk_usage(partition.mountpoint)
+                except OSError:
+                    continue
+                snapshot.disks.append([
+                    partition.device,
+                    f"{usage.total / 1024**3:.1f} GB",
+                    f"{usage.used / 1024**3:.1f} GB",
+                    f"{usage.free / 1024**3:.1f} GB"
+                ])
+        return snapshot
+    
+    def collect_io(self, snapshot):
+        disks = self.sampler.read_disks()
+        nics = self.sampler.read_nics()
+        now = time.monotonic()
+        if self.last_io_time is not None and now > self.last_io_time:
+            elapsed = now - self.last_io_time
+            snapshot.disk_rates = {
+                name: disk_rates(self.last_disks[name], counters, elapsed)
+                for name, counters in disks.items() if name in self.last_disks
+            }
+            snapshot.nic_rates = {
+                name: nic_rates(self.last_nics[name], counters, elapsed)
+                for name, counters in nics.items() if name in self.last_nics
+            }
+        self.last_disks = disks
+        self.last_nics = nics
+        self.last_io_time = now
 
 class EnhancedSystemMonitor(Gtk.Window):
     def __init__(self):
@@ -39,6 +217,10 @@ class EnhancedSystemMonitor(Gtk.Window):
         notebook = Gtk.Notebook()
         main_box.pack_start(notebook, True, True, 0)
         
+        # One hour of history per metric at the sampling interval
+        self.sample_interval = 2
+        self.history = History(3600 // self.sample_interval)
+        
         # Create tabs
         self.create_processes_page(notebook)
         self.create_resources_page(notebook)
@@ -51,37 +233,69 @@ class EnhancedSystemMonitor(Gtk.Window):
         self.status_label.set_halign(Gtk.Align.START)
         main_box.pack_start(self.status_label, False, False, 5)
         
-        # Start updates
-        GLib.timeout_add_seconds(2, self.update_data)
+        # Start updates; sampling happens on a background thread and the
+        # results are handed back to the main loop one snapshot per round.
+        # CPU, memory and I/O rates feed the graphs and stay on for every
+        # tab; the tables are only refreshed while their tab is showing.
+        self.sampler = SamplerThread(self.on_snapshot, interval=self.sample_interval,
+                                     history_callback=self.on_history)
+        self.scheduler = RefreshScheduler(self, notebook)
+        self.scheduler.add("system", lambda: self.sampler.request("system"), self.sample_interval)
+        self.scheduler.add("processes", lambda: self.sampler.request("processes"), self.sample_interval,
+                           pages=[self.processes_page])
+        self.scheduler.add("connections", lambda: self.sampler.request("connections"), 5,
+                           pages=[self.network_page], max_interval=20)
+        self.scheduler.add("disks", lambda: self.sampler.request("disks"), 10,
+                           pages=[self.storage_page], max_interval=60)
+        self.hardware = shared_cache()
+        self.connect("destroy", self.on_destroy)
+        self.sampler.start()
+        self.scheduler.start()
         self.update_hardware_info()
     
     def create_processes_page(self, notebook):
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
         
-        self.process_store = Gtk.ListStore(int, str, str, str, str)
+        self.process_search = Gtk.SearchEntry()
+        self.process_search.set_placeholder_text("Filter by name or command line")
+        self.process_search.connect("search-changed", self.on_process_search_changed)
+        box.pack_start(self.process_search, False, False, 0)
+        self.process_filter_text = ""
         
-        treeview = Gtk.TreeView(model=self.process_store)
-        
-        # Columns
-        renderer = Gtk.CellRendererText()
-        column = Gtk.TreeViewColumn("PID", renderer, text=0)
-        treeview.append_column(column)
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         
-        column = Gtk.TreeViewColumn("Name", renderer, text=1)
-        treeview.append_column(column)
+        # Columns 5-7 are hidden: CPU and RSS as numbers, and the search key
+        self.process_store = Gtk.ListStore(int, str, str, str, str, float, float, str)
+        self.process_iters = {}  # pid -> Gtk.TreeIter (ListStore iters persist)
+        self.process_rows = {}  # pid -> row last written to the store
         
-        column = Gtk.TreeViewColumn("CPU %", renderer, text=2)
-        treeview.append_column(column)
+        self.process_filter = self.process_store.filter_new()
+        self.process_filter.set_visible_func(self.process_visible)
+        process_sort = Gtk.TreeModelSort(model=self.process_filter)
+        self.process_sort = MultiColumnSort(process_sort, [0, 1, 4, 5, 6])
         
-        column = Gtk.TreeViewColumn("Memory", renderer, text=3)
-        treeview.append_column(column)
+        treeview = Gtk.TreeView(model=process_sort)
         
-        column = Gtk.TreeViewColumn("Status", renderer, text=4)
-        treeview.append_column(column)
+        # Columns, each sorted by its own data or by the hidden numeric column
+        renderer = Gtk.CellRendererText()
+        for title, text_column, sort_column in [("PID", 0, 0), ("Name", 1, 1), ("CPU %", 2, 5),
+                                                ("Memory", 3, 6), ("Status", 4, 4)]:
+            column = Gtk.TreeViewColumn(title, renderer, text=text_column)
+            column.set_sort_column_id(sort_column)
+            treeview.append_column(column)
         
         scrolled.add(treeview)
-        notebook.append_page(scrolled, Gtk.Label(label="Processes"))
+        box.pack_start(scrolled, True, True, 0)
+        self.processes_page = box
+        notebook.append_page(box, Gtk.Label(label="Processes"))
+    
+    def process_visible(self, model, treeiter, data):
+        return not self.process_filter_text or self.process_filter_text in model.get_value(treeiter, 7)
+    
+    def on_process_search_changed(self, entry):
+        self.process_filter_text = entry.get_text().strip().lower()
+        self.process_filter.refilter()
     
     def create_resources_page(self, notebook):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=15)
@@ -107,10 +321,12 @@ class EnhancedSystemMonitor(Gtk.Window):
         self.cpu_bar.set_margin_top(5)
         cpu_box.pack_start(self.cpu_bar, False, False, 0)
         
+        self.cpu_graph = SparklineGraph(self.history["cpu"], color="#7c3aed", max_value=100)
+        cpu_box.pack_start(self.cpu_graph, False, False, 5)
+        
         # CPU Cores
-        self.cpu_cores_label = Gtk.Label()
-        self.cpu_cores_label.set_xalign(0)
-        cpu_box.pack_start(self.cpu_cores_label, False, False, 5)
+        self.core_heatmap = CoreHeatmap(self.history)
+        cpu_box.pack_start(self.core_heatmap, False, False, 5)
         
         cpu_frame.add(cpu_box)
         box.pack_start(cpu_frame, False, False, 0)
@@ -132,6 +348,9 @@ class EnhancedSystemMonitor(Gtk.Window):
         self.mem_bar.set_margin_top(5)
         mem_box.pack_start(self.mem_bar, False, False, 0)
         
+        self.mem_graph = SparklineGraph(self.history["memory"], color="#22d3ee", max_value=100)
+        mem_box.pack_start(self.mem_graph, False, False, 5)
+        
         mem_frame.add(mem_box)
         box.pack_start(mem_frame, False, False, 0)
         
@@ -220,36 +439,57 @@ class EnhancedSystemMonitor(Gtk.Window):
         self.net_download_label.set_xalign(0)
         net_box.pack_start(self.net_download_label, False, False, 0)
         
+        self.net_upload_graph = SparklineGraph(self.history["net_upload"], color="#a855f7")
+        net_box.pack_start(self.net_upload_graph, False, False, 5)
+        self.net_download_graph = SparklineGraph(self.history["net_download"], color="#34d399")
+        net_box.pack_start(self.net_download_graph, False, False, 5)
+        
         net_frame.add(net_box)
         box.pack_start(net_frame, False, False, 0)
         
-        # Network Connections
+        # Per-interface rates
+        nic_frame = Gtk.Frame(label="Interfaces")
+        nic_frame.set_label_align(0.05, 0.5)
+        self.nic_store = Gtk.ListStore(str, str, str, str, str, str, str)
+        self.nic_iters = {}
+        self.nic_rows = {}
+        nic_treeview = Gtk.TreeView(model=self.nic_store)
+        renderer = Gtk.CellRendererText()
+        for i, title in enumerate(["Interface", "Download", "Upload", "Packets In/s",
+                                   "Packets Out/s", "New Errors", "New Drops"]):
+            nic_treeview.append_column(Gtk.TreeViewColumn(title, renderer, text=i))
+        nic_frame.add(nic_treeview)
+        box.pack_start(nic_frame, False, False, 0)
+        
+        # Network Connections, one expandable group per owning process
         conn_frame = Gtk.Frame(label="Active Connections")
         conn_frame.set_label_align(0.05, 0.5)
         conn_scrolled = Gtk.ScrolledWindow()
         conn_scrolled.set_min_content_height(200)
         
-        self.connection_store = Gtk.ListStore(str, str, str, str)
+        self.connection_store = Gtk.TreeStore(str, str, str, str, str)
+        self.connection_groups = {}  # pid (None for unknown owner) -> group iter
+        self.connection_iters = {}  # (proto, local, remote, inode, pid) -> row iter
+        self.connection_rows = {}
         
         conn_treeview = Gtk.TreeView(model=self.connection_store)
         
         renderer = Gtk.CellRendererText()
-        column = Gtk.TreeViewColumn("Local Address", renderer, text=0)
-        conn_treeview.append_column(column)
-        
-        column = Gtk.TreeViewColumn("Remote Address", renderer, text=1)
-        conn_treeview.append_column(column)
-        
-        column = Gtk.TreeViewColumn("Status", renderer, text=2)
-        conn_treeview.append_column(column)
-        
-        column = Gtk.TreeViewColumn("PID", renderer, text=3)
-        conn_treeview.append_column(column)
+        for i, (title, width) in enumerate([("Process / Local Address", 260), ("Remote Address", 220),
+                                            ("Protocol", 70), ("Status", 110), ("PID", 70)]):
+            column = Gtk.TreeViewColumn(title, renderer, text=i)
+            # Fixed sizing lets the view skip measuring every row
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            column.set_fixed_width(width)
+            column.set_resizable(True)
+            conn_treeview.append_column(column)
+        conn_treeview.set_fixed_height_mode(True)
         
         conn_scrolled.add(conn_treeview)
         conn_frame.add(conn_scrolled)
         box.pack_start(conn_frame, True, True, 0)
         
+        self.network_page = box
         notebook.append_page(box, Gtk.Label(label="Network"))
     
     def create_storage_page(self, notebook):
@@ -266,6 +506,7 @@ class EnhancedSystemMonitor(Gtk.Window):
         disk_scrolled.set_min_content_height(200)
         
         self.disk_store = Gtk.ListStore(str, str, str, str)
+        self.disk_rows = None
         
         disk_treeview = Gtk.TreeView(model=self.disk_store)
         
@@ -303,48 +544,58 @@ class EnhancedSystemMonitor(Gtk.Window):
         self.disk_write_label.set_xalign(0)
         io_box.pack_start(self.disk_write_label, False, False, 0)
         
+        self.disk_read_graph = SparklineGraph(self.history["disk_read"], color="#22d3ee")
+        io_box.pack_start(self.disk_read_graph, False, False, 5)
+        self.disk_write_graph = SparklineGraph(self.history["disk_write"], color="#fbbf24")
+        io_box.pack_start(self.disk_write_graph, False, False, 5)
+        
         io_frame.add(io_box)
         box.pack_start(io_frame, False, False, 0)
         
+        # Per-disk activity from /proc/diskstats
+        activity_frame = Gtk.Frame(label="Disk Activity")
+        activity_frame.set_label_align(0.05, 0.5)
+        self.disk_activity_store = Gtk.ListStore(str, str, str, str, str, str, str, str)
+        self.disk_activity_iters = {}
+        self.disk_activity_rows = {}
+        activity_treeview = Gtk.TreeView(model=self.disk_activity_store)
+        renderer = Gtk.CellRendererText()
+        for i, title in enumerate(["Device", "Read", "Write", "Read IOPS", "Write IOPS",
+                                   "Queue (now / avg)", "Await", "Utilization"]):
+            activity_treeview.append_column(Gtk.TreeViewColumn(title, renderer, text=i))
+        activity_frame.add(activity_treeview)
+        box.pack_start(activity_frame, False, False, 0)
+        
+        self.storage_page = box
         notebook.append_page(box, Gtk.Label(label="Storage"))
     
-    def run_command(self, command):
-        try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=5)
-            return result.stdout.strip() if result.returncode == 0 else ""
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return ""
-    
     def update_hardware_info(self):
         def get_hardware_info():
             info = []
             info.append("=== Hardware Information ===\n")
             
-            # CPU Information
-            cpu_model = self.run_command("grep 'model name' /proc/cpuinfo | head -1 | cut -d':' -f2 | sed 's/^ *//'")
-            if cpu_model:
-                info.append(f"CPU Model: {cpu_model}")
-            
-            cpu_cores = psutil.cpu_count(logical=False)
-            cpu_threads = psutil.cpu_count(logical=True)
-            info.append(f"Cores: {cpu_cores}, Threads: {cpu_threads}")
+            # Inventory shared with the hardware detector through the on-disk cache
+            cpu = self.hardware.get("cpu")
+            if cpu.model:
+                info.append(f"CPU Model: {cpu.model}")
+            info.append(f"Cores: {cpu.cores}, Threads: {cpu.logical}")
             
             # Memory Information
-            mem = psutil.virtual_memory()
-            info.append(f"Total Memory: {mem.total / (1024**3):.1f} GB")
+            total = hwprobe.meminfo().get("MemTotal", 0)
+            info.append(f"Total Memory: {total / (1024**3):.1f} GB")
             
             # Graphics Card
-            gpu_info = self.run_command("lspci | grep -i vga | head -1")
-            if gpu_info:
-                info.append(f"Graphics: {gpu_info}")
+            cards = hwprobe.graphics_cards(self.hardware.get("pci"))
+            if cards:
+                info.append(f"Graphics: {cards[0].description}")
             
             # Audio Devices
-            audio_count = len(self.run_command("aplay -l 2>/dev/null | grep card").split('\n')) if self.run_command("aplay -l 2>/dev/null") else 0
+            audio_count = len({device.card for device in self.hardware.get("sound")})
             if audio_count > 0:
                 info.append(f"Audio Devices: {audio_count}")
             
             # Network Interfaces
-            net_interfaces = len([i for i in psutil.net_if_addrs().keys() if not i.startswith('lo')])
+            net_interfaces = len([i for i in hwprobe.net_interfaces() if i.name != "lo"])
             info.append(f"Network Interfaces: {net_interfaces}")
             
             # Battery
@@ -355,109 +606,163 @@ class EnhancedSystemMonitor(Gtk.Window):
             return "\n".join(info)
         
         def update_ui():
-            self.hardware_info.set_text(get_hardware_info())
+            text = get_hardware_info()
+            GLib.idle_add(self.hardware_info.set_text, text)
         
         threading.Thread(target=update_ui, daemon=True).start()
     
-    def update_data(self):
-        # Update processes
-        self.process_store.clear()
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info', 'status']):
-            try:
-                info = proc.info
-                mem_mb = info['memory_info'].rss / 1024 / 1024
-                self.process_store.append([
-                    info['pid'],
-                    info['name'][:30],  # Truncate long names
-                    f"{info['cpu_percent']:.1f}",
-                    f"{mem_mb:.1f} MB",
-                    info['status']
-                ])
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        
+    def on_snapshot(self, snapshot):
+        # Runs on the GTK main loop; only cheap widget updates happen here
+        if "processes" in snapshot.sources:
+            sync_list_store(self.process_store, self.process_iters, self.process_rows, snapshot.processes)
+        
+        if "system" in snapshot.sources:
+            self.update_system(snapshot)
+        
+        # Tables that rarely change let the scheduler stretch their interval
+        if "connections" in snapshot.sources:
+            self.scheduler.report("connections", self.sync_connection_store(snapshot.connections))
+        
+        if "disks" in snapshot.sources:
+            changed = snapshot.disks != self.disk_rows
+            if changed:
+                self.disk_store.clear()
+                for row in snapshot.disks:
+                    self.disk_store.append(row)
+                self.disk_rows = snapshot.disks
+            self.scheduler.report("disks", changed)
+        
+        return False
+    
+    def update_system(self, snapshot):
         # Update CPU
-        cpu_percent = psutil.cpu_percent(interval=1)
-        self.cpu_label.set_text(f"CPU Usage: {cpu_percent:.1f}%")
-        self.cpu_bar.set_fraction(cpu_percent / 100)
-        
-        # Update CPU cores
-        cpu_per_core = psutil.cpu_percent(percpu=True)
-        core_info = " | ".join([f"Core {i+1}: {cpu:.1f}%" for i, cpu in enumerate(cpu_per_core)])
-        self.cpu_cores_label.set_text(core_info)
+        self.cpu_label.set_text(f"CPU Usage: {snapshot.cpu_percent:.1f}%")
+        self.cpu_bar.set_fraction(snapshot.cpu_percent / 100)
+        self.history.append("cpu", snapshot.cpu_percent)
+        self.history.append_cores(snapshot.cpu_per_core)
+        self.cpu_graph.push()
+        self.core_heatmap.push(len(snapshot.cpu_per_core))
         
         # Update Memory
-        mem = psutil.virtual_memory()
+        mem = snapshot.memory
         self.mem_label.set_text(f"Memory: {mem.used / 1024**3:.1f} GB / {mem.total / 1024**3:.1f} GB ({mem.percent:.1f}%)")
         self.mem_bar.set_fraction(mem.percent / 100)
+        self.history.append("memory", mem.percent)
+        self.mem_graph.push()
         
         # Update Swap
-        swap = psutil.swap_memory()
+        swap = snapshot.swap
         self.swap_label.set_text(f"Swap: {swap.used / 1024**3:.1f} GB / {swap.total / 1024**3:.1f} GB ({swap.percent:.1f}%)")
         self.swap_bar.set_fraction(swap.percent / 100)
         
         # Update System Load
-        load_avg = os.getloadavg() if hasattr(os, 'getloadavg') else (0, 0, 0)
+        load_avg = snapshot.load_avg
         self.load_label.set_text(f"Load Average: {load_avg[0]:.2f}, {load_avg[1]:.2f}, {load_avg[2]:.2f}")
         
         # Update Uptime
-        uptime_hours = psutil.boot_time()
-        import time
-        uptime_seconds = time.time() - uptime_hours
+        uptime_seconds = snapshot.uptime
         uptime_days = uptime_seconds // 86400
         uptime_hours = (uptime_seconds % 86400) // 3600
         uptime_minutes = (uptime_seconds % 3600) // 60
         self.uptime_label.set_text(f"Uptime: {int(uptime_days)}d {int(uptime_hours)}h {int(uptime_minutes)}m")
         
         # Update Network I/O
-        net_io = psutil.net_io_counters()
-        if hasattr(self, 'last_net_io'):
-            upload_speed = (net_io.bytes_sent - self.last_net_io.bytes_sent) / 1024 / 2  # KB/s
-            download_speed = (net_io.bytes_recv - self.last_net_io.bytes_recv) / 1024 / 2  # KB/s
+        if snapshot.nic_rates is not None:
+            nics = snapshot.nic_rates
+            upload_speed = sum(rates.bytes_sent for rates in nics.values()) / 1024  # KB/s
+            download_speed = sum(rates.bytes_recv for rates in nics.values()) / 1024  # KB/s
             self.net_upload_label.set_text(f"Upload: {upload_speed:.1f} KB/s")
             self.net_download_label.set_text(f"Download: {download_speed:.1f} KB/s")
-        self.last_net_io = net_io
-        
-        # Update Network Connections
-        self.connection_store.clear()
-        for conn in psutil.net_connections(kind='inet')[:20]:  # Limit to 20 connections
-            try:
-                local_addr = f"{conn.laddr.ip}:{conn.laddr.port}" if conn.laddr else "N/A"
-                remote_addr = f"{conn.raddr.ip}:{conn.raddr.port}" if conn.raddr else "N/A"
-                status = conn.status
-                pid = str(conn.pid) if conn.pid else "N/A"
-                
-                self.connection_store.append([local_addr, remote_addr, status, pid])
-            except:
-                pass
-        
-        # Update Disk Usage
-        self.disk_store.clear()
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                self.disk_store.append([
-                    partition.device,
-                    f"{usage.total / 1024**3:.1f} GB",
-                    f"{usage.used / 1024**3:.1f} GB",
-                    f"{usage.free / 1024**3:.1f} GB"
-                ])
-            except:
-                pass
+            self.history.append("net_upload", upload_speed)
+            self.history.append("net_download", download_speed)
+            self.net_upload_graph.push()
+            self.net_download_graph.push()
+            sync_list_store(self.nic_store, self.nic_iters, self.nic_rows, [
+                (name, format_rate(rates.bytes_recv), format_rate(rates.bytes_sent),
+                 f"{rates.packets_recv:.0f}", f"{rates.packets_sent:.0f}",
+                 str(rates.errors), str(rates.drops))
+                for name, rates in sorted(nics.items())
+            ])
         
         # Update Disk I/O
-        disk_io = psutil.disk_io_counters()
-        if hasattr(self, 'last_disk_io'):
-            read_speed = (disk_io.read_bytes - self.last_disk_io.read_bytes) / 1024 / 2  # KB/s
-            write_speed = (disk_io.write_bytes - self.last_disk_io.write_bytes) / 1024 / 2  # KB/s
+        if snapshot.disk_rates is not None:
+            disks = snapshot.disk_rates
+            read_speed = sum(rates.read_bytes for rates in disks.values()) / 1024  # KB/s
+            write_speed = sum(rates.write_bytes for rates in disks.values()) / 1024  # KB/s
             self.disk_read_label.set_text(f"Disk Read: {read_speed:.1f} KB/s")
             self.disk_write_label.set_text(f"Disk Write: {write_speed:.1f} KB/s")
-        self.last_disk_io = disk_io
-        
-        return True
+            self.history.append("disk_read", read_speed)
+            self.history.append("disk_write", write_speed)
+            self.disk_read_graph.push()
+            self.disk_write_graph.push()
+            sync_list_store(self.disk_activity_store, self.disk_activity_iters, self.disk_activity_rows, [
+                (name, format_rate(rates.read_bytes), format_rate(rates.write_bytes),
+                 f"{rates.read_iops:.0f}", f"{rates.write_iops:.0f}",
+                 f"{rates.in_flight} / {rates.queue_depth:.2f}", f"{rates.await_ms:.1f} ms",
+                 f"{rates.util:.0f}%")
+                for name, rates in sorted(disks.items())
+            ])
+    
+    def sync_connection_store(self, connections):
+        """Update the grouped connection tree in place, like muxos.widgets.sync_list_store.
+        
+        Returns whether anything changed.
+        """
+        changed = False
+        counts = {}
+        seen = set()
+        for conn, name in connections:
+            group = self.connection_groups.get(conn.pid)
+            if group is None:
+                label = name if conn.pid else "Unknown owner"
+                pid = str(conn.pid) if conn.pid else ""
+                group = self.connection_store.append(None, [label, "", "", "", pid])
+                self.connection_groups[conn.pid] = group
+            counts[conn.pid] = counts.get(conn.pid, 0) + 1
+            
+            # The owner is part of the key so a late-resolved socket moves groups
+            key = (conn.proto, conn.local, conn.remote, conn.inode, conn.pid)
+            seen.add(key)
+            row = (conn.local, conn.remote, conn.proto, conn.status, str(conn.pid) if conn.pid else "N/A")
+            old_row = self.connection_rows.get(key)
+            if old_row is None:
+                self.connection_iters[key] = self.connection_store.append(group, row)
+            elif old_row != row:
+                self.connection_store.set_value(self.connection_iters[key], 3, row[3])
+            else:
+                continue
+            self.connection_rows[key] = row
+            changed = True
+        
+        for key in self.connection_rows.keys() - seen:
+            self.connection_store.remove(self.connection_iters.pop(key))
+            del self.connection_rows[key]
+            changed = True
+        
+        for pid, group in list(self.connection_groups.items()):
+            count = counts.get(pid, 0)
+            if count:
+                self.connection_store.set_value(group, 1, f"{count} connection{'s' if count != 1 else ''}")
+            else:
+                self.connection_store.remove(group)
+                del self.connection_groups[pid]
+        return changed
+    
+    def on_history(self, series):
+        # History recorded by muxos-metricsd before this window was opened
+        for name, values in series.items():
+            self.history[name].extend(values)
+        for graph in (self.cpu_graph, self.mem_graph, self.net_upload_graph, self.net_download_graph,
+                      self.core_heatmap):
+            graph.refresh()
+        return False
+    
+    def on_destroy(self, widget):
+        self.scheduler.stop()
+        self.sampler.stop()
     
     def on_refresh_clicked(self, button):
+        self.scheduler.trigger()
         self.update_hardware_info()
         self.status_label.set_text("Refreshing...")
         GLib.timeout_add_seconds(1, lambda: self.status_label.set_text("Ready"))
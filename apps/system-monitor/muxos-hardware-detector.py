@@ -3,10 +3,29 @@
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GLib, Pango
-import subprocess
 import re
 import os
-import threading
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib"))
+from muxos import asyncproc, hwcache, hwprobe
+from muxos.hwmon import HwmonSampler, format_value
+from muxos.procfs import ProcSampler, format_uptime
+from muxos.scheduler import RefreshScheduler
+
+# Probes share a small pool; each gets a deadline after which its result
+# is dropped and the tab says so. Optional tools run on the main loop
+# through muxos.asyncproc and are killed after their own timeout.
+PROBE_WORKERS = 4
+PROBE_TIMEOUT = 5
+SCAN_LINES = 20
+
+# The Sensors tab samples live while it is shown
+SENSOR_INTERVAL = 1.0
+TEMP_ALERT = 85
+ALERT_COLORS = {"low": "#3584e4", "high": "#e5a50a", "critical": "#e01b24"}
 
 class HardwareDetector(Gtk.Window):
     def __init__(self):
@@ -50,13 +69,47 @@ class HardwareDetector(Gtk.Window):
         self.create_usb_tab()
         self.create_sensors_tab()
         
+        self.scheduler = RefreshScheduler(self, self.notebook)
+        self.scheduler.add("sensors", self.update_sensors, SENSOR_INTERVAL, pages=[self.sensors_page])
+        
         # Status bar
         self.status_label = Gtk.Label(label="Ready")
         self.status_label.set_halign(Gtk.Align.START)
         main_box.pack_start(self.status_label, False, False, 5)
         
+        # Hardware that did not change since the last run comes from the
+        # cache; udev hotplug events re-detect the affected tab only
+        self.hardware = hwcache.shared_cache()
+        
+        # Probe name -> (function, label it fills, deadline in seconds)
+        self.probes = {
+            "System": (self.detect_system_info, self.system_info, PROBE_TIMEOUT),
+            "CPU": (self.detect_cpu_info, self.cpu_info, PROBE_TIMEOUT),
+            "Memory": (self.detect_memory_info, self.memory_info, PROBE_TIMEOUT),
+            "Graphics": (self.detect_graphics_info, self.graphics_info, PROBE_TIMEOUT),
+            "Audio": (self.detect_audio_info, self.audio_info, PROBE_TIMEOUT),
+            "Network": (self.detect_network_info, self.network_info, PROBE_TIMEOUT),
+            "Storage": (self.detect_storage_info, self.storage_info, PROBE_TIMEOUT),
+            "USB": (self.detect_usb_info, self.usb_info, PROBE_TIMEOUT),
+        }
+        self.pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="probe")
+        self.pending = {}  # future -> probe name
+        self.deadlines = {}  # future -> monotonic deadline
+        self.deadline_timer = None
+        self.round_started = None
+        self.timings = {}
+        self.timed_out = []
+        self.failed = []
+        self.network_text = ""
+        self.nearby = {}  # section title -> lines read so far
+        self.commands = asyncproc.CommandGroup()
+        self.closed = False
+        self.hardware.watch(lambda subsystem: GLib.idle_add(self.on_hardware_changed, subsystem))
+        self.connect("destroy", self.on_destroy)
+        
         # Initial detection
         self.detect_all_hardware()
+        self.scheduler.start()
     
     def create_system_tab(self):
         scrolled = Gtk.ScrolledWindow()
@@ -212,8 +265,8 @@ class HardwareDetector(Gtk.Window):
         self.notebook.append_page(scrolled, Gtk.Label(label="USB"))
     
     def create_sensors_tab(self):
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        self.sensors = HwmonSampler()
+        self.sensors.limits["temp"] = TEMP_ALERT
         
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         box.set_margin_top(20)
@@ -221,21 +274,86 @@ class HardwareDetector(Gtk.Window):
         box.set_margin_start(20)
         box.set_margin_end(20)
         
-        self.sensors_info = Gtk.Label(label="Detecting sensors...")
+        # Rate and alert threshold
+        controls = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        controls.pack_start(Gtk.Label(label="Update every"), False, False, 0)
+        interval = Gtk.SpinButton.new_with_range(0.5, 10, 0.5)
+        interval.set_value(SENSOR_INTERVAL)
+        interval.connect("value-changed", self.on_sensor_interval_changed)
+        controls.pack_start(interval, False, False, 0)
+        controls.pack_start(Gtk.Label(label="s    Alert above"), False, False, 0)
+        limit = Gtk.SpinButton.new_with_range(40, 120, 1)
+        limit.set_value(TEMP_ALERT)
+        limit.connect("value-changed", self.on_sensor_limit_changed)
+        controls.pack_start(limit, False, False, 0)
+        controls.pack_start(Gtk.Label(label="°C"), False, False, 0)
+        reset_btn = Gtk.Button(label="Reset Min/Max")
+        reset_btn.connect("clicked", self.on_sensor_reset)
+        controls.pack_end(reset_btn, False, False, 0)
+        box.pack_start(controls, False, False, 0)
+        
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        
+        # Sensor, current, min, avg, max, alert, row color
+        self.sensor_store = Gtk.ListStore(str, str, str, str, str, str, str)
+        self.sensor_iters = {}  # channel key -> Gtk.TreeIter
+        tree = Gtk.TreeView(model=self.sensor_store)
+        for i, title in enumerate(["Sensor", "Current", "Min", "Avg", "Max", "Alert"]):
+            renderer = Gtk.CellRendererText()
+            column = Gtk.TreeViewColumn(title, renderer, text=i, foreground=6)
+            column.set_resizable(True)
+            tree.append_column(column)
+        scrolled.add(tree)
+        box.pack_start(scrolled, True, True, 0)
+        
+        self.sensors_info = Gtk.Label(label="" if self.sensors.channels else "No sensors found in /sys/class/hwmon.")
         self.sensors_info.set_xalign(0)
-        self.sensors_info.set_yalign(0)
         self.sensors_info.set_selectable(True)
-        box.pack_start(self.sensors_info, True, True, 0)
+        box.pack_start(self.sensors_info, False, False, 0)
         
-        scrolled.add(box)
-        self.notebook.append_page(scrolled, Gtk.Label(label="Sensors"))
+        self.sensors_page = box
+        self.notebook.append_page(box, Gtk.Label(label="Sensors"))
     
-    def run_command(self, command):
-        try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=10)
-            return result.stdout.strip() if result.returncode == 0 else ""
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return ""
+    def update_sensors(self):
+        alerts = []
+        for reading in self.sensors.sample():
+            channel = reading.channel
+            kind = channel.kind
+            row = [f"{channel.chip} {channel.label}", format_value(reading.value, kind),
+                   format_value(reading.minimum, kind), format_value(reading.average, kind),
+                   format_value(reading.maximum, kind), reading.alert, ALERT_COLORS.get(reading.alert)]
+            tree_iter = self.sensor_iters.get(channel.key)
+            if tree_iter is None:
+                self.sensor_iters[channel.key] = self.sensor_store.append(row)
+            else:
+                self.sensor_store.set(tree_iter, list(range(len(row))), row)
+            if reading.alert:
+                alerts.append(f"{row[0]} {row[1]} ({reading.alert})")
+        
+        info = [f"{name}: {status}" for name, status in self.sensors.battery_status()]
+        if alerts:
+            info.append("Alerts: " + ", ".join(alerts))
+        if self.sensors.channels:
+            self.sensors_info.set_text("\n".join(info))
+        return None
+    
+    def on_sensor_interval_changed(self, spin):
+        self.scheduler.set_interval("sensors", spin.get_value())
+    
+    def on_sensor_limit_changed(self, spin):
+        self.sensors.limits["temp"] = spin.get_value()
+        self.scheduler.trigger("sensors")
+    
+    def on_sensor_reset(self, button):
+        self.sensors.reset()
+        self.scheduler.trigger("sensors")
+    
+    def format_size(self, size):
+        for unit in ("B", "K", "M", "G", "T"):
+            if size < 1024 or unit == "T":
+                return f"{size:.1f}{unit}" if unit != "B" else f"{size}B"
+            size /= 1024
     
     def detect_system_info(self):
         info = []
@@ -246,244 +364,353 @@ class HardwareDetector(Gtk.Window):
             with open("/etc/os-release", "r") as f:
                 for line in f:
                     if line.startswith("PRETTY_NAME"):
-                        info.append(f"OS: {line.split('=')[1].strip('\"')}")
+                        name = line.split('=', 1)[1].strip().strip('"')
+                        info.append(f"OS: {name}")
                         break
         
         # Kernel and Architecture
-        info.append(f"Kernel: {self.run_command('uname -r')}")
-        info.append(f"Architecture: {self.run_command('uname -m')}")
-        info.append(f"Uptime: {self.run_command('uptime -p 2>/dev/null || uptime')}")
+        uname = os.uname()
+        info.append(f"Kernel: {uname.release}")
+        info.append(f"Architecture: {uname.machine}")
+        uptime = hwprobe.read_sysfs("/proc/uptime").split()
+        if uptime:
+            info.append(f"Uptime: {format_uptime(float(uptime[0]))}")
         
         # Hostname
-        info.append(f"Hostname: {self.run_command('hostname')}")
+        info.append(f"Hostname: {uname.nodename}")
         
-        GLib.idle_add(lambda: self.system_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
     def detect_cpu_info(self):
         info = []
         info.append("=== CPU Information ===\n")
         
         # CPU details
-        lscpu_output = self.run_command("lscpu")
-        if lscpu_output:
-            for line in lscpu_output.split('\n'):
-                if any(keyword in line for keyword in ["Model name", "CPU(s)", "Core(s)", "Thread", "Architecture", "CPU max MHz", "CPU min MHz"]):
-                    info.append(line)
+        cpu = self.hardware.get("cpu")
+        info.append(f"Architecture: {cpu.architecture}")
+        info.append(f"Model name: {cpu.model}")
+        info.append(f"CPU(s): {cpu.logical}")
+        info.append(f"Core(s) per socket: {cpu.cores // cpu.sockets}")
+        info.append(f"Socket(s): {cpu.sockets}")
+        info.append(f"Thread(s) per core: {cpu.logical // max(1, cpu.cores)}")
+        if cpu.max_mhz:
+            info.append(f"CPU max MHz: {cpu.max_mhz:.0f}")
+            info.append(f"CPU min MHz: {cpu.min_mhz:.0f}")
         
         # CPU load
-        load_avg = self.run_command("cat /proc/loadavg")
+        load_avg = hwprobe.read_sysfs("/proc/loadavg")
         if load_avg:
             info.append(f"\nLoad Average: {load_avg}")
         
-        GLib.idle_add(lambda: self.cpu_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
     def detect_memory_info(self):
         info = []
         info.append("=== Memory Information ===\n")
         
         # Memory details
-        free_output = self.run_command("free -h")
-        if free_output:
-            info.append(free_output)
+        sampler = ProcSampler()
+        try:
+            memory, swap = sampler.read_memory()
+        finally:
+            sampler.close()
+        gib = 1024 ** 3
+        info.append(f"Memory: {memory.used / gib:.1f} GiB used, {memory.available / gib:.1f} GiB available, "
+                    f"{memory.total / gib:.1f} GiB total")
+        info.append(f"Swap:   {swap.used / gib:.1f} GiB used, {swap.free / gib:.1f} GiB free, "
+                    f"{swap.total / gib:.1f} GiB total")
         
         # Additional memory info from /proc/meminfo
-        meminfo = self.run_command("cat /proc/meminfo | head -10")
+        meminfo = hwprobe.meminfo()
         if meminfo:
             info.append(f"\n=== Memory Details ===")
-            info.append(meminfo)
+            for key, value in list(meminfo.items())[:10]:
+                info.append(f"{key}: {self.format_size(value)}")
         
-        GLib.idle_add(lambda: self.memory_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
     def detect_graphics_info(self):
         info = []
         info.append("=== Graphics Information ===\n")
         
         # Graphics cards
-        lspci_output = self.run_command("lspci | grep -i vga")
-        if lspci_output:
+        cards = hwprobe.graphics_cards(self.hardware.get("pci"))
+        if cards:
             info.append("Graphics Cards:")
-            info.append(lspci_output)
+            for card in cards:
+                driver = f" (driver: {card.driver})" if card.driver else ""
+                info.append(card.description + driver)
         
         # Display information
-        xrandr_output = self.run_command("xrandr --query 2>/dev/null | grep -E '(connected|disconnected)'")
-        if xrandr_output:
+        displays = self.hardware.get("displays")
+        if displays:
             info.append(f"\n=== Display Information ===")
-            info.append(xrandr_output)
+            for display in displays:
+                state = "connected" if display.connected else "disconnected"
+                mode = f" {display.modes[0]}" if display.connected and display.modes else ""
+                info.append(f"{display.connector} {state}{mode}")
         
         # Loaded drivers
-        drivers_output = self.run_command("lsmod | grep -E '(nvidia|amdgpu|i915|nouveau)'")
-        if drivers_output:
+        drivers = [module for module in hwprobe.kernel_modules()
+                   if module.name in ("nvidia", "amdgpu", "radeon", "i915", "xe", "nouveau")]
+        if drivers:
             info.append(f"\n=== Loaded Graphics Drivers ===")
-            info.append(drivers_output)
+            for module in drivers:
+                info.append(f"{module.name} {module.size} {','.join(module.used_by)}")
         
-        GLib.idle_add(lambda: self.graphics_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
     def detect_audio_info(self):
         info = []
         info.append("=== Audio Information ===\n")
         
+        devices = self.hardware.get("sound")
+        
         # Playback devices
-        aplay_output = self.run_command("aplay -l 2>/dev/null")
-        if aplay_output:
+        playback = [d for d in devices if d.playback]
+        if playback:
             info.append("=== Playback Devices ===")
-            info.append(aplay_output)
+            info.extend(f"card {d.card}, device {d.device}: {d.name}" for d in playback)
         
         # Capture devices (microphones)
-        arecord_output = self.run_command("arecord -l 2>/dev/null")
-        if arecord_output:
+        capture = [d for d in devices if d.capture]
+        if capture:
             info.append(f"\n=== Capture Devices (Microphones) ===")
-            info.append(arecord_output)
+            info.extend(f"card {d.card}, device {d.device}: {d.name}" for d in capture)
         
         # ALSA cards
-        alsa_output = self.run_command("cat /proc/asound/cards 2>/dev/null")
+        alsa_output = hwprobe.sound_cards()
         if alsa_output:
             info.append(f"\n=== ALSA Sound Cards ===")
             info.append(alsa_output)
         
-        GLib.idle_add(lambda: self.audio_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
     def detect_network_info(self):
         info = []
         info.append("=== Network Information ===\n")
         
         # Network interfaces
-        ip_output = self.run_command("ip link show | grep -E '^[0-9]'")
-        if ip_output:
+        interfaces = hwprobe.net_interfaces()
+        if interfaces:
             info.append("Network Interfaces:")
-            info.append(ip_output)
+            for iface in interfaces:
+                speed = f" {iface.speed} Mb/s" if iface.speed else ""
+                driver = f" ({iface.driver})" if iface.driver else ""
+                info.append(f"{iface.name}: {iface.state} mtu {iface.mtu} {iface.mac}{speed}{driver}")
         
         # WiFi interfaces
-        wifi_output = self.run_command("iw dev 2>/dev/null | grep Interface")
-        if wifi_output:
+        wifi = [iface.name for iface in interfaces if iface.wireless]
+        if wifi:
             info.append(f"\n=== WiFi Interfaces ===")
-            info.append(wifi_output)
-        
-        # WiFi scan
-        wifi_scan = self.run_command("iwlist scan 2>/dev/null | head -20")
-        if wifi_scan:
-            info.append(f"\n=== WiFi Networks (first 20 lines) ===")
-            info.append(wifi_scan)
+            info.extend(f"Interface {name}" for name in wifi)
         
         # Bluetooth
-        bluetooth_devices = self.run_command("bluetoothctl devices 2>/dev/null")
-        if bluetooth_devices:
-            info.append(f"\n=== Bluetooth Devices ===")
-            info.append(bluetooth_devices)
-        elif self.run_command("hciconfig -a 2>/dev/null"):
+        adapters = hwprobe.bluetooth_adapters()
+        if adapters:
             info.append(f"\n=== Bluetooth Interfaces ===")
-            info.append(self.run_command("hciconfig -a 2>/dev/null"))
+            info.extend(f"{name}: {address}" for name, address in adapters)
         
-        GLib.idle_add(lambda: self.network_info.set_text("\n".join(info)))
+        return "\n".join(info)
+    
+    def scan_nearby(self):
+        # Nearby networks and paired devices are not in sysfs. The tools
+        # that know them are slow, so they run once the Network tab is
+        # filled, concurrently, and their output is appended as it arrives.
+        self.commands.cancel()
+        self.nearby = {}
+        wifi = [iface.name for iface in hwprobe.net_interfaces() if iface.wireless]
+        if wifi:
+            self.run_scan(f"WiFi Networks (first {SCAN_LINES} lines)", ["iwlist", wifi[0], "scan"],
+                          max_lines=SCAN_LINES)
+        if hwprobe.bluetooth_adapters():
+            self.run_scan("Bluetooth Devices", ["bluetoothctl", "devices"])
+    
+    def run_scan(self, title, args, **kwargs):
+        lines = self.nearby.setdefault(title, [])
+        
+        def on_line(line):
+            lines.append(line)
+            self.show_nearby()
+        
+        def on_done(result):
+            self.timings[args[0]] = result.seconds
+            if result.timed_out:
+                self.timed_out.append(args[0])
+            if not result.ok:
+                lines.clear()
+                self.show_nearby()
+            self.update_progress()
+        
+        self.commands.run(args, on_done, on_line=on_line, **kwargs)
+    
+    def show_nearby(self):
+        info = [self.network_text]
+        for title, lines in self.nearby.items():
+            if lines:
+                info.append(f"\n=== {title} ===")
+                info.extend(lines)
+        self.network_info.set_text("\n".join(info))
     
     def detect_storage_info(self):
         info = []
         info.append("=== Storage Information ===\n")
         
         # Block devices
-        lsblk_output = self.run_command("lsblk -o NAME,SIZE,TYPE,MOUNTPOINT,FSTYPE")
-        if lsblk_output:
+        devices = self.hardware.get("block")
+        if devices:
             info.append("Block Devices:")
-            info.append(lsblk_output)
+            info.append(f"{'NAME':<14}{'SIZE':>9}  {'TYPE':<6}{'FSTYPE':<8}MOUNTPOINT")
+            for dev in devices:
+                name = dev.name if dev.kind == "disk" else f"  {dev.name}"
+                info.append(f"{name:<14}{self.format_size(dev.size):>9}  {dev.kind:<6}{dev.fstype:<8}{dev.mountpoint}")
         
         # Filesystems
-        df_output = self.run_command("df -h")
-        if df_output:
+        filesystems = hwprobe.filesystem_usage()
+        if filesystems:
             info.append(f"\n=== Mounted Filesystems ===")
-            info.append(df_output)
+            info.append(f"{'Filesystem':<16}{'Size':>9}{'Used':>9}{'Avail':>9}{'Use%':>6}  Mounted on")
+            for fs in filesystems:
+                percent = 100 * fs.used // fs.size if fs.size else 0
+                info.append(f"{fs.device:<16}{self.format_size(fs.size):>9}{self.format_size(fs.used):>9}"
+                            f"{self.format_size(fs.available):>9}{percent:>5}%  {fs.mountpoint}")
         
-        GLib.idle_add(lambda: self.storage_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
     def detect_usb_info(self):
         info = []
         info.append("=== USB Information ===\n")
         
         # USB devices
-        lsusb_output = self.run_command("lsusb")
-        if lsusb_output:
+        usb = self.hardware.get("usb")
+        if usb:
             info.append("USB Devices:")
-            info.append(lsusb_output)
+            info.extend(device.description for device in usb)
         
         # Input devices
-        input_devices = self.run_command("grep -E '(Name|Phys)' /proc/bus/input/devices | grep -v 'N: Name'")
+        input_devices = hwprobe.input_devices()
         if input_devices:
             info.append(f"\n=== Input Devices ===")
-            info.append(input_devices)
+            info.extend(f"{name} ({phys})" if phys else name for name, phys in input_devices)
         
-        GLib.idle_add(lambda: self.usb_info.set_text("\n".join(info)))
+        return "\n".join(info)
     
-    def detect_sensors_info(self):
-        info = []
-        info.append("=== Sensors Information ===\n")
-        
-        # Temperature sensors
-        sensors_output = self.run_command("sensors 2>/dev/null")
-        if sensors_output:
-            info.append("Temperature Sensors:")
-            info.append(sensors_output)
-        
-        # Thermal zones
-        thermal_info = []
-        if os.path.exists("/sys/class/thermal"):
-            for zone in sorted(os.listdir("/sys/class/thermal")):
-                if zone.startswith("thermal_zone"):
-                    temp_file = f"/sys/class/thermal/{zone}/temp"
-                    if os.path.exists(temp_file):
-                        try:
-                            with open(temp_file, "r") as f:
-                                temp_millidegrees = int(f.read().strip())
-                                temp_celsius = temp_millidegrees // 1000
-                                thermal_info.append(f"{zone}: {temp_celsius}°C")
-                        except:
-                            pass
-        
-        if thermal_info:
-            info.append(f"\n=== Thermal Zones ===")
-            info.append("\n".join(thermal_info))
-        
-        # Battery information
-        battery_info = []
-        if os.path.exists("/sys/class/power_supply"):
-            for supply in os.listdir("/sys/class/power_supply"):
-                status_file = f"/sys/class/power_supply/{supply}/status"
-                if os.path.exists(status_file):
-                    try:
-                        with open(status_file, "r") as f:
-                            status = f.read().strip()
-                        
-                        battery_info.append(f"{supply}: {status}")
-                        
-                        capacity_file = f"/sys/class/power_supply/{supply}/capacity"
-                        if os.path.exists(capacity_file):
-                            with open(capacity_file, "r") as f:
-                                capacity = f.read().strip()
-                            battery_info.append(f"  Capacity: {capacity}%")
-                    except:
-                        pass
-        
-        if battery_info:
-            info.append(f"\n=== Battery Information ===")
-            info.append("\n".join(battery_info))
-        
-        GLib.idle_add(lambda: self.sensors_info.set_text("\n".join(info)))
+    def timed(self, probe):
+        started = time.monotonic()
+        text = probe()
+        return text, time.monotonic() - started
+    
+    def start_probe(self, name):
+        if self.closed or name in self.pending.values():
+            return
+        probe, label, timeout = self.probes[name]
+        future = self.pool.submit(self.timed, probe)
+        self.pending[future] = name
+        self.deadlines[future] = time.monotonic() + timeout
+        future.add_done_callback(lambda f: GLib.idle_add(self.on_probe_done, f))
+        if self.deadline_timer is None:
+            self.deadline_timer = GLib.timeout_add(250, self.check_deadlines)
+    
+    def on_probe_done(self, future):
+        # Late results of probes that timed out or were cancelled are dropped
+        name = self.pending.pop(future, None)
+        if self.closed or name is None:
+            return False
+        del self.deadlines[future]
+        label = self.probes[name][1]
+        try:
+            text, seconds = future.result()
+        except Exception as e:
+            label.set_text(f"Detection failed: {e}")
+            self.failed.append(name)
+        else:
+            self.timings[name] = seconds
+            label.set_text(text)
+            if name == "Network":
+                self.network_text = text
+                self.scan_nearby()
+        self.update_progress()
+        return False
+    
+    def check_deadlines(self):
+        now = time.monotonic()
+        for future, deadline in list(self.deadlines.items()):
+            if now >= deadline:
+                name = self.pending.pop(future)
+                del self.deadlines[future]
+                future.cancel()
+                self.timed_out.append(name)
+                self.probes[name][1].set_text(f"Detection timed out after {self.probes[name][2]} s")
+        self.update_progress()
+        if not self.pending:
+            self.deadline_timer = None
+            return False
+        return True
+    
+    def update_progress(self):
+        if self.round_started is None:
+            return
+        if self.pending:
+            done = len(self.probes) - len(self.pending)
+            self.status_label.set_text(f"Detecting hardware... {done} of {len(self.probes)} done")
+            return
+        if self.commands.running:
+            self.status_label.set_text("Scanning for nearby networks and devices...")
+            return
+        elapsed = time.monotonic() - self.round_started
+        self.round_started = None
+        status = f"Hardware detection complete in {elapsed:.2f} s"
+        if self.timed_out:
+            status += f"; timed out: {', '.join(self.timed_out)}"
+        if self.failed:
+            status += f"; failed: {', '.join(self.failed)}"
+        self.status_label.set_text(status)
+        self.status_label.set_tooltip_text("\n".join(f"{name}: {seconds * 1000:.1f} ms"
+                                                     for name, seconds in self.timings.items()))
     
     def detect_all_hardware(self):
+        # Results of an earlier round still running are no longer wanted
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.deadlines.clear()
+        self.commands.cancel()
+        self.timings = {}
+        self.timed_out = []
+        self.failed = []
+        self.round_started = time.monotonic()
         self.status_label.set_text("Detecting hardware...")
-        
-        # Run detection in separate threads
-        threading.Thread(target=self.detect_system_info, daemon=True).start()
-        threading.Thread(target=self.detect_cpu_info, daemon=True).start()
-        threading.Thread(target=self.detect_memory_info, daemon=True).start()
-        threading.Thread(target=self.detect_graphics_info, daemon=True).start()
-        threading.Thread(target=self.detect_audio_info, daemon=True).start()
-        threading.Thread(target=self.detect_network_info, daemon=True).start()
-        threading.Thread(target=self.detect_storage_info, daemon=True).start()
-        threading.Thread(target=self.detect_usb_info, daemon=True).start()
-        threading.Thread(target=self.detect_sensors_info, daemon=True).start()
-        
-        GLib.timeout_add_seconds(2, lambda: self.status_label.set_text("Hardware detection complete"))
+        for name in self.probes:
+            self.start_probe(name)
+    
+    def on_hardware_changed(self, subsystem):
+        detect = {
+            "pci": "Graphics",
+            "drm": "Graphics",
+            "sound": "Audio",
+            "net": "Network",
+            "block": "Storage",
+            "usb": "USB",
+            "cpu": "CPU",
+        }.get(subsystem)
+        if detect:
+            self.start_probe(detect)
+        return False
     
     def on_refresh_clicked(self, button):
         self.detect_all_hardware()
+    
+    def on_destroy(self, widget):
+        # Queued probes never start and running tools are killed
+        self.closed = True
+        self.commands.cancel()
+        if self.deadline_timer is not None:
+            GLib.source_remove(self.deadline_timer)
+            self.deadline_timer = None
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.scheduler.stop()
+        self.sensors.close()
+        self.hardware.close()
 
 if __name__ == "__main__":
     win = HardwareDetector()
@@ -3,8 +3,12 @@
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GLib
-import psutil
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib"))
+from muxos.metrics import SnapshotSource
+from muxos.widgets import sync_list_store
 
 class SystemMonitor(Gtk.Window):
     def __init__(self):
@@ -26,6 +30,8 @@ class SystemMonitor(Gtk.Window):
         self.resources_page = self.create_resources_page()
         notebook.append_page(self.resources_page, Gtk.Label(label="Resources"))
         
+        self.sampler = SnapshotSource()
+        self.sampler.sample()
         GLib.timeout_add_seconds(2, self.update_data)
         
     def create_processes_page(self):
@@ -33,6 +39,8 @@ class SystemMonitor(Gtk.Window):
         scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
         
         self.process_store = Gtk.ListStore(int, str, str, str)
+        self.process_iters = {}  # pid -> Gtk.TreeIter (ListStore iters persist)
+        self.process_rows = {}  # pid -> row last written to the store
         
         treeview = Gtk.TreeView(model=self.process_store)
         
@@ -83,30 +91,27 @@ class SystemMonitor(Gtk.Window):
         return box
     
     def update_data(self):
-        self.process_store.clear()
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info']):
-            try:
-                info = proc.info
-                mem_mb = info['memory_info'].rss / 1024 / 1024
-                self.process_store.append([
-                    info['pid'],
-                    info['name'],
-                    f"{info['cpu_percent']:.1f}",
-                    f"{mem_mb:.1f} MB"
-                ])
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        
-        cpu_percent = psutil.cpu_percent(interval=1)
+        snapshot = self.sampler.sample()
+        
+        rows = []
+        for proc in snapshot.processes:
+            rows.append((
+                proc.pid,
+                proc.name,
+                f"{proc.cpu_percent:.1f}",
+                f"{proc.rss / 1024 / 1024:.1f} MB"
+            ))
+        sync_list_store(self.process_store, self.process_iters, self.process_rows, rows)
+        
+        cpu_percent = snapshot.cpu_percent
         self.cpu_label.set_text(f"CPU Usage: {cpu_percent:.1f}%")
         self.cpu_bar.set_fraction(cpu_percent / 100)
         
-        mem = psutil.virtual_memory()
+        mem = snapshot.memory
         self.mem_label.set_text(f"Memory: {mem.used / 1024**3:.1f} GB / {mem.total / 1024**3:.1f} GB ({mem.percent:.1f}%)")
         self.mem_bar.set_fraction(mem.percent / 100)
         
-        swap = psutil.swap_memory()
+        swap = snapshot.swap
         self.swap_label.set_text(f"Swap: {swap.used / 1024**3:.1f} GB / {swap.total / 1024**3:.1f} GB ({swap.percent:.1f}%)")
         self.swap_bar.set_fraction(swap.percent / 100)
         
@@ -3,9 +3,24 @@
 
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GLib
-import subprocess
+from gi.repository import Gtk, GLib, Pango
 import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib"))
+from muxos.autostart import read_entries, read_profile, set_enabled
+from muxos.cgroups import UserSampler
+from muxos.metrics import SnapshotSource
+from muxos.procfs import format_uptime, user_name
+from muxos import proctl
+from muxos.proctree import ProcessTree
+from muxos.smaps import SmapsReader
+from muxos.systemd import ServiceMonitor, run_in_scope
+from muxos.widgets import MultiColumnSort, set_changed_cells
+from muxos.scheduler import RefreshScheduler
+from muxos.search import SearchIndex
 
 class TaskManager(Gtk.Window):
     def __init__(self):
@@ -13,6 +28,20 @@ class TaskManager(Gtk.Window):
         self.set_default_size(900, 600)
         self.set_position(Gtk.WindowPosition.CENTER)
         
+        self.sampler = SnapshotSource()
+        self.users = UserSampler()
+        self.tree = ProcessTree()
+        self.search = SearchIndex()
+        self.filter_text = ""
+        self.visible_pids = None  # None: no filter
+        self.processes = []
+        self.memory_mode = "rss"
+        self.smaps = None  # started the first time a PSS/USS/Swap mode is picked
+        self.smaps_update_queued = False
+        self.include_children = True  # context menu actions apply to the whole tree
+        self.terminations = []  # proctl.Termination still waiting for processes to exit
+        self.termination_timer = None
+        
         header = Gtk.HeaderBar()
         header.set_show_close_button(True)
         header.props.title = "Task Manager"
@@ -22,38 +51,92 @@ class TaskManager(Gtk.Window):
         end_btn.connect("clicked", self.end_task)
         header.pack_end(end_btn)
         
+        end_tree_btn = Gtk.Button(label="End Process Tree")
+        end_tree_btn.connect("clicked", self.end_task_tree)
+        header.pack_end(end_tree_btn)
+        
+        self.tree_toggle = Gtk.ToggleButton(label="Tree View")
+        self.tree_toggle.set_active(True)
+        self.tree_toggle.connect("toggled", self.on_tree_view_toggled)
+        header.pack_start(self.tree_toggle)
+        
+        memory_combo = Gtk.ComboBoxText()
+        for mode, title in (("rss", "RSS"), ("pss", "PSS"), ("uss", "USS"), ("swap", "Swap")):
+            memory_combo.append(mode, title)
+        memory_combo.set_active_id("rss")
+        memory_combo.set_tooltip_text("RSS counts shared libraries once per process; "
+                                      "PSS splits them among the sharers and adds up correctly")
+        memory_combo.connect("changed", self.on_memory_mode_changed)
+        header.pack_start(memory_combo)
+        
         notebook = Gtk.Notebook()
         self.add(notebook)
         
-        notebook.append_page(self.create_processes_page(), Gtk.Label(label="Processes"))
-        notebook.append_page(self.create_performance_page(), Gtk.Label(label="Performance"))
+        processes_page = self.create_processes_page()
+        performance_page = self.create_performance_page()
+        notebook.append_page(processes_page, Gtk.Label(label="Processes"))
+        notebook.append_page(performance_page, Gtk.Label(label="Performance"))
         notebook.append_page(self.create_startup_page(), Gtk.Label(label="Startup"))
-        notebook.append_page(self.create_services_page(), Gtk.Label(label="Services"))
-        notebook.append_page(self.create_users_page(), Gtk.Label(label="Users"))
-        
-        GLib.timeout_add_seconds(2, self.refresh_processes)
-        GLib.timeout_add_seconds(1, self.update_performance)
+        services_page = self.create_services_page()
+        notebook.append_page(services_page, Gtk.Label(label="Services"))
+        users_page = self.create_users_page()
+        notebook.append_page(users_page, Gtk.Label(label="Users"))
+        
+        # Each page is only refreshed while it is showing, and nothing runs
+        # while the window is minimized or hidden
+        self.scheduler = RefreshScheduler(self, notebook)
+        self.scheduler.add("processes", self.refresh_processes, 2, pages=[processes_page])
+        self.scheduler.add("performance", self.update_performance, 1, pages=[performance_page])
+        # Services are loaded when the page is first shown and then follow
+        # D-Bus signals; only the systemctl fallback re-lists on this timer
+        self.scheduler.add("services", self.services.refresh, 5, pages=[services_page])
+        self.scheduler.add("users", self.update_users, 2, pages=[users_page])
+        self.scheduler.start()
+        self.connect("destroy", self.on_destroy)
     
     def create_processes_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         
-        scrolled = Gtk.ScrolledWindow()
+        search = Gtk.SearchEntry()
+        search.set_placeholder_text("Filter by name or command line")
+        search.connect("search-changed", self.on_search_changed)
+        box.pack_start(search, False, False, 0)
         
-        self.process_store = Gtk.ListStore(int, str, str, str, str)
-        self.process_tree = Gtk.TreeView(model=self.process_store)
+        scrolled = Gtk.ScrolledWindow()
         
-        columns = ["PID", "Name", "CPU %", "Memory", "User"]
-        for i, title in enumerate(columns):
+        # Columns 5-6 are totals over the process and its children; 7-10 are
+        # hidden numeric copies of CPU, memory and the totals for sorting
+        self.process_store = Gtk.TreeStore(int, str, str, str, str, str, str, float, float, float, float)
+        self.process_iters = {}  # pid -> Gtk.TreeIter (TreeStore iters persist)
+        self.process_rows = {}  # pid -> row last written to the store
+        
+        self.process_filter = self.process_store.filter_new()
+        self.process_filter.set_visible_func(self.process_visible)
+        process_sort = Gtk.TreeModelSort(model=self.process_filter)
+        self.process_sort = MultiColumnSort(process_sort, [0, 1, 4, 7, 8, 9, 10])
+        self.process_tree = Gtk.TreeView(model=process_sort)
+        
+        columns = [("PID", 0), ("Name", 1), ("CPU %", 7), ("Memory", 8), ("User", 4),
+                   ("Tree CPU %", 9), ("Tree Memory", 10)]
+        for i, (title, sort_column) in enumerate(columns):
             renderer = Gtk.CellRendererText()
             column = Gtk.TreeViewColumn(title, renderer, text=i)
-            column.set_sortable(True)
+            column.set_sort_column_id(sort_column)
             column.set_resizable(True)
             self.process_tree.append_column(column)
+        self.memory_column = self.process_tree.get_column(3)
+        self.tree_memory_column = self.process_tree.get_column(6)
+        self.process_tree.connect("button-press-event", self.on_process_button_press)
         
         scrolled.add(self.process_tree)
         box.pack_start(scrolled, True, True, 0)
         
-        self.refresh_processes()
+        self.process_status = Gtk.Label()
+        self.process_status.set_xalign(0)
+        self.process_status.set_ellipsize(Pango.EllipsizeMode.END)
+        self.process_status.set_margin_start(5)
+        box.pack_start(self.process_status, False, False, 2)
+        
         return box
     
     def create_performance_page(self):
@@ -97,7 +180,8 @@ class TaskManager(Gtk.Window):
         
         scrolled = Gtk.ScrolledWindow()
         
-        self.startup_store = Gtk.ListStore(bool, str, str, str)
+        # enabled, name, command, started, first window, CPU, CPU seconds, entry index
+        self.startup_store = Gtk.ListStore(bool, str, str, str, str, str, float, int)
         startup_tree = Gtk.TreeView(model=self.startup_store)
         
         toggle = Gtk.CellRendererToggle()
@@ -105,161 +189,590 @@ class TaskManager(Gtk.Window):
         col = Gtk.TreeViewColumn("Enabled", toggle, active=0)
         startup_tree.append_column(col)
         
-        for i, title in enumerate(["Name", "Command", "Status"], 1):
+        for i, title in enumerate(["Name", "Command", "Started", "First Window", "CPU (first 30 s)"], 1):
             renderer = Gtk.CellRendererText()
             column = Gtk.TreeViewColumn(title, renderer, text=i)
+            column.set_resizable(True)
             startup_tree.append_column(column)
         
-        self.startup_store.append([True, "Network Manager Applet", "nm-applet", "Running"])
-        self.startup_store.append([True, "Volume Icon", "volumeicon", "Running"])
-        self.startup_store.append([True, "Compositor", "picom", "Running"])
-        self.startup_store.append([False, "Bluetooth Manager", "blueman-applet", "Disabled"])
-        
         scrolled.add(startup_tree)
         box.pack_start(scrolled, True, True, 0)
         
+        self.startup_status = Gtk.Label()
+        self.startup_status.set_xalign(0)
+        self.startup_status.set_margin_top(5)
+        self.startup_status.set_margin_bottom(5)
+        self.startup_status.set_margin_start(5)
+        box.pack_start(self.startup_status, False, False, 0)
+        
+        self.load_startup_entries()
         return box
     
+    def load_startup_entries(self):
+        self.startup_entries = read_entries()
+        recorded, costs = read_profile()
+        if recorded is None:
+            self.startup_status.set_text("Startup cost is measured at the next login.")
+        else:
+            when = time.strftime("%c", time.localtime(recorded))
+            self.startup_status.set_text(f"Measured at the login of {when}; times are from session start.")
+        
+        def seconds(value):
+            return f"{value:.1f} s" if value is not None else "-"
+        
+        rows = []
+        for index, entry in enumerate(self.startup_entries):
+            cost = costs.get(entry.program)
+            if cost is None:
+                rows.append([entry.enabled, entry.name, entry.command, "-", "-", "-", -1.0, index])
+            else:
+                rows.append([entry.enabled, entry.name, entry.command, seconds(cost.started),
+                             seconds(cost.first_window), seconds(cost.cpu_seconds), cost.cpu_seconds, index])
+        # Most expensive first: those are the ones worth switching off
+        rows.sort(key=lambda row: row[6], reverse=True)
+        self.startup_store.clear()
+        for row in rows:
+            self.startup_store.append(row)
+    
     def create_services_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         
         scrolled = Gtk.ScrolledWindow()
         
         self.services_store = Gtk.ListStore(str, str, str)
-        services_tree = Gtk.TreeView(model=self.services_store)
+        self.service_iters = {}  # unit name -> Gtk.TreeIter
+        services_sort = Gtk.TreeModelSort(model=self.services_store)
+        services_sort.set_sort_column_id(0, Gtk.SortType.ASCENDING)
+        self.services_tree = Gtk.TreeView(model=services_sort)
         
         for i, title in enumerate(["Service", "Status", "Description"]):
             renderer = Gtk.CellRendererText()
             column = Gtk.TreeViewColumn(title, renderer, text=i)
+            column.set_sort_column_id(i)
             column.set_resizable(True)
-            services_tree.append_column(column)
+            self.services_tree.append_column(column)
         
-        services = [
-            ("NetworkManager", "active", "Network connection manager"),
-            ("lightdm", "active", "Display manager"),
-            ("pulseaudio", "active", "Sound server"),
-            ("ssh", "inactive", "OpenSSH server"),
-            ("cups", "inactive", "Printing service"),
-            ("bluetooth", "inactive", "Bluetooth service")
-        ]
-        
-        for name, status, desc in services:
-            self.services_store.append([name, status, desc])
-        
-        scrolled.add(services_tree)
+        scrolled.add(self.services_tree)
         box.pack_start(scrolled, True, True, 0)
         
+        self.services = ServiceMonitor(self.on_services_reset, self.on_service_changed,
+                                       self.on_service_removed, self.on_service_error)
+        
         btn_box = Gtk.Box(spacing=10)
         btn_box.set_margin_top(10)
         btn_box.set_margin_bottom(10)
         btn_box.set_margin_start(10)
         
         start_btn = Gtk.Button(label="Start")
+        start_btn.connect("clicked", self.on_service_action, "start")
         btn_box.pack_start(start_btn, False, False, 0)
         
         stop_btn = Gtk.Button(label="Stop")
+        stop_btn.connect("clicked", self.on_service_action, "stop")
         btn_box.pack_start(stop_btn, False, False, 0)
         
         restart_btn = Gtk.Button(label="Restart")
+        restart_btn.connect("clicked", self.on_service_action, "restart")
         btn_box.pack_start(restart_btn, False, False, 0)
         
+        self.service_status = Gtk.Label()
+        self.service_status.set_xalign(0)
+        self.service_status.set_ellipsize(Pango.EllipsizeMode.END)
+        btn_box.pack_start(self.service_status, True, True, 0)
+        
         box.pack_start(btn_box, False, False, 0)
         
         return box
     
+    def on_services_reset(self, units):
+        self.services_store.clear()
+        self.service_iters.clear()
+        for unit in units:
+            self.service_iters[unit.name] = self.services_store.append(
+                [unit.name, unit.status, unit.description])
+    
+    def on_service_changed(self, unit):
+        treeiter = self.service_iters.get(unit.name)
+        if treeiter is None:
+            self.service_iters[unit.name] = self.services_store.append(
+                [unit.name, unit.status, unit.description])
+        else:
+            self.services_store.set(treeiter, [1, 2], [unit.status, unit.description])
+    
+    def on_service_removed(self, name):
+        treeiter = self.service_iters.pop(name, None)
+        if treeiter is not None:
+            self.services_store.remove(treeiter)
+    
+    def on_service_error(self, message):
+        self.service_status.set_text(message)
+    
+    def on_service_action(self, button, action):
+        model, treeiter = self.services_tree.get_selection().get_selected()
+        if treeiter is None:
+            return
+        name = model[treeiter][0]
+        # Returns at once; polkit may ask for a password while the UI stays live
+        self.service_status.set_text(f"Requested {action} of {name}")
+        self.services.run_action(action, name)
+    
     def create_users_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         
         scrolled = Gtk.ScrolledWindow()
         
-        users_store = Gtk.ListStore(str, str, str, str)
-        users_tree = Gtk.TreeView(model=users_store)
+        # One row per user with its sessions below it
+        self.users_store = Gtk.TreeStore(str, str, str, str, str, str)
+        self.user_iters = {}  # (uid, session) -> Gtk.TreeIter
+        self.users_tree = Gtk.TreeView(model=self.users_store)
         
-        for i, title in enumerate(["User", "Session", "CPU", "Memory"]):
+        for i, title in enumerate(["User", "Session", "CPU", "Memory", "Disk Read", "Disk Write"]):
             renderer = Gtk.CellRendererText()
             column = Gtk.TreeViewColumn(title, renderer, text=i)
-            users_tree.append_column(column)
-        
-        users_store.append([os.getenv("USER", "muxos"), "X11", "5%", "1.2 GB"])
+            column.set_resizable(True)
+            self.users_tree.append_column(column)
         
-        scrolled.add(users_tree)
+        scrolled.add(self.users_tree)
         box.pack_start(scrolled, True, True, 0)
         
+        if not self.users.available:
+            note = Gtk.Label(label="No cgroup v2 user slices: totals are summed from the process list.")
+            note.set_xalign(0)
+            note.set_margin_top(5)
+            note.set_margin_bottom(5)
+            note.set_margin_start(5)
+            box.pack_start(note, False, False, 0)
+        
         return box
     
-    def refresh_processes(self):
+    def update_users(self):
+        # The cgroup files already hold the totals; only the fallback walks /proc
+        processes = None if self.users.available else self.sampler.read_processes()
+        
+        def rate(value):
+            return f"{value / 1024 / 1024:.1f} MB/s" if value is not None else "-"
+        
+        seen = set()
+        added = False
+        for usage in self.users.sample(processes):
+            key = (usage.uid, usage.session)
+            seen.add(key)
+            row = [usage.user if not usage.session else "", usage.session,
+                   f"{usage.cpu_percent:.1f}%", f"{usage.memory / 1024 / 1024:.1f} MB",
+                   rate(usage.read_rate), rate(usage.write_rate)]
+            treeiter = self.user_iters.get(key)
+            if treeiter is not None:
+                self.users_store.set(treeiter, list(range(len(row))), row)
+            else:
+                parent = self.user_iters.get((usage.uid, "")) if usage.session else None
+                self.user_iters[key] = self.users_store.append(parent, row)
+                added = True
+        
+        # Sessions before users: removing a user row takes its sessions with it
+        for key in sorted(self.user_iters.keys() - seen, key=lambda key: key[1] == ""):
+            treeiter = self.user_iters.pop(key)
+            if self.users_store.iter_is_valid(treeiter):
+                self.users_store.remove(treeiter)
+        if added:
+            self.users_tree.expand_all()
+    
+    def process_row(self, node):
+        proc = node.sample
+        if node.children:
+            tree_cpu = f"{node.tree_cpu_percent:.1f}%"
+            tree_mem = f"{node.tree_mem / 1024 / 1024:.1f} MB"
+        else:
+            tree_cpu = tree_mem = ""
+        if self.memory_mode != "rss" and self.smaps.detail(proc.pid) is None:
+            mem = "-"  # not read yet, or another user's process
+        else:
+            mem = f"{node.mem / 1024 / 1024:.1f} MB"
+        return (
+            proc.pid,
+            proc.name[:30],
+            f"{node.cpu_percent:.1f}%",
+            mem,
+            user_name(proc.uid),
+            tree_cpu,
+            tree_mem,
+            node.cpu_percent,
+            float(node.mem),
+            node.tree_cpu_percent,
+            float(node.tree_mem)
+        )
+    
+    def remove_process_row(self, pid):
+        """Remove the row of pid and everything below it; return the PIDs removed with it."""
+        treeiter = self.process_iters.pop(pid)
+        del self.process_rows[pid]
+        removed = []
+        stack = [self.process_store.iter_children(treeiter)]
+        while stack:
+            child = stack.pop()
+            while child is not None:
+                child_pid = self.process_store[child][0]
+                removed.append(child_pid)
+                self.process_iters.pop(child_pid, None)
+                self.process_rows.pop(child_pid, None)
+                stack.append(self.process_store.iter_children(child))
+                child = self.process_store.iter_next(child)
+        self.process_store.remove(treeiter)
+        return removed
+    
+    def insert_process_row(self, pid):
+        if pid in self.process_iters:
+            return
+        node = self.tree.nodes[pid]
+        parent_iter = None
+        if self.tree_toggle.get_active() and node.parent is not None:
+            self.insert_process_row(node.parent.pid)
+            parent_iter = self.process_iters[node.parent.pid]
+        row = self.process_row(node)
+        self.process_iters[pid] = self.process_store.append(parent_iter, row)
+        self.process_rows[pid] = row
+    
+    def sync_process_store(self, changes):
+        """Apply one ProcessTree update to process_store.
+        
+        Only rows named in changes are touched. A reparented process has
+        to be removed and re-inserted with its subtree, since TreeStore
+        cannot move rows; that is rare compared to value updates.
+        """
+        tree_view = self.tree_toggle.get_active()
+        reinsert = set()
+        relink = changes.moved if tree_view else set()
+        for pid in changes.removed | relink:
+            if pid in self.process_iters:
+                reinsert.update(self.remove_process_row(pid))
+        reinsert.update(relink)
+        
+        for pid in changes.added:
+            self.insert_process_row(pid)
+        for pid in reinsert:
+            if pid in self.tree.nodes:
+                self.insert_process_row(pid)
+        
+        for pid in changes.dirty:
+            node = self.tree.nodes.get(pid)
+            if node is None or pid not in self.process_iters:
+                continue
+            row = self.process_row(node)
+            if row != self.process_rows[pid]:
+                set_changed_cells(self.process_store, self.process_iters[pid], self.process_rows[pid], row)
+                self.process_rows[pid] = row
+    
+    def rebuild_process_store(self):
         self.process_store.clear()
-        try:
-            import psutil
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info', 'username']):
-                try:
-                    info = proc.info
-                    mem_mb = info['memory_info'].rss / 1024 / 1024
-                    self.process_store.append([
-                        info['pid'],
-                        info['name'][:30],
-                        f"{info['cpu_percent']:.1f}%",
-                        f"{mem_mb:.1f} MB",
-                        info['username'] or "system"
-                    ])
-                except:
-                    pass
-        except:
-            result = subprocess.run(["ps", "aux"], capture_output=True, text=True)
-            for line in result.stdout.split('\n')[1:11]:
-                parts = line.split()
-                if len(parts) >= 11:
-                    self.process_store.append([
-                        int(parts[1]),
-                        parts[10][:30],
-                        parts[2] + "%",
-                        parts[5],
-                        parts[0]
-                    ])
-        return True
+        self.process_iters.clear()
+        self.process_rows.clear()
+        for pid in self.tree.nodes:
+            self.insert_process_row(pid)
+        if self.tree_toggle.get_active():
+            self.process_tree.expand_all()
+    
+    def refresh_processes(self):
+        self.processes = self.sampler.read_processes()
+        self.search.sync(self.processes)
+        if self.memory_mode != "rss":
+            self.smaps.request(self.processes)
+        self.update_process_tree()
+        if self.filter_text:
+            self.update_filter()
+    
+    def process_visible(self, model, treeiter, data):
+        return self.visible_pids is None or model.get_value(treeiter, 0) in self.visible_pids
+    
+    def update_filter(self, force=False):
+        """Recompute the visible PIDs; refilter only if they changed."""
+        if not self.filter_text:
+            visible = None
+        else:
+            visible = self.search.matches(self.filter_text)
+            if self.tree_toggle.get_active():
+                # A hidden parent hides its children, so keep the path to every match
+                for pid in list(visible):
+                    node = self.tree.nodes.get(pid)
+                    if node is not None:
+                        for ancestor in node.ancestors():
+                            if ancestor.pid in visible:
+                                break
+                            visible.add(ancestor.pid)
+        if force or visible != self.visible_pids:
+            self.visible_pids = visible
+            self.process_filter.refilter()
+            if self.tree_toggle.get_active():
+                self.process_tree.expand_all()
+    
+    def on_search_changed(self, entry):
+        self.filter_text = entry.get_text().strip().lower()
+        self.update_filter()
+    
+    def update_process_tree(self, rebuild=False):
+        rebuild = rebuild or not self.tree.nodes
+        memory = None
+        updated = set()
+        if self.memory_mode != "rss":
+            # A fresh read can flip a row from "-" without changing its value
+            updated = self.smaps.take_updated()
+            memory = self.smaps.values(self.memory_mode)
+        changes = self.tree.update(self.processes, memory)
+        changes.dirty.update(updated)
+        if rebuild:
+            self.rebuild_process_store()
+        else:
+            self.sync_process_store(changes)
+    
+    def on_memory_mode_changed(self, combo):
+        self.memory_mode = combo.get_active_id()
+        if self.memory_mode != "rss":
+            if self.smaps is None:
+                self.smaps = SmapsReader(on_update=self.on_smaps_update)
+            self.smaps.request(self.processes)
+        title = combo.get_active_text()
+        self.memory_column.set_title(title)
+        self.tree_memory_column.set_title(f"Tree {title}")
+        self.update_process_tree(rebuild=True)
+    
+    def on_smaps_update(self):
+        # Called on a worker thread after each batch; fold them into one redraw
+        if not self.smaps_update_queued:
+            self.smaps_update_queued = True
+            GLib.idle_add(self.on_smaps_ready)
+    
+    def on_smaps_ready(self):
+        self.smaps_update_queued = False
+        self.update_process_tree()
+        return False
+    
+    def on_destroy(self, widget):
+        self.scheduler.stop()
+        if self.termination_timer is not None:
+            GLib.source_remove(self.termination_timer)
+        self.services.close()
+        self.users.close()
+        if self.smaps is not None:
+            self.smaps.close()
+    
+    def on_tree_view_toggled(self, button):
+        self.rebuild_process_store()
+        self.update_filter(force=True)
     
     def update_performance(self):
-        try:
-            import psutil
-            cpu = psutil.cpu_percent()
-            mem = psutil.virtual_memory()
-            swap = psutil.swap_memory()
-            disk = psutil.disk_usage('/')
-            
-            self.cpu_label.set_text(f"CPU Usage: {cpu:.1f}%")
-            self.cpu_bar.set_fraction(cpu / 100)
-            
-            self.mem_label.set_text(f"Memory: {mem.used/1024**3:.1f} GB / {mem.total/1024**3:.1f} GB ({mem.percent:.1f}%)")
-            self.mem_bar.set_fraction(mem.percent / 100)
-            
-            self.swap_label.set_text(f"Swap: {swap.used/1024**3:.1f} GB / {swap.total/1024**3:.1f} GB ({swap.percent:.1f}%)")
-            self.swap_bar.set_fraction(swap.percent / 100 if swap.total > 0 else 0)
-            
-            self.disk_label.set_text(f"Disk: {disk.used/1024**3:.1f} GB / {disk.total/1024**3:.1f} GB ({disk.percent:.1f}%)")
-            self.disk_bar.set_fraction(disk.percent / 100)
-            
-            uptime = subprocess.run(["uptime", "-p"], capture_output=True, text=True)
-            self.uptime_label.set_text(f"Uptime: {uptime.stdout.strip()}")
-        except:
-            pass
-        return True
+        snapshot = self.sampler.sample(processes=False)
+        cpu = snapshot.cpu_percent
+        mem = snapshot.memory
+        swap = snapshot.swap
+        disk = shutil.disk_usage('/')
+        disk_percent = disk.used / disk.total * 100 if disk.total else 0
+        
+        self.cpu_label.set_text(f"CPU Usage: {cpu:.1f}%")
+        self.cpu_bar.set_fraction(cpu / 100)
+        
+        self.mem_label.set_text(f"Memory: {mem.used/1024**3:.1f} GB / {mem.total/1024**3:.1f} GB ({mem.percent:.1f}%)")
+        self.mem_bar.set_fraction(mem.percent / 100)
+        
+        self.swap_label.set_text(f"Swap: {swap.used/1024**3:.1f} GB / {swap.total/1024**3:.1f} GB ({swap.percent:.1f}%)")
+        self.swap_bar.set_fraction(swap.percent / 100 if swap.total > 0 else 0)
+        
+        self.disk_label.set_text(f"Disk: {disk.used/1024**3:.1f} GB / {disk.total/1024**3:.1f} GB ({disk_percent:.1f}%)")
+        self.disk_bar.set_fraction(disk_percent / 100)
+        self.uptime_label.set_text(f"Uptime: {format_uptime(snapshot.uptime)}")
+    
+    def selected_pid(self):
+        model, treeiter = self.process_tree.get_selection().get_selected()
+        return model[treeiter][0] if treeiter else None
     
     def end_task(self, button):
-        selection = self.process_tree.get_selection()
-        model, treeiter = selection.get_selected()
-        if treeiter:
-            pid = model[treeiter][0]
-            dialog = Gtk.MessageDialog(transient_for=self, message_type=Gtk.MessageType.QUESTION,
-                                       buttons=Gtk.ButtonsType.YES_NO, text="End Process?")
-            dialog.format_secondary_text(f"Are you sure you want to end process {pid}?")
-            response = dialog.run()
-            dialog.destroy()
-            if response == Gtk.ResponseType.YES:
-                subprocess.run(["kill", str(pid)])
-                self.refresh_processes()
+        pid = self.selected_pid()
+        if pid is not None:
+            self.end_processes(f"Are you sure you want to end process {pid}?", [pid])
+    
+    def end_task_tree(self, button):
+        pid = self.selected_pid()
+        if pid is None:
+            return
+        # Children first, so the parent cannot respawn them while they are being killed
+        pids = self.tree.subtree(pid)
+        self.end_processes(f"Are you sure you want to end process {pid} and its "
+                           f"{len(pids) - 1} child processes?", pids)
+    
+    def on_process_button_press(self, widget, event):
+        if event.button != 3:
+            return False
+        hit = self.process_tree.get_path_at_pos(int(event.x), int(event.y))
+        if hit is None:
+            return False
+        self.process_tree.get_selection().select_path(hit[0])
+        self.process_menu().popup_at_pointer(event)
+        return True
+    
+    def process_menu(self):
+        menu = Gtk.Menu()
+        
+        def add_item(parent, label, callback, *args):
+            item = Gtk.MenuItem(label=label)
+            item.connect("activate", lambda item: callback(*args))
+            parent.append(item)
+        
+        def add_submenu(label):
+            item = Gtk.MenuItem(label=label)
+            submenu = Gtk.Menu()
+            item.set_submenu(submenu)
+            menu.append(item)
+            return submenu
+        
+        priority = add_submenu("Priority")
+        for label, nice in (("High", -10), ("Above Normal", -5), ("Normal", 0),
+                            ("Below Normal", 5), ("Low", 10), ("Idle", 19)):
+            add_item(priority, f"{label} (nice {nice})", self.apply_to_selected,
+                     proctl.set_nice, nice)
+        
+        io_priority = add_submenu("I/O Priority")
+        for label, ioclass, level in (("High", proctl.IOPRIO_CLASS_BE, 0),
+                                      ("Normal", proctl.IOPRIO_CLASS_BE, 4),
+                                      ("Low", proctl.IOPRIO_CLASS_BE, 7),
+                                      ("Idle", proctl.IOPRIO_CLASS_IDLE, 0)):
+            add_item(io_priority, label, self.apply_to_selected, proctl.set_ioprio, ioclass, level)
+        
+        add_item(menu, "CPU Affinity...", self.choose_affinity)
+        
+        weight = add_submenu("Resource Weight")
+        for label, value in (("High", 1000), ("Normal", 100), ("Low", 20)):
+            add_item(weight, f"{label} (CPU and I/O weight {value})", self.move_to_scope, value)
+        
+        menu.append(Gtk.SeparatorMenuItem())
+        children = Gtk.CheckMenuItem(label="Include Child Processes")
+        children.set_active(self.include_children)
+        children.connect("toggled", lambda item: setattr(self, "include_children", item.get_active()))
+        menu.append(children)
+        
+        menu.append(Gtk.SeparatorMenuItem())
+        add_item(menu, "End Task", self.end_task, None)
+        add_item(menu, "End Process Tree", self.end_task_tree, None)
+        
+        menu.show_all()
+        return menu
+    
+    def selected_pids(self):
+        pid = self.selected_pid()
+        if pid is None:
+            return []
+        return self.tree.subtree(pid) if self.include_children else [pid]
+    
+    def apply_to_selected(self, setter, *args):
+        errors = proctl.apply(setter, self.selected_pids(), *args)
+        if errors:
+            self.show_error("Some processes were not changed", errors)
+    
+    def choose_affinity(self):
+        pids = self.selected_pids()
+        if not pids:
+            return
+        try:
+            current = proctl.get_affinity(pids[-1])
+        except OSError:
+            current = set(range(os.cpu_count() or 1))
+        irqs = proctl.irq_counts()
+        total_irqs = sum(irqs.values()) or 1
+        
+        dialog = Gtk.Dialog(title="CPU Affinity", transient_for=self, modal=True)
+        dialog.add_buttons(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL, Gtk.STOCK_OK, Gtk.ResponseType.OK)
+        content = dialog.get_content_area()
+        content.set_spacing(5)
+        content.set_margin_start(10)
+        content.set_margin_end(10)
+        hint = Gtk.Label(label="Keep games off the CPUs that handle most interrupts.")
+        hint.set_xalign(0)
+        content.pack_start(hint, False, False, 5)
+        
+        grid = Gtk.Grid(column_spacing=15, row_spacing=5)
+        checks = {}
+        for i, cpu in enumerate(sorted(os.sched_getaffinity(0) | current | set(irqs))):
+            label = f"CPU {cpu}"
+            if cpu in irqs:
+                label += f" ({100 * irqs[cpu] // total_irqs}% of IRQs)"
+            check = Gtk.CheckButton(label=label)
+            check.set_active(cpu in current)
+            grid.attach(check, i % 4, i // 4, 1, 1)
+            checks[cpu] = check
+        content.pack_start(grid, False, False, 5)
+        dialog.show_all()
+        
+        response = dialog.run()
+        cpus = {cpu for cpu, check in checks.items() if check.get_active()}
+        dialog.destroy()
+        if response == Gtk.ResponseType.OK and cpus:
+            errors = proctl.apply(proctl.set_affinity, pids, cpus)
+            if errors:
+                self.show_error("Some processes were not changed", errors)
+    
+    def move_to_scope(self, weight):
+        pids = self.selected_pids()
+        if not pids:
+            return
+        
+        def on_done(error):
+            if error is not None:
+                self.show_error("Cannot change the resource weight", [error])
+        
+        # systemd creates the cgroup; polkit may ask for a password meanwhile
+        run_in_scope(pids, weight, on_done)
+    
+    def show_error(self, title, messages):
+        dialog = Gtk.MessageDialog(transient_for=self, message_type=Gtk.MessageType.ERROR,
+                                   buttons=Gtk.ButtonsType.OK, text=title)
+        shown = messages[:10]
+        if len(messages) > len(shown):
+            shown.append(f"and {len(messages) - len(shown)} more")
+        dialog.format_secondary_text("\n".join(shown))
+        dialog.run()
+        dialog.destroy()
+    
+    def end_processes(self, question, pids):
+        dialog = Gtk.MessageDialog(transient_for=self, message_type=Gtk.MessageType.QUESTION,
+                                   buttons=Gtk.ButtonsType.YES_NO, text="End Process?")
+        dialog.format_secondary_text(question)
+        response = dialog.run()
+        dialog.destroy()
+        if response != Gtk.ResponseType.YES:
+            return
+        # SIGTERM goes out now; the timer watches the processes exit and
+        # sends SIGKILL to those still running after proctl.TERM_TIMEOUT
+        self.terminations.append(proctl.Termination(pids))
+        self.process_status.set_text(f"Ending {len(pids)} processes...")
+        if self.termination_timer is None:
+            self.termination_timer = GLib.timeout_add(200, self.poll_terminations)
+    
+    def poll_terminations(self):
+        before = sum(len(termination.running) for termination in self.terminations)
+        for termination in list(self.terminations):
+            if termination.poll():
+                self.terminations.remove(termination)
+                message = "Processes ended"
+                if termination.killed:
+                    message += f"; {len(termination.killed)} ignored SIGTERM and were killed"
+                if termination.errors:
+                    message += f"; not allowed to end {', '.join(termination.errors)}"
+                self.process_status.set_text(message)
+        running = sum(len(termination.running) for termination in self.terminations)
+        if running:
+            self.process_status.set_text(f"Waiting for {running} processes to exit...")
+        if running != before:
+            self.refresh_processes()
+        if not self.terminations:
+            self.termination_timer = None
+            return False
+        return True
     
     def on_startup_toggled(self, widget, path):
-        self.startup_store[path][0] = not self.startup_store[path][0]
+        row = self.startup_store[path]
+        entry = self.startup_entries[row[7]]
+        try:
+            self.startup_entries[row[7]] = set_enabled(entry, not row[0])
+        except OSError as e:
+            self.startup_status.set_text(f"Cannot change {entry.name}: {e.strerror}")
+            return
+        row[0] = not row[0]
 
 if __name__ == "__main__":
     win = TaskManager()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark one full process table scan.
+
+Compares muxos.procfs.ProcSampler, first scan (cold) and repeated scans
+(warm), with psutil (when installed) and `ps`. Each of them collects
+the columns the task manager shows: pid, ppid, name, state, CPU %, RSS,
+threads and user.
+
+    python3 scripts/benchmark-process-scan.py --rounds 50
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "apps", "lib"))
+
+from muxos.procfs import ProcSampler, user_name
+
+
+def scan_procfs_warm(sampler):
+    return [(p.pid, p.ppid, p.name, p.status, p.cpu_percent, p.rss, p.num_threads, user_name(p.uid))
+            for p in sampler.read_processes()]
+
+
+def scan_procfs_cold():
+    sampler = ProcSampler()
+    try:
+        return scan_procfs_warm(sampler)
+    finally:
+        sampler.close()
+
+
+def scan_psutil(psutil):
+    attrs = ["pid", "ppid", "name", "status", "cpu_percent", "memory_info", "num_threads", "username"]
+    return [(p.info["pid"], p.info["ppid"], p.info["name"], p.info["status"], p.info["cpu_percent"],
+             p.info["memory_info"].rss if p.info["memory_info"] else 0, p.info["num_threads"], p.info["username"])
+            for p in psutil.process_iter(attrs)]
+
+
+def scan_ps():
+    output = subprocess.run(["ps", "-eo", "pid=,ppid=,stat=,pcpu=,rss=,nlwp=,user=,comm="],
+                            capture_output=True, text=True, check=True).stdout
+    rows = []
+    for line in output.splitlines():
+        pid, ppid, stat, pcpu, rss, nlwp, user, comm = line.split(None, 7)
+        rows.append((int(pid), int(ppid), comm, stat, float(pcpu), int(rss) * 1024, int(nlwp), user))
+    return rows
+
+
+def list_proc():
+    return [entry for entry in os.listdir("/proc") if entry.isdigit()]
+
+
+def scandir_proc():
+    return [entry.name for entry in os.scandir("/proc") if entry.name.isdigit()]
+
+
+def measure(func, rounds):
+    times = []
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times, len(result)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark process table scans")
+    parser.add_argument("--rounds", type=int, default=50, help="Scans per method")
+    args = parser.parse_args()
+
+    sampler = ProcSampler()
+    sampler.read_processes()  # baseline, like every later tick of the apps
+
+    methods = [
+        ("procfs (warm)", lambda: scan_procfs_warm(sampler)),
+        ("procfs (cold)", scan_procfs_cold),
+    ]
+    try:
+        import psutil
+        list(psutil.process_iter(["cpu_percent"]))
+        methods.append((f"psutil {psutil.__version__}", lambda: scan_psutil(psutil)))
+    except ImportError:
+        print("psutil not installed, skipped")
+    methods.append(("ps", scan_ps))
+    methods.append(("/proc listdir only", list_proc))
+    methods.append(("/proc scandir only", scandir_proc))
+
+    print(f"{'method':<22}{'procs':>7}{'median ms':>12}{'mean ms':>10}{'max ms':>10}")
+    for name, func in methods:
+        times, count = measure(func, args.rounds)
+        print(f"{name:<22}{count:>7}{statistics.median(times):>12.3f}"
+              f"{statistics.mean(times):>10.3f}{max(times):>10.3f}")
+    sampler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
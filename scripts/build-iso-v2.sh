@@ -267,6 +267,12 @@ cp "$PROJECT_ROOT/apps/system-monitor/"*.desktop "$CHROOT_DIR/usr/share/applicat
 cp "$PROJECT_ROOT/apps/updater/"*.desktop "$CHROOT_DIR/usr/share/applications/" 2>/dev/null || true
 
 mkdir -p "$CHROOT_DIR/usr/lib/muxos"
+# Shared Python modules; apps in /usr/bin find them via ../lib/muxos
+cp "$PROJECT_ROOT/apps/lib/muxos/"*.py "$CHROOT_DIR/usr/lib/muxos/"
+cp "$PROJECT_ROOT/system/metrics/muxos-metricsd.py" "$CHROOT_DIR/usr/lib/muxos/"
+chmod +x "$CHROOT_DIR/usr/lib/muxos/muxos-metricsd.py"
+cp "$PROJECT_ROOT/system/metrics/muxos-startup-profiler.py" "$CHROOT_DIR/usr/lib/muxos/"
+chmod +x "$CHROOT_DIR/usr/lib/muxos/muxos-startup-profiler.py"
 cp "$PROJECT_ROOT/system/setup/muxos-firstboot-helper.py" "$CHROOT_DIR/usr/lib/muxos/muxos-firstboot-helper.py" 2>/dev/null || true
 chmod +x "$CHROOT_DIR/usr/lib/muxos/muxos-firstboot-helper.py" 2>/dev/null || true
 
@@ -284,12 +290,14 @@ chmod +x "$CHROOT_DIR/usr/lib/muxos/muxos-update-helper.py" 2>/dev/null || true
 # System service
 mkdir -p "$CHROOT_DIR/etc/systemd/system"
 cp "$PROJECT_ROOT/system/services/muxos-gamemode.service" "$CHROOT_DIR/etc/systemd/system/"
+cp "$PROJECT_ROOT/system/services/muxos-metricsd.service" "$CHROOT_DIR/etc/systemd/system/"
 
 # Enable services
 log_info "Enabling services..."
 chroot "$CHROOT_DIR" systemctl enable lightdm
 chroot "$CHROOT_DIR" systemctl enable NetworkManager
 chroot "$CHROOT_DIR" systemctl enable muxos-gamemode
+chroot "$CHROOT_DIR" systemctl enable muxos-metricsd
 
 # Set hostname
 echo "$DEFAULT_HOSTNAME" > "$CHROOT_DIR/etc/hostname"
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""MuxOS metrics daemon.
+
+Samples /proc once per second, keeps an hour of history in memory and
+answers queries from the GUI monitors over a Unix socket (see
+muxos/metrics.py for the protocol). Every sample is also appended to the
+on-disk store in muxos/metricsstore.py, which keeps days to years of
+rolled-up history for looking into a stutter after the fact:
+
+    muxos-metricsd --dump 600     # last 10 minutes as CSV
+"""
+
+import argparse
+import csv
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+# Installed next to the muxos package in /usr/lib/muxos, or run from the source tree
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "apps", "lib"))
+
+from muxos.history import History
+from muxos.metrics import MAX_LINE, SOCKET_PATH, snapshot_to_dict
+from muxos.metricsstore import MetricsStore
+from muxos.procfs import ProcSampler
+
+HISTORY_SECONDS = 3600
+PROCESS_MAX_AGE = 1.0
+STORE_DIR = "/var/lib/muxos-metrics"
+STORE_FLUSH_TICKS = 60
+
+
+def eprint(msg: str) -> None:
+    sys.stderr.write(msg + "\n")
+
+
+class MetricsState:
+    """Latest snapshot plus history, shared by the sampler and the handlers."""
+
+    def __init__(self, interval: float, store=None):
+        self.interval = interval
+        self.store = store
+        self.lock = threading.Lock()
+        self.sampler = ProcSampler()
+        self.history = History(int(HISTORY_SECONDS / interval))
+        self.snapshot = self.sampler.sample(processes=False)
+        self.disk_io = self.sampler.read_disk_io()
+        self.last_tick = time.monotonic()
+        self.processes = None
+        self.processes_time = 0.0
+        self.ticks = 0
+
+    def tick(self) -> None:
+        with self.lock:
+            last = self.snapshot
+            snapshot = self.sampler.sample(processes=False)
+            disk_io = self.sampler.read_disk_io()
+            # The snapshot timestamp is wall-clock time and may jump
+            now = time.monotonic()
+            elapsed = now - self.last_tick
+            self.last_tick = now
+            if elapsed > 0:
+                upload = (snapshot.net_io.bytes_sent - last.net_io.bytes_sent) / 1024 / elapsed
+                download = (snapshot.net_io.bytes_recv - last.net_io.bytes_recv) / 1024 / elapsed
+                disk_read = (disk_io.read_bytes - self.disk_io.read_bytes) / 1024 / elapsed
+                disk_write = (disk_io.write_bytes - self.disk_io.write_bytes) / 1024 / elapsed
+            else:
+                upload = download = disk_read = disk_write = 0.0
+            self.history.append("cpu", snapshot.cpu_percent)
+            self.history.append_cores(snapshot.cpu_per_core)
+            self.history.append("memory", snapshot.memory.percent)
+            self.history.append("swap", snapshot.swap.percent)
+            self.history.append("net_upload", upload)
+            self.history.append("net_download", download)
+            self.snapshot = snapshot
+            self.disk_io = disk_io
+            
+            if self.store is not None:
+                self.store.append(snapshot.timestamp, (
+                    snapshot.cpu_percent, snapshot.memory.percent, snapshot.swap.percent,
+                    snapshot.load_avg[0], upload, download, disk_read, disk_write,
+                ))
+                self.ticks += 1
+                if self.ticks % STORE_FLUSH_TICKS == 0:
+                    self.store.flush()
+
+    def get_snapshot(self, processes: bool):
+        with self.lock:
+            snapshot = self.snapshot
+            if not processes:
+                return snapshot
+            # Process tables are only scanned while someone is asking for them
+            now = time.monotonic()
+            if self.processes is None or now - self.processes_time >= PROCESS_MAX_AGE:
+                self.processes = self.sampler.read_processes()
+                self.processes_time = now
+            return snapshot._replace(processes=self.processes)
+
+    def get_history(self, names, step: int):
+        step = max(1, int(step / self.interval))
+        result = {}
+        with self.lock:
+            for name in names:
+                buffer = self.history.series.get(name)
+                if buffer is None:
+                    continue
+                values = buffer.values()
+                # Average groups of step samples, aligned to the newest one
+                start = len(values) % step
+                result[name] = [
+                    sum(values[i:i + step]) / step
+                    for i in range(start, len(values), step)
+                ]
+        return result
+
+    def get_range(self, start: float, end: float, tier=None):
+        if self.store is None:
+            raise ValueError("persistent store is disabled")
+        with self.lock:
+            tier, columns, rows = self.store.query(float(start), float(end), tier)
+        return {"tier": tier, "columns": columns, "rows": rows}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state = self.server.state
+        while True:
+            line = self.rfile.readline(MAX_LINE)
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+                cmd = request.get("cmd")
+                if cmd == "snapshot":
+                    reply = snapshot_to_dict(state.get_snapshot(bool(request.get("processes", True))))
+                elif cmd == "history":
+                    reply = {
+                        "interval": state.interval,
+                        "series": state.get_history(request.get("series", []), request.get("step", 1)),
+                    }
+                elif cmd == "range":
+                    reply = state.get_range(request["start"], request["end"], request.get("tier"))
+                else:
+                    reply = {"error": f"unknown command: {cmd}"}
+            except KeyError as e:
+                reply = {"error": f"missing request field: {e.args[0]}"}
+            except (ValueError, AttributeError, TypeError) as e:
+                reply = {"error": str(e)}
+            try:
+                self.wfile.write(json.dumps(reply, separators=(",", ":")).encode() + b"\n")
+            except OSError:
+                return
+
+
+class MetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, state: MetricsState):
+        self.state = state
+        socketserver.UnixStreamServer.__init__(self, path, RequestHandler)
+
+
+def sampler_loop(state: MetricsState, stop: threading.Event) -> None:
+    next_tick = time.monotonic()
+    while not stop.is_set():
+        state.tick()
+        next_tick += state.interval
+        stop.wait(max(0.0, next_tick - time.monotonic()))
+
+
+def dump(store_dir: str, seconds: float) -> int:
+    """Print the last seconds of stored history as CSV."""
+    # Read only: leaves the rings and the daemon's bucket state alone
+    try:
+        store = MetricsStore(store_dir, readonly=True)
+    except OSError as e:
+        eprint(f"muxos-metricsd: cannot read {store_dir}: {e.strerror}")
+        return 1
+    end = time.time()
+    tier, columns, rows = store.query(end - seconds, end)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([f"{value:.2f}" for value in row])
+    if tier is None:
+        eprint(f"muxos-metricsd: no stored history in {store_dir}")
+    else:
+        eprint(f"{len(rows)} rows from the {tier} tier")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="MuxOS metrics daemon")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--interval", type=float, default=1.0, help="Sampling interval in seconds")
+    parser.add_argument("--store-dir", default=STORE_DIR, help="Directory of the persistent store")
+    parser.add_argument("--no-store", action="store_true", help="Keep history in memory only")
+    parser.add_argument("--dump", type=float, metavar="SECONDS",
+                        help="Print the last SECONDS of stored history as CSV and exit")
+    args = parser.parse_args()
+    
+    if args.dump is not None:
+        return dump(args.store_dir, args.dump)
+
+    os.makedirs(os.path.dirname(args.socket), exist_ok=True)
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+
+    store = None if args.no_store else MetricsStore(args.store_dir)
+    state = MetricsState(args.interval, store)
+    server = MetricsServer(args.socket, state)
+    # Read-only data that any local user can already get from /proc
+    os.chmod(args.socket, 0o666)
+
+    stop = threading.Event()
+    sampler = threading.Thread(target=sampler_loop, args=(state, stop), daemon=True)
+    sampler.start()
+
+    def on_signal(signum, frame):
+        stop.set()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    eprint(f"muxos-metricsd: listening on {args.socket}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        if store is not None:
+            with state.lock:
+                store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
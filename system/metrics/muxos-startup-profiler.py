@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Measure what each autostart program costs at login.
+
+Started first thing by the Openbox autostart script. For PROFILE_SECONDS
+it follows the processes that start after it and the windows that get
+mapped, attributes both to the autostart programs of muxos.autostart and
+writes, per program:
+
+    started        seconds from session start to its first process
+    first_window   seconds to its first managed window; null for tray
+                   applets and daemons, which never map one
+    cpu_seconds    CPU time its processes used inside the window
+
+to ~/.cache/muxos/startup-profile.json, where the task manager's Startup
+tab reads it. Windows come from `xprop -spy` on _NET_CLIENT_LIST, so the X
+server is never polled; /proc is scanned twice a second at nice 10.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+# Installed next to the muxos package in /usr/lib/muxos, or run from the source tree
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "apps", "lib"))
+
+from muxos.autostart import PROFILE_PATH, read_entries
+from muxos.procfs import CLOCK_TICKS, parse_process_stat, read_cmdline
+
+PROFILE_SECONDS = 30
+SCAN_INTERVAL = 0.5
+
+
+def boot_time() -> float:
+    """Seconds since boot, the clock /proc/<pid>/stat start times use."""
+    return time.clock_gettime(time.CLOCK_BOOTTIME)
+
+
+def read_stat(pid: int):
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            return parse_process_stat(f.read())
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class WindowWatcher(threading.Thread):
+    """Records (time, pid) for every window added to _NET_CLIENT_LIST."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.events = []
+        self.process = None
+
+    def run(self):
+        try:
+            self.process = subprocess.Popen(["xprop", "-root", "-spy", "_NET_CLIENT_LIST"],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError:
+            return
+        seen = set()
+        for line in self.process.stdout:
+            now = boot_time()
+            _, _, ids = line.partition("#")
+            for window in ids.replace(",", " ").split():
+                if window in seen:
+                    continue
+                seen.add(window)
+                pid = self.window_pid(window)
+                if pid is not None:
+                    self.events.append((now, pid))
+
+    @staticmethod
+    def window_pid(window: str):
+        try:
+            output = subprocess.run(["xprop", "-id", window, "_NET_WM_PID"], capture_output=True,
+                                    text=True, timeout=2).stdout
+            return int(output.rsplit("=", 1)[1])
+        except (OSError, subprocess.SubprocessError, IndexError, ValueError):
+            return None
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+
+
+def candidates(pid: int, name: str):
+    """Names a process may be listed under: comm, argv[0] and, for scripts, argv[1]."""
+    words = read_cmdline(pid).split()[:2]
+    return {name} | {os.path.basename(word) for word in words}
+
+
+def main() -> int:
+    os.nice(10)
+    programs = {entry.program for entry in read_entries() if entry.program}
+    stat = read_stat(os.getpid())
+    session_start = stat[5] / CLOCK_TICKS if stat else boot_time()
+    recorded = time.time()
+
+    watcher = WindowWatcher()
+    watcher.start()
+
+    owners = {}  # pid -> program, None for processes of no autostart entry
+    cpu_ticks = {}  # pid -> last seen utime + stime
+    started = {}  # program -> seconds after session start
+    deadline = session_start + PROFILE_SECONDS
+    while boot_time() < deadline:
+        for entry in sorted(int(e) for e in os.listdir("/proc") if e.isdigit()):
+            info = read_stat(entry)
+            if info is None:
+                continue
+            name, _, ppid, ticks, _, starttime, _ = info
+            if entry not in owners:
+                if starttime / CLOCK_TICKS < session_start:
+                    owners[entry] = None
+                    continue
+                program = next((p for p in candidates(entry, name) if p in programs), None)
+                owners[entry] = program or owners.get(ppid)
+                if owners[entry] is not None:
+                    started.setdefault(owners[entry], starttime / CLOCK_TICKS - session_start)
+            if owners[entry] is not None:
+                cpu_ticks[entry] = ticks
+        time.sleep(SCAN_INTERVAL)
+    watcher.stop()
+
+    first_window = {}
+    for when, pid in watcher.events:
+        program = owners.get(pid)
+        if program is not None and when <= deadline:
+            first_window.setdefault(program, when - session_start)
+
+    cpu = {}
+    for pid, ticks in cpu_ticks.items():
+        cpu[owners[pid]] = cpu.get(owners[pid], 0) + ticks / CLOCK_TICKS
+
+    profile = {
+        "recorded": recorded,
+        "seconds": PROFILE_SECONDS,
+        "programs": {
+            program: {
+                "started": round(started[program], 3),
+                "first_window": round(first_window[program], 3) if program in first_window else None,
+                "cpu_seconds": round(cpu.get(program, 0.0), 3),
+            }
+            for program in started
+        },
+    }
+    os.makedirs(os.path.dirname(PROFILE_PATH), exist_ok=True)
+    tmp = PROFILE_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, PROFILE_PATH)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())